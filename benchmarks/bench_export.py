@@ -0,0 +1,45 @@
+"""
+Time of exporting a table of documents by streaming exporters
+
+Runs on a temporary test database, set TRAVIS=1 to use PostgreSQL (required by pgcopy).
+
+Usage: TRAVIS=1 python benchmarks/bench_export.py [rows]
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'moonsheep.tests.test_settings')
+
+import django  # NOQA
+
+django.setup()
+
+from django.db import connection  # NOQA
+
+from moonsheep.exporters import FileExporter  # NOQA
+from moonsheep.tests.models import Document  # NOQA
+
+EXPORTERS = ['csv', 'ndjson', 'pgcopy', 'parquet']
+
+
+def main(rows):
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        Document.objects.bulk_create([Document(url=f'http://example.com/{i}', progress=100) for i in range(rows)],
+                                     batch_size=10000)
+
+        for slug in EXPORTERS:
+            exporter = FileExporter.implementations()[slug]('tests')
+            output = io.BytesIO()
+            start = time.perf_counter()
+            exporter.export(output)
+            print(f"{slug:<10} {time.perf_counter() - start:8.2f} s  {len(output.getvalue()) / 1e6:8.1f} MB")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
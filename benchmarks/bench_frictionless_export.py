@@ -0,0 +1,60 @@
+"""
+Frictionless export of a synthetic app with 10 models, exported one by one and in parallel
+
+Runs on a temporary test database, set TRAVIS=1 to use PostgreSQL.
+
+Usage: TRAVIS=1 python benchmarks/bench_frictionless_export.py [rows per model]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'moonsheep.tests.test_settings')
+
+import django  # NOQA
+
+django.setup()
+
+from django.db import connection, models  # NOQA
+
+from moonsheep.exporters import FrictionlessFileExporter  # NOQA
+
+MODELS_COUNT = 10
+
+
+def synthetic_model(i):
+    return type(f'Synthetic{i}', (models.Model,), {
+        '__module__': 'moonsheep.tests.models',
+        'Meta': type('Meta', (), {'app_label': 'tests'}),
+        'name': models.CharField(max_length=100),
+        'amount': models.IntegerField(),
+        'price': models.DecimalField(max_digits=10, decimal_places=2),
+        'date': models.DateField(),
+        'notes': models.TextField(),
+    })
+
+
+def main(rows):
+    # test app has no migrations, so tables of models defined before creating test database are created with it
+    synthetic_models = [synthetic_model(i) for i in range(MODELS_COUNT)]
+
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        for model_cls in synthetic_models:
+            model_cls.objects.bulk_create([
+                model_cls(name=f'name {r}', amount=r, price=r / 100, date='2020-01-01', notes='lorem ipsum ' * 5)
+                for r in range(rows)], batch_size=10000)
+
+        for workers in [1, 2, 4, 8]:
+            with tempfile.TemporaryDirectory() as output_dir:
+                start = time.perf_counter()
+                FrictionlessFileExporter('tests').export(os.path.join(output_dir, 'export.zip'), workers=workers)
+                print(f"workers={workers:<3} {time.perf_counter() - start:8.2f} s")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
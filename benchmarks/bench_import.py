@@ -0,0 +1,55 @@
+"""
+Importing many documents with their initial tasks
+
+Usage: TRAVIS=1 python benchmarks/bench_import.py [number of urls]
+"""
+import os
+import sys
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'moonsheep.tests.test_settings')
+
+import django  # NOQA
+
+django.setup()
+
+from django.db import connection  # NOQA
+
+from moonsheep.importers.importers import import_documents, IDocumentImporter  # NOQA
+from moonsheep.models import Task  # NOQA
+from moonsheep.settings import MOONSHEEP  # NOQA
+from moonsheep.tests.models import Document  # NOQA
+
+
+class RangeImporter(IDocumentImporter):
+    def __init__(self, count):
+        self.count = count
+
+    def find_urls(self, **options):
+        return (f'http://example.com/doc/{i}.pdf' for i in range(self.count))
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        with patch.dict(MOONSHEEP, {'DOCUMENT_MODEL': Document,
+                                    'DOCUMENT_INITIAL_TASKS': ['moonsheep.tests.tasks.SimpleTask']}), \
+                open(os.devnull, 'w') as devnull, patch('sys.stdout', devnull):
+            start = time.perf_counter()
+            import_documents(RangeImporter(count))
+            first = time.perf_counter() - start
+
+            # all urls are duplicates now
+            start = time.perf_counter()
+            import_documents(RangeImporter(count))
+            again = time.perf_counter() - start
+
+        print(f"{count} urls: {first:.1f}s, imported again {again:.1f}s "
+              f"({Document.objects.count()} documents, {Task.objects.count()} tasks)")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,39 @@
+"""
+Cross-checking tables of hundreds of rows with one row inserted in one of the entries
+
+Usage: python benchmarks/bench_list_verifiers.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'moonsheep.tests.test_settings')
+
+import django  # NOQA
+
+django.setup()
+
+from moonsheep.models import Task  # NOQA
+from moonsheep.tasks import AbstractTask  # NOQA
+from moonsheep.verifiers import OrderedListVerifier, AlignedListVerifier  # NOQA
+
+NUMBER = 20
+
+
+def report(label, verifier_cls, entries):
+    verifier = verifier_cls(AbstractTask(Task(id=1, type='bench', params={}, doc_id=1)), '')
+    result, confidence = verifier([list(entry) for entry in entries])
+    seconds = min(timeit.repeat(lambda: verifier([list(entry) for entry in entries]), number=NUMBER, repeat=3))
+    print(f"{label:<30} {seconds / NUMBER * 1e3:8.2f} ms/call  confidence {confidence:.3f}")
+
+
+if __name__ == '__main__':
+    for rows_count in [100, 500, 2000]:
+        rows = [{'name': f'person {i}', 'amount': i * 100, 'currency': 'PLN'} for i in range(rows_count)]
+        inserted = rows[:10] + [{'name': 'extra', 'amount': 1, 'currency': 'PLN'}] + rows[10:]
+        entries = [rows, inserted, rows]
+
+        print(f"{rows_count} rows")
+        report('  OrderedListVerifier', OrderedListVerifier, entries)
+        report('  AlignedListVerifier', AlignedListVerifier, entries)
@@ -0,0 +1,36 @@
+"""
+Per-call cost of resolving a task class and instantiating a task
+
+Usage: python benchmarks/bench_task_class_resolution.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'moonsheep.tests.test_settings')
+
+import django  # NOQA
+
+django.setup()
+
+from moonsheep import registry  # NOQA
+from moonsheep.mapper import klass_from_name  # NOQA
+from moonsheep.models import Task  # NOQA
+from moonsheep.tasks import AbstractTask  # NOQA
+
+TASK_TYPE = 'moonsheep.tests.tasks.SimpleTask'
+NUMBER = 100000
+
+
+def report(label, fn):
+    seconds = min(timeit.repeat(fn, number=NUMBER, repeat=5))
+    print(f"{label:<40} {seconds / NUMBER * 1e9:8.0f} ns/call")
+
+
+if __name__ == '__main__':
+    task = Task(id=1, type=TASK_TYPE, params={'url': 'http://example.com'}, doc_id=1)
+
+    report('klass_from_name', lambda: klass_from_name(TASK_TYPE))
+    report('registry.get_task_class', lambda: registry.get_task_class(TASK_TYPE))
+    report('AbstractTask.create_task_instance', lambda: AbstractTask.create_task_instance(task))
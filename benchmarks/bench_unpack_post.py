@@ -0,0 +1,58 @@
+"""
+Parsing transcription forms with `unpack_post`, on POST bodies of about 5k fields
+
+Usage: python benchmarks/bench_unpack_post.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'moonsheep.tests.test_settings')
+
+import django  # NOQA
+
+django.setup()
+
+from django.http import QueryDict  # NOQA
+
+from moonsheep.views import unpack_post  # NOQA
+
+FIELDS = ['name', 'surname', 'position', 'amount', 'currency']
+
+
+def table(rows):
+    """Table of `rows` rows with 5 columns"""
+    return [(f'row[{i}][{fld}]', f'{fld} {i}') for i in range(rows) for fld in FIELDS]
+
+
+def nested(rows):
+    """Rows with an id and lists of numbered and PHP-style options"""
+    fields = []
+    for i in range(rows):
+        fields.append((f'row[{i}][entry_id]', str(i)))
+        fields += [(f'row[{i}][values][{j}]', str(j)) for j in range(2)]
+        fields += [(f'row[{i}][options][]', str(j)) for j in range(2)]
+    return fields
+
+
+def flat(count):
+    """Form of many single and repeated fields"""
+    return [(f'field_{i}', str(i)) for i in range(count // 2)] + [('tags', str(i)) for i in range(count // 2)]
+
+
+BODIES = {
+    'table 1000 rows x 5 fields': table(1000),
+    'nested 1000 rows x 5 fields': nested(1000),
+    'flat 5000 fields': flat(5000),
+}
+
+if __name__ == '__main__':
+    for label, fields in BODIES.items():
+        # built directly, parsing such a body needs DATA_UPLOAD_MAX_NUMBER_FIELDS raised over the default 1000
+        post = QueryDict(mutable=True)
+        for key, value in fields:
+            post.appendlist(key, value)
+
+        seconds = min(timeit.repeat(lambda: unpack_post(post), number=5, repeat=3)) / 5
+        print(f"{label:<30} {len(fields):6} fields {seconds * 1000:8.1f} ms")
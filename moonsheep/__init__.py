@@ -1 +1,3 @@
 __version__ = VERSION = (0, 3, 0)
+
+default_app_config = 'moonsheep.apps.MoonsheepConfig'
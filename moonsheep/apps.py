@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class MoonsheepConfig(AppConfig):
+    name = 'moonsheep'
+
+    def ready(self):
+        from moonsheep import registry
+        from moonsheep import signals  # NOQA connect receivers
+
+        registry.validate_tasks()
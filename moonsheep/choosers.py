@@ -0,0 +1,215 @@
+import collections
+import random
+import threading
+import time
+from abc import abstractmethod
+from datetime import timedelta
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils import timezone
+
+from moonsheep.exceptions import NoTasksLeft
+from moonsheep.models import Task, Entry, TaskLease
+from moonsheep.plugins import Interface
+from moonsheep.settings import MOONSHEEP
+
+
+class TaskChooser(Interface):
+    """
+    Chooses a task to be served to a user
+
+    Implementation is picked by `MOONSHEEP['TASK_CHOOSER']` setting using its slug,
+    ie. DefaultTaskChooser -> default
+    """
+
+    @abstractmethod
+    def choose(self, user) -> Task:
+        """
+        :param user: volunteer asking for a task
+        :raises NoTasksLeft: if there is no task to be served
+        :return: task to be served
+        """
+        pass
+
+    def task_updated(self, task: Task):
+        """
+        Called after task's state has been changed and saved, ie. by verification
+        """
+        pass
+
+    def entry_added(self, entry: Entry):
+        """
+        Called after user's entry has been saved, it releases user's lease on the task
+        """
+        if MOONSHEEP['TASK_LEASE_TTL']:
+            TaskLease.objects.filter(task_id=entry.task_id, user_id=entry.user_id).delete()
+
+    @staticmethod
+    def lease(task: Task, user):
+        """
+        Reserve task for the user for MOONSHEEP['TASK_LEASE_TTL'] seconds
+        """
+        if MOONSHEEP['TASK_LEASE_TTL']:
+            TaskLease.objects.update_or_create(task=task, user=user, defaults={
+                'expires_at': timezone.now() + timedelta(seconds=MOONSHEEP['TASK_LEASE_TTL'])
+            })
+
+
+class DefaultTaskChooser(TaskChooser):
+    """
+    Selects top open tasks that user didn't contribute to and chooses one randomly,
+    so everyone won't get the same task.
+
+    Tasks are read walking (state, priority, id) index and rows locked by concurrent requests are skipped,
+    so volunteers coming at the same time get samples from different tasks.
+
+    If leasing is enabled, tasks reserved by other users for all the entries still needed are not served.
+    """
+
+    sample_size = 20
+
+    def choose(self, user) -> Task:
+        tasks = Task.objects.open_for(user)
+        if MOONSHEEP['TASK_LEASE_TTL']:
+            tasks = tasks.not_reserved(user)
+
+        with transaction.atomic():
+            tasks = list(tasks.select_for_update(skip_locked=True)[:self.sample_size])
+            if not tasks:
+                raise NoTasksLeft()
+
+            task = random.choice(tasks)
+            self.lease(task, user)
+
+        return task
+
+
+class CachedTaskChooser(DefaultTaskChooser):
+    """
+    Serves tasks from an in-process cache so most of the requests don't hit the database.
+
+    It keeps top `cache_size` open tasks grouped in priority buckets and, per user, a set of tasks
+    the user has contributed to. Both are updated incrementally from `task_updated` and `entry_added` hooks
+    and reloaded from the database every `refresh_interval` seconds, so tasks created in the meantime
+    and changes made by other processes are picked up.
+
+    Tasks sampled from cache are loaded with the same conditions as in DefaultTaskChooser, so tasks
+    cross-checked, deleted or reserved by other processes are not served. The ones that are not open anymore
+    are dropped from cache. If none of the sampled tasks can be served, choosing falls back
+    to the database query of DefaultTaskChooser.
+    """
+
+    cache_size = 1000
+    users_cache_size = 10000
+    refresh_interval = 60
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._buckets = {}  # priority -> list of task ids
+        self._priorities = []  # bucket keys, highest first
+        self._loaded_at = None
+        self._users = collections.OrderedDict()  # user_id -> (loaded_at, set of task ids), least recently used first
+
+    def choose(self, user) -> Task:
+        with self._lock:
+            now = time.monotonic()
+            if self._loaded_at is None or now - self._loaded_at > self.refresh_interval:
+                self._load_tasks(now)
+
+            contributed = self._contributed(user.id, now)
+
+            candidates = []
+            for priority in self._priorities:
+                candidates += [task_id for task_id in self._buckets[priority] if task_id not in contributed]
+                if len(candidates) >= self.sample_size:
+                    break
+
+        sample = candidates[:self.sample_size]
+        if not sample:
+            return super().choose(user)
+
+        tasks = Task.objects.open_for(user)
+        if MOONSHEEP['TASK_LEASE_TTL']:
+            tasks = tasks.not_reserved(user)
+        tasks = list(tasks.filter(pk__in=sample))
+
+        if len(tasks) < len(sample):
+            # cache is stale, tasks might have been changed by other processes
+            open_ids = set(Task.objects.filter(pk__in=sample, state=Task.OPEN).values_list('id', flat=True))
+            self._drop(set(sample) - open_ids)
+
+        if not tasks:
+            return super().choose(user)
+
+        task = random.choice(tasks)
+        self.lease(task, user)
+
+        return task
+
+    def task_updated(self, task: Task):
+        if task.state == Task.OPEN:
+            return
+
+        self._drop({task.id})
+
+    def _drop(self, task_ids: set):
+        if not task_ids:
+            return
+
+        with self._lock:
+            # priority on the instance might have not been normalized to Decimal, so look in all buckets
+            for priority, bucket in self._buckets.items():
+                self._buckets[priority] = [task_id for task_id in bucket if task_id not in task_ids]
+
+    def entry_added(self, entry: Entry):
+        super().entry_added(entry)
+
+        with self._lock:
+            if entry.user_id in self._users:
+                # task_id might come straight from POST as a string
+                self._users[entry.user_id][1].add(int(entry.task_id))
+
+    def _load_tasks(self, now):
+        buckets = collections.defaultdict(list)
+        tasks = Task.objects.filter(state=Task.OPEN).order_by('-priority', '-id') \
+            .values_list('id', 'priority')[:self.cache_size]
+        for task_id, priority in tasks:
+            buckets[priority].append(task_id)
+
+        self._buckets = dict(buckets)
+        self._priorities = sorted(buckets.keys(), reverse=True)
+        self._loaded_at = now
+
+    def _contributed(self, user_id, now) -> set:
+        cached = self._users.get(user_id, None)
+        if cached is not None and now - cached[0] <= self.refresh_interval:
+            self._users.move_to_end(user_id)
+            return cached[1]
+
+        contributed = set(Entry.objects.filter(user_id=user_id).values_list('task_id', flat=True))
+        self._users[user_id] = (now, contributed)
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.users_cache_size:
+            self._users.popitem(last=False)
+
+        return contributed
+
+
+_choosers = {}
+
+
+def get_task_chooser() -> TaskChooser:
+    """
+    Returns chooser configured in MOONSHEEP['TASK_CHOOSER']
+    """
+    slug = MOONSHEEP['TASK_CHOOSER']
+
+    if slug not in _choosers:
+        chooser_cls = TaskChooser.implementations().get(slug, None)
+        if chooser_cls is None:
+            raise ImproperlyConfigured(f"There is no '{slug}' task chooser defined")
+
+        _choosers[slug] = chooser_cls()
+
+    return _choosers[slug]
@@ -1,3 +1,5 @@
 from .exporters import Exporter, FileExporter
 from .frictionless_data import FrictionlessFileExporter
+from .parquet import ParquetFileExporter
+from .streaming import StreamingFileExporter, CSVFileExporter, NDJSONFileExporter, PgCopyFileExporter
 from .xlsx import XLSXFileExporter
@@ -1,9 +1,110 @@
-import io
+import hashlib
+from calendar import timegm
 
-from rest_framework import routers, serializers, viewsets
-from django.apps import apps
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import pagination, routers, viewsets
+from rest_framework.response import Response
 
 from moonsheep.exporters.exporters import Exporter
+from moonsheep.models import DataVersion
+from moonsheep.settings import MOONSHEEP
+
+
+class CursorPagination(pagination.CursorPagination):
+    """
+    Pagination by an opaque cursor pointing to the last returned object
+
+    Unlike page numbers, it doesn't need `OFFSET` scans nor counting all objects, so it's cheap on deep pages
+    and pages don't shift when objects are added in the meantime. Response layout follows JSON:API pagination.
+
+    Opt in with `AppApi(app_label, pagination_class=CursorPagination)`.
+    """
+
+    cursor_query_param = 'page[cursor]'
+    page_size_query_param = 'page[size]'
+    max_page_size = 1000
+    ordering = 'pk'
+
+    def get_paginated_response(self, data):
+        return Response({
+            'results': data,
+            'meta': {
+                'pagination': {'size': self.page_size}
+            },
+            'links': {
+                'next': self.get_next_link(),
+                'prev': self.get_previous_link(),
+            }
+        })
+
+
+class ConditionalViewSetMixin:
+    """
+    Serves ETag & Last-Modified headers taken from app's `DataVersion` and answers conditional requests with 304
+
+    If `cache_timeout` is set, rendered responses are cached. Version is a part of the cache key,
+    so cached responses are dropped as soon as verified data is saved.
+    """
+
+    app_label: str = None
+    cache_timeout: int = None
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        version = DataVersion.current(self.app_label)
+        etag = f'W/"{version.version}"'
+        last_modified = timegm(version.modified_at.utctimetuple())
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            self._cache_key = self.cache_key(version, request) if self.cache_timeout else None
+            cached = cache.get(self._cache_key) if self._cache_key else None
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+            else:
+                response = handler(request, *args, **kwargs)
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def cache_key(self, version: DataVersion, request) -> str:
+        # negotiated media type, as the same url can be rendered in several formats
+        return 'moonsheep:api:' + hashlib.md5('\n'.join([
+            self.app_label, str(version.version), request.get_full_path(), request.accepted_media_type or ''
+        ]).encode('utf-8')).hexdigest()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+
+        key = getattr(self, '_cache_key', None)
+        if key and isinstance(response, Response) and response.status_code == 200:
+            response.render()
+            cache.set(key, (response.content, response['Content-Type']), self.cache_timeout)
+
+        return response
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        transaction.on_commit(DataVersion.bump)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        transaction.on_commit(DataVersion.bump)
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        transaction.on_commit(DataVersion.bump)
 
 
 class AppApi(Exporter):
@@ -12,17 +113,35 @@ class AppApi(Exporter):
 
     AppApi should be registered on project's urls as follows `path('api/opora/', include(AppApi('opora').urls)),`")
     """
-    def __init__(self, app_label):
+    def __init__(self, app_label, pagination_class=None, cache_timeout: int = None):
+        """
+        :param app_label: app which models are exposed
+        :param pagination_class: DRF pagination class, defaults to REST_FRAMEWORK['DEFAULT_PAGINATION_CLASS'];
+            use `CursorPagination` for big tables
+        :param cache_timeout: seconds for which rendered responses are cached, defaults to MOONSHEEP['API_CACHE_TIMEOUT'];
+            None disables caching
+        """
         super().__init__(app_label)
 
+        if cache_timeout is None:
+            cache_timeout = MOONSHEEP.get('API_CACHE_TIMEOUT', None)
+
         self.router = routers.DefaultRouter()
 
         # Iterate through all defined models in the app and create endpoints for them
         for slug, model_cls, serializer_cls, queryset in self.models():
-            viewset_cls = type(model_cls.__name__ + "ViewSetDefault", (viewsets.ModelViewSet,), dict(
+            attrs = dict(
                 queryset=queryset,
-                serializer_class=serializer_cls
-            ))
+                serializer_class=serializer_cls,
+                # default ordering used by ordering filters, cursor pagination needs one
+                ordering=('pk',),
+                app_label=app_label,
+                cache_timeout=cache_timeout,
+            )
+            if pagination_class is not None:
+                attrs['pagination_class'] = pagination_class
+            viewset_cls = type(model_cls.__name__ + "ViewSetDefault", (ConditionalViewSetMixin, viewsets.ModelViewSet),
+                               attrs)
 
             # Register endpoints
             self.router.register(slug, viewset_cls)
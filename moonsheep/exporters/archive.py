@@ -0,0 +1,87 @@
+"""
+Packing exported files into archives built on the fly, so they can be streamed to a client
+"""
+import io
+import tarfile
+import tempfile
+import time
+import zipfile
+from typing import Iterable, Iterator, Tuple
+
+Files = Iterable[Tuple[str, Iterable[bytes]]]
+"""(file name, generator of file's content) pairs, ie. returned by `StreamingFileExporter.files`"""
+
+
+class Pipe(io.RawIOBase):
+    """
+    Unseekable stream collecting written bytes until they are drained
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        self._position += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> Iterator[bytes]:
+        if self._chunks:
+            data = b''.join(self._chunks)
+            self._chunks = []
+            yield data
+
+
+def stream_zip(files: Files) -> Iterator[bytes]:
+    """
+    Returns generator of zip archive's content, written as files' content is generated
+    """
+    pipe = Pipe()
+    with zipfile.ZipFile(pipe, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for fname, content in files:
+            with archive.open(fname, 'w', force_zip64=True) as f:
+                for piece in content:
+                    f.write(piece)
+                    yield from pipe.drain()
+            yield from pipe.drain()
+
+    yield from pipe.drain()
+
+
+def stream_tar_gz(files: Files, spool_size: int = 10 * 1024 * 1024) -> Iterator[bytes]:
+    """
+    Returns generator of tar.gz archive's content
+
+    Tar needs size of each file upfront, so a file is gathered first in memory (or in a temporary file if it's
+    bigger than `spool_size`) and then written to the archive.
+    """
+    pipe = Pipe()
+    with tarfile.open(fileobj=pipe, mode='w|gz') as archive:
+        for fname, content in files:
+            with tempfile.SpooledTemporaryFile(max_size=spool_size) as spool:
+                for piece in content:
+                    spool.write(piece)
+
+                info = tarfile.TarInfo(fname)
+                info.size = spool.tell()
+                info.mtime = time.time()
+                spool.seek(0)
+                archive.addfile(info, spool)
+
+            yield from pipe.drain()
+
+    yield from pipe.drain()
+
+
+ARCHIVES = {
+    'zip': (stream_zip, 'application/zip'),
+    'tar.gz': (stream_tar_gz, 'application/gzip'),
+}
+"""Archive format -> (function streaming it, content type)"""
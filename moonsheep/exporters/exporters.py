@@ -1,22 +1,48 @@
 import io
 from abc import ABC, abstractmethod
-from typing import Union
+from typing import Iterable, Iterator, Union
 
 import pandas as pd
 from django.apps import apps
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Max
 from rest_framework import serializers
 
+from moonsheep.models import ExportWatermark
 from moonsheep.plugins import Interface
 
 
+def binary_stream(output: io.IOBase) -> io.IOBase:
+    """
+    Returns binary stream underlying a text stream, ie. `sys.stdout.buffer` for `sys.stdout`
+
+    Other streams are returned as they are.
+    """
+    if isinstance(output, io.TextIOBase) and hasattr(output, 'buffer'):
+        output.flush()
+        return output.buffer
+
+    return output
+
+
 class Exporter(Interface):
-    def __init__(self, app_label):
+    def __init__(self, app_label, delta: str = None):
+        """
+        :param app_label: app which models are exported
+        :param delta: name of a delta export. If given only objects past the watermark (see `Exported.watermark`)
+            of the last export of that name are exported. Call `save_watermarks` after the export succeeded.
+        """
         self.app_label = app_label
+        self.delta = delta
+        self.deltas = {}
+        """slug -> {'field', 'since', 'until'} describing range of objects exported in a delta export"""
 
-    def models(self):
+    def models(self, only: Iterable[str] = None):
         """
         Returns generator that retrieves all data and meta information needed to export data.
 
+        :param only: slugs of models to be exported, all models of the app by default
+
         Usage:
         for slug, model_cls, serializer_cls, queryset in self.models():
             serializer = serializer_cls(queryset, many=True)
@@ -26,6 +52,9 @@ class Exporter(Interface):
         :return:
         """
         for slug, model_cls in apps.get_app_config(self.app_label).models.items():
+            if only is not None and slug not in only:
+                continue
+
             # Customize exported fields by adding `class Exported` on the model
             exported = getattr(model_cls, 'Exported', None)
             exported_fields = getattr(exported, 'fields', None)
@@ -49,14 +78,76 @@ class Exporter(Interface):
             else:
                 queryset = model_cls.objects.all()
 
-            yield slug, model_cls, serializer_cls, queryset.order_by('pk')
+            queryset = queryset.order_by('pk')
+            if self.delta is not None:
+                queryset = self.delta_queryset(slug, model_cls, queryset)
+
+            yield slug, model_cls, serializer_cls, queryset
+
+    def delta_queryset(self, slug, model_cls, queryset):
+        """
+        Limits queryset to objects past the watermark of the last delta export
+
+        Objects are compared on `Exported.watermark` field, which has to be declared on the model.
+        Set it to a timestamp updated when an object is saved or verified, or to `pk` for models
+        whose objects are never changed after being added (ie. written only by `save_verified_data`).
+        """
+        field = getattr(getattr(model_cls, 'Exported', None), 'watermark', None)
+        if field is None:
+            raise ImproperlyConfigured(
+                f"Set `Exported.watermark` on {model_cls.__name__} to export it in delta exports, "
+                f"ie. a timestamp updated on save or 'pk' if its objects are never modified")
+
+        watermark = ExportWatermark.objects.filter(name=self.delta, app_label=self.app_label, model=slug).first()
+        since = watermark.value if watermark is not None else None
+        if since is not None:
+            queryset = queryset.filter(**{field + '__gt': since})
+
+        # objects added during the export will come with the next one
+        until = queryset.aggregate(until=Max(field))['until']
+        if until is not None:
+            queryset = queryset.filter(**{field + '__lte': until})
+            until = str(until)
+        else:
+            until = since
+
+        self.deltas[slug] = {'field': field, 'since': since, 'until': until}
+        return queryset
+
+    def save_watermarks(self):
+        """
+        Remembers how far the delta export went, so the next one starts from there
+
+        Only models that were exported are recorded.
+        """
+        for slug, delta in self.deltas.items():
+            ExportWatermark.objects.update_or_create(name=self.delta, app_label=self.app_label, model=slug,
+                                                     defaults={'value': delta['until']})
 
 
 class FileExporter(Exporter, ABC):
+    chunk_size = 2000
+
     @abstractmethod
     def export(self, output: Union[io.IOBase, str], **options):
         pass
 
+    def rows(self, serializer_cls, queryset) -> Iterator[list]:
+        """
+        Returns generator of serialized objects, chunk by chunk
+
+        Objects are read with a server-side cursor, so only `chunk_size` of them is kept in memory at once.
+        """
+        chunk = []
+        for obj in queryset.iterator(chunk_size=self.chunk_size):
+            chunk.append(obj)
+            if len(chunk) >= self.chunk_size:
+                yield serializer_cls(chunk, many=True).data
+                chunk = []
+
+        if chunk:
+            yield serializer_cls(chunk, many=True).data
+
 
 class PandasExporter(FileExporter, ABC):
     """
@@ -1,9 +1,14 @@
 import json
 import os
-import subprocess
+import tarfile
 import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+import pandas as pd
+from django.db import connection
+
 from moonsheep.exporters.exporters import PandasExporter
 
 
@@ -16,6 +21,7 @@ class FrictionlessFileExporter(PandasExporter):
     """
 
     label = "Frictionless"
+    workers = min(4, os.cpu_count() or 1)
 
     @staticmethod
     def type_from_pandas(type):
@@ -33,11 +39,47 @@ class FrictionlessFileExporter(PandasExporter):
         print(f"Warning: Type not mapped: {type}")
         return 'object'
 
+    def export_model(self, slug, serializer_cls, queryset, output_dir) -> dict:
+        """
+        Writes model's data to a csv file
+
+        :return: description of the resource
+        """
+        data_frame = pd.DataFrame(serializer_cls(queryset, many=True).data)
+
+        fname = slug + '.csv'
+        data_frame.to_csv(os.path.join(output_dir, fname), index=False)
+
+        return {
+            "path": fname,
+            "profile": "tabular-data-resource",
+            "schema": {
+                "fields": [{
+                    "name": fld,
+                    "type": FrictionlessFileExporter.type_from_pandas(ftype)
+                    # TODO while creating dataframe ask model for specific field type
+                    #  (now we have string expressed as object)
+                    # TODO description from model
+                } for fld, ftype in data_frame.dtypes.items()]
+                # TODO ask model and add "primaryKey": "id"
+                # TODO is defining relations between objects possible here?
+            }
+        }
+
+    def _export_model_in_thread(self, slug, serializer_cls, queryset, output_dir) -> dict:
+        try:
+            return self.export_model(slug, serializer_cls, queryset, output_dir)
+        finally:
+            # each thread opens its own connection
+            connection.close()
+
     def export(self, output, **options):
         """
         :param output: a path. If output ends with .tar.gz or .zip then archive file will be created.
             Otherwise output is treated as directory name and no compression will be performed.
         :param options:
+            - workers: number of models exported at once, each in its own thread and database connection.
+              Defaults to `workers` attribute; with 1 models are exported one by one in the current thread.
         :return:
         """
         created_at = datetime.now().isoformat()
@@ -50,48 +92,41 @@ class FrictionlessFileExporter(PandasExporter):
         }
         # TODO support output as stream
 
-        compression_cmd = None
-        if output.endswith('.zip'):
-            output_dir = tempfile.mkdtemp()
-            output_absolute = os.path.join(os.getcwd(), output)
-            print(output_absolute)
-            compression_cmd = f'(cd {output_dir} && zip {output_absolute} *)'
-
-        elif output.endswith('.tar.gz'):
-            output_dir = tempfile.mkdtemp()
-            compression_cmd = f'find {output_dir} -printf "%P\n" | tar -czf {output} --no-recursion -C {output_dir} -T -'
-
-        else:
-            output_dir = output
-            os.makedirs(output_dir, exist_ok=True)
-
-        for slug, data_frame in self.data_frames():
-            fname = slug + '.csv'
-
-            data_frame.to_csv(os.path.join(output_dir, fname), index=False)
-
-            datapackage['resources'].append({
-                "path": fname,
-                "profile": "tabular-data-resource",
-                "schema": {
-                    "fields": [{
-                        "name": fld,
-                        "type": FrictionlessFileExporter.type_from_pandas(ftype)
-                        # TODO while creating dataframe ask model for specific field type
-                        #  (now we have string expressed as object)
-                        # TODO description from model
-                    } for fld, ftype in data_frame.dtypes.items()]
-                    # TODO ask model and add "primaryKey": "id"
-                    # TODO is defining relations between objects possible here?
-                }
-            })
-
-        # write datapackage.json
-        with open(os.path.join(output_dir, 'datapackage.json'), 'w') as f:
-            f.write(json.dumps(datapackage, indent=2))
-
-        if compression_cmd is not None:
-            try:
-                subprocess.run(compression_cmd, shell=True, check=True)
-            finally:
-                subprocess.run(["rm", "-rf", output_dir], check=True)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            if output.endswith('.zip') or output.endswith('.tar.gz'):
+                output_dir = temp_dir
+            else:
+                output_dir = output
+                os.makedirs(output_dir, exist_ok=True)
+
+            models = list(self.models())
+            workers = options.get('workers', None) or self.workers
+            if workers > 1 and len(models) > 1:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = [executor.submit(self._export_model_in_thread, slug, serializer_cls, queryset, output_dir)
+                               for slug, model_cls, serializer_cls, queryset in models]
+                    datapackage['resources'] = [future.result() for future in futures]
+            else:
+                datapackage['resources'] = [self.export_model(slug, serializer_cls, queryset, output_dir)
+                                            for slug, model_cls, serializer_cls, queryset in models]
+
+            if self.delta is not None:
+                # describe which objects are included in each resource
+                datapackage['delta'] = self.delta
+                for (slug, model_cls, serializer_cls, queryset), resource in zip(models, datapackage['resources']):
+                    resource['delta'] = self.deltas[slug]
+
+            # write datapackage.json
+            with open(os.path.join(output_dir, 'datapackage.json'), 'w') as f:
+                f.write(json.dumps(datapackage, indent=2))
+
+            fnames = ['datapackage.json'] + [resource['path'] for resource in datapackage['resources']]
+            if output.endswith('.zip'):
+                with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as archive:
+                    for fname in fnames:
+                        archive.write(os.path.join(output_dir, fname), fname)
+
+            elif output.endswith('.tar.gz'):
+                with tarfile.open(output, 'w:gz') as archive:
+                    for fname in fnames:
+                        archive.add(os.path.join(output_dir, fname), fname)
@@ -0,0 +1,138 @@
+import json
+from typing import Iterator
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, FieldDoesNotExist
+from django.db import models
+
+from moonsheep.exporters.archive import Pipe
+from moonsheep.exporters.streaming import StreamingFileExporter
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImproperlyConfigured("Parquet export requires pyarrow: pip install django-moonsheep[parquet]") from e
+
+    return pyarrow
+
+
+class ParquetFileExporter(StreamingFileExporter):
+    """
+    Exports each model to an Apache Parquet file
+
+    Column types are derived from model fields, ie. DecimalField(max_digits=6, decimal_places=3) -> decimal128(6, 3).
+    Objects are read in chunks of `chunk_size` and each chunk is written as a row group.
+    Fields without a matching Arrow type (ie. JSON) are written as strings, many-to-many fields are left out.
+
+    Requires pyarrow, install it with `pip install django-moonsheep[parquet]`
+    """
+
+    label = "Parquet"
+    extension = 'parquet'
+    chunk_size = 50000
+
+    @staticmethod
+    def arrow_type(field: models.Field):
+        """
+        :return: Arrow type of values in a column of given model field or None if it should be written as string
+        """
+        pa = _pyarrow()
+
+        if field.is_relation:
+            return ParquetFileExporter.arrow_type(field.target_field)
+
+        internal_type = field.get_internal_type()
+        if internal_type in ('AutoField', 'IntegerField', 'PositiveIntegerField'):
+            return pa.int32()
+        if internal_type in ('BigAutoField', 'BigIntegerField', 'PositiveBigIntegerField'):
+            return pa.int64()
+        if internal_type in ('SmallAutoField', 'SmallIntegerField', 'PositiveSmallIntegerField'):
+            return pa.int16()
+        if internal_type in ('BooleanField', 'NullBooleanField'):
+            return pa.bool_()
+        if internal_type == 'FloatField':
+            return pa.float64()
+        if internal_type == 'DecimalField':
+            return pa.decimal128(field.max_digits, field.decimal_places)
+        if internal_type in ('CharField', 'TextField', 'EmailField', 'URLField', 'SlugField', 'FilePathField',
+                             'FileField', 'ImageField', 'GenericIPAddressField'):
+            return pa.string()
+        if internal_type == 'DateField':
+            return pa.date32()
+        if internal_type == 'DateTimeField':
+            return pa.timestamp('us', tz='UTC' if settings.USE_TZ else None)
+        if internal_type == 'TimeField':
+            return pa.time64('us')
+        if internal_type == 'DurationField':
+            return pa.duration('us')
+        if internal_type == 'BinaryField':
+            return pa.binary()
+
+        return None
+
+    @staticmethod
+    def to_string(value):
+        if value is None or isinstance(value, str):
+            return value
+        if isinstance(value, (dict, list)):
+            return json.dumps(value)
+        return str(value)
+
+    def schema(self, serializer_cls, model_cls):
+        """
+        :return: (Arrow schema, exported field names)
+        """
+        pa = _pyarrow()
+
+        fields = []
+        names = []
+        for name in serializer_cls().fields.keys():
+            try:
+                field = model_cls._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue  # computed in the serializer
+            if not field.concrete or field.many_to_many:
+                continue
+
+            fields.append(pa.field(name, self.arrow_type(field) or pa.string(), nullable=field.null))
+            names.append(name)
+
+        return pa.schema(fields), names
+
+    def serialize(self, serializer_cls, queryset) -> Iterator[bytes]:
+        pa = _pyarrow()
+
+        schema, names = self.schema(serializer_cls, queryset.model)
+        as_string = [pa.types.is_string(fld.type) for fld in schema]
+
+        pipe = Pipe()
+        writer = pa.parquet.ParquetWriter(pipe, schema)
+        try:
+            chunk = []
+            for row in queryset.values_list(*names).iterator(chunk_size=self.chunk_size):
+                chunk.append(row)
+                if len(chunk) >= self.chunk_size:
+                    writer.write_batch(self._batch(chunk, schema, as_string))
+                    chunk = []
+                    yield from pipe.drain()
+
+            if chunk:
+                writer.write_batch(self._batch(chunk, schema, as_string))
+        finally:
+            writer.close()
+
+        yield from pipe.drain()
+
+    def _batch(self, rows, schema, as_string):
+        pa = _pyarrow()
+
+        columns = [list(column) for column in zip(*rows)]
+        for i, column in enumerate(columns):
+            if as_string[i]:
+                columns[i] = [self.to_string(value) for value in column]
+
+        return pa.record_batch([pa.array(column, type=fld.type) for column, fld in zip(columns, schema)],
+                               schema=schema)
@@ -0,0 +1,229 @@
+import csv
+import io
+import json
+import os
+import queue
+import threading
+from abc import ABC, abstractmethod
+from typing import Iterable, Iterator, Tuple, Union
+
+from django.apps import apps
+from django.core.exceptions import ImproperlyConfigured, FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+
+from moonsheep.exporters.exporters import FileExporter, binary_stream
+
+
+class StreamingFileExporter(FileExporter, ABC):
+    """
+    Base class for exporters writing rows incrementally, one file per model
+
+    Objects are read with a server-side cursor and serialized in chunks of `chunk_size`,
+    so memory used doesn't depend on the size of exported tables.
+    """
+
+    extension: str = None
+
+    def files(self, only: Iterable[str] = None) -> Iterator[Tuple[str, Iterator[bytes]]]:
+        """
+        Returns generator of (file name, generator of file's content) for all exported models
+
+        :param only: slugs of models to be exported, all models of the app by default
+        """
+        for slug, model_cls, serializer_cls, queryset in self.models(only=only):
+            yield slug + '.' + self.extension, self.serialize(serializer_cls, queryset)
+
+    @abstractmethod
+    def serialize(self, serializer_cls, queryset) -> Iterator[bytes]:
+        """
+        Returns generator of encoded file's content, a piece per chunk of objects
+        """
+        pass
+
+    def export(self, output: Union[io.IOBase, str], **options):
+        """
+        :param output: a directory to write files of all models to or a stream to write one model to
+        :param options:
+            - model: slug of the model to be written to a stream, required if app has more than one model
+        """
+        if isinstance(output, str):
+            os.makedirs(output, exist_ok=True)
+            for fname, content in self.files():
+                with open(os.path.join(output, fname), 'wb') as f:
+                    for piece in content:
+                        f.write(piece)
+            return
+
+        # other models are not even queried, so delta export of one model doesn't move watermarks of the others
+        slugs = list(apps.get_app_config(self.app_label).models.keys())
+        slug = options.get('model', None)
+        if slug is None:
+            if len(slugs) != 1:
+                raise ValueError(f"Choose which model to export to a stream: "
+                                 f"{', '.join(sorted(s + '.' + self.extension for s in slugs))}")
+            slug = slugs[0]
+        elif slug.endswith('.' + self.extension):
+            slug = slug[:-len(self.extension) - 1]
+
+        if slug not in slugs:
+            raise ValueError(f"There is no model {slug}.{self.extension} to export")
+
+        [(fname, content)] = self.files(only=[slug])
+
+        output = binary_stream(output)
+        if isinstance(output, io.TextIOBase):
+            for piece in content:
+                output.write(piece.decode('utf-8'))
+            return
+
+        for piece in content:
+            output.write(piece)
+
+
+class CSVFileExporter(StreamingFileExporter):
+    """
+    Exports each model to a CSV file, nested values are written as JSON
+    """
+
+    label = "CSV"
+    extension = 'csv'
+
+    def serialize(self, serializer_cls, queryset) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        field_names = list(serializer_cls().fields.keys())
+        writer.writerow(field_names)
+
+        for chunk in self.rows(serializer_cls, queryset):
+            for row in chunk:
+                writer.writerow([self.format_value(row[fld]) for fld in field_names])
+
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+        # header of an empty table
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+
+    @staticmethod
+    def format_value(value):
+        if value is None:
+            return ''
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, cls=DjangoJSONEncoder)
+        return value
+
+
+class NDJSONFileExporter(StreamingFileExporter):
+    """
+    Exports each model to a newline delimited JSON file (http://ndjson.org/), one object per line
+    """
+
+    label = "NDJSON"
+    extension = 'ndjson'
+
+    def serialize(self, serializer_cls, queryset) -> Iterator[bytes]:
+        for chunk in self.rows(serializer_cls, queryset):
+            yield ''.join(json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in chunk).encode('utf-8')
+
+
+class PgCopyFileExporter(StreamingFileExporter):
+    """
+    Exports each model to a CSV file using PostgreSQL's `COPY ... TO STDOUT`
+
+    Rows are produced by the database instead of being serialized one by one, which is much faster on big tables.
+    Exported fields and querysets are customized the same way as for other exporters, but many-to-many fields
+    are left out and values are formatted by the database (ie. booleans as `t`/`f`).
+    """
+
+    label = "CSV (PostgreSQL COPY)"
+    extension = 'csv'
+    read_size = 64 * 1024
+
+    def serialize(self, serializer_cls, queryset) -> Iterator[bytes]:
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            raise ImproperlyConfigured(f"{self.__class__.__name__} requires PostgreSQL database")
+
+        model_cls = queryset.model
+        columns = []
+        for name in serializer_cls().fields.keys():
+            try:
+                field = model_cls._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue  # computed in the serializer
+            if field.concrete and not field.many_to_many:
+                columns.append(name)
+
+        sql, params = queryset.values_list(*columns).query.sql_with_params()
+
+        # header quoted the same way as rows written by COPY
+        header = io.StringIO()
+        csv.writer(header, lineterminator='\n').writerow(columns)
+        yield header.getvalue().encode('utf-8')
+
+        with connection.cursor() as cursor:
+            query = cursor.mogrify(sql, params).decode('utf-8')
+            yield from self.copy_to(cursor, f"COPY ({query}) TO STDOUT WITH (FORMAT csv, ENCODING 'UTF8')")
+
+    def copy_to(self, cursor, sql: str) -> Iterator[bytes]:
+        """
+        Runs `COPY ... TO STDOUT` yielding its output in pieces of about `read_size` while it's being produced
+
+        COPY pushes rows to a file, so it's run in a thread writing to a bounded queue read here.
+        If the generator is closed early, COPY is aborted.
+        """
+        pieces = queue.Queue(maxsize=16)
+        cancelled = threading.Event()
+        errors = []
+        read_size = self.read_size
+
+        class QueueWriter:
+            def __init__(self):
+                self.buffer = bytearray()
+
+            def write(self, data):
+                if cancelled.is_set():
+                    raise IOError("Export was cancelled")
+                self.buffer += data
+                if len(self.buffer) >= read_size:
+                    self.flush()
+
+            def flush(self):
+                if self.buffer:
+                    pieces.put(bytes(self.buffer))
+                    self.buffer = bytearray()
+
+        def copy():
+            try:
+                writer = QueueWriter()
+                cursor.copy_expert(sql, writer)
+                writer.flush()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                pieces.put(None)
+
+        thread = threading.Thread(target=copy, daemon=True)
+        thread.start()
+        try:
+            while True:
+                piece = pieces.get()
+                if piece is None:
+                    break
+                yield piece
+        finally:
+            cancelled.set()
+            # unblock the writer if the generator was closed early
+            while thread.is_alive():
+                try:
+                    pieces.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            thread.join()
+
+        if errors:
+            raise errors[0]
@@ -1,13 +1,44 @@
-import pandas as pd
+import io
+import json
 
-from moonsheep.exporters.exporters import PandasExporter
+from django.core.serializers.json import DjangoJSONEncoder
+from openpyxl import Workbook
 
+from moonsheep.exporters.exporters import FileExporter, binary_stream
+
+
+class XLSXFileExporter(FileExporter):
+    """
+    Exports data placing each model in a separate sheet
+
+    Workbook is created in write-only mode and rows are appended chunk by chunk,
+    so cells are not kept in memory (openpyxl spools sheets to temporary files).
+    """
 
-class XLSXFileExporter(PandasExporter):
     def export(self, output, **options):
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            for slug, data_frame in self.data_frames():
-                data_frame.to_excel(writer, sheet_name=slug, index=False)
-                # File "/usr/lib/python3.6/zipfile.py", line 746, in write
-                #     n = self.fp.write(data)
-                # TODO error when using sys.stdout TypeError: write() argument must be str, not bytes
+        """
+        :param output: file name or a binary stream; for text streams such as `sys.stdout` underlying buffer is used
+        """
+        if not isinstance(output, str):
+            output = binary_stream(output)
+            if isinstance(output, io.TextIOBase):
+                raise ValueError("XLSX can be written only to a binary stream")
+
+        workbook = Workbook(write_only=True)
+        for slug, model_cls, serializer_cls, queryset in self.models():
+            sheet = workbook.create_sheet(title=slug)
+
+            field_names = list(serializer_cls().fields.keys())
+            sheet.append(field_names)
+
+            for chunk in self.rows(serializer_cls, queryset):
+                for row in chunk:
+                    sheet.append([self.format_value(row[fld]) for fld in field_names])
+
+        workbook.save(output)
+
+    @staticmethod
+    def format_value(value):
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, cls=DjangoJSONEncoder)
+        return value
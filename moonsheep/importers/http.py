@@ -1,13 +1,19 @@
+import collections
 import re
+import threading
+import time
 import urllib
 import urllib.parse
-from typing import Sequence, List, Pattern
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Sequence, List, Pattern, Iterator, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from django.core.management import BaseCommand
 from django.http import QueryDict
 
-from moonsheep.importers.importers import IDocumentImporter
+from moonsheep.importers.importers import IDocumentImporter, Frontier
 from moonsheep.plugins import Plugin, implements
 
 
@@ -19,6 +25,9 @@ class HttpDocumentImporter(Plugin):
     # View - template
     template_name = "importers/http.html"
 
+    backoff_factor = 0.5
+    """Seconds to wait before retrying a failed request, doubled with each retry"""
+
     # Default label, may be overridden in settings TODO
     def __str__(self):
         # TODO modify if there are several
@@ -39,34 +48,134 @@ class HttpDocumentImporter(Plugin):
         regexp = r'<a\s+href="([^"]+)"\s*>([^<]+)<'
         return [g[0] for g in re.findall(regexp, html_contents) if not g[1].startswith('..')]
 
-    def find_urls(self, host: str, pattern: str, paths: List[str], log=None) -> List[str]:
-        path_queue = [urllib.parse.urljoin(host, path) for path in paths]
+    resumable = True
+    """find_urls can resume crawling from a saved frontier"""
+
+    def find_urls(self, host: str, pattern: str, paths: List[str], log=None, workers: int = 4,
+                  rate_limit: float = None, retries: int = 3, frontier: Frontier = None) -> Iterator[str]:
+        """
+        Crawls directory listings yielding urls of files as soon as their listing is downloaded
+
+        Listings are downloaded concurrently by `workers` threads sharing one pooled session.
+        Failed requests (connection errors, 429 & 5xx responses) are retried with a backoff,
+        other error responses raise `requests.HTTPError`.
+
+        :param host: host of relative paths
+        :param pattern: *-wildcarded pattern of file names to be yielded, ie. *.pdf
+        :param paths: files and directories (ending with /) to be crawled, may be given as whitespace separated string
+        :param log: function called with progress messages
+        :param workers: maximal number of listings downloaded at once
+        :param rate_limit: maximal number of requests per second sent to one host, None for no limit
+        :param retries: number of retries of a failed request
+        :param frontier: crawl state kept up to date while crawling. If it holds paths of an interrupted crawl,
+            crawling is resumed from them and `paths` are ignored.
+        """
+        if isinstance(paths, str):
+            paths = paths.split()
+
+        if frontier is None:
+            frontier = Frontier()
+        if not frontier:
+            frontier.queued.extend(urllib.parse.urljoin(host, path) for path in paths)
 
         if pattern:
             pattern_re: Pattern = re.compile(pattern.replace('.', '\\.').replace('*', '.*'))
 
-        while path_queue:
-            path = path_queue.pop()
+        session = self.session(retries=retries, pool_size=workers)
+        limiter = RateLimiter(rate_limit)
+
+        with session, ThreadPoolExecutor(max_workers=workers) as executor:
+            downloading = set()
+            # directories queued more than once (given twice or linked from several listings) are crawled once
+            seen = set()
+            while frontier.queued or downloading:
+                # only a few listings are requested ahead, so crawling goes on as urls are consumed
+                while frontier.queued and len(downloading) < workers:
+                    path = frontier.queued.popleft()
+
+                    # if directory
+                    if path.endswith('/'):
+                        if path in seen:
+                            continue
+                        seen.add(path)
+
+                        if log:
+                            log(f"Downloading {path}")
+                        frontier.open[path] = None
+                        downloading.add(executor.submit(self.download_listing, session, limiter, path))
+
+                    elif not pattern or pattern_re.match(path):
+                        yield path
+
+                if not downloading:
+                    continue
+
+                done, downloading = wait(downloading, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, entries = future.result()
+                    dirs = []
+                    for entry in entries:
+                        if not (entry.startswith('http://') or entry.startswith('https://')):
+                            entry = path + entry
+
+                        if entry.endswith('/'):  # dir
+                            if entry not in seen:
+                                dirs.append(entry)
+
+                        elif not pattern or pattern_re.match(entry):  # file
+                            yield entry
+
+                    # directory is replaced by its subdirectories once all its files were consumed
+                    frontier.queued.extend(dirs)
+                    del frontier.open[path]
+                    frontier.updated()
+
+    def session(self, retries: int, pool_size: int) -> requests.Session:
+        """
+        Returns a session keeping up to `pool_size` connections per host and retrying failed requests
+        """
+        retry = Retry(total=retries, backoff_factor=self.backoff_factor, status_forcelist=(429, 500, 502, 503, 504))
+        adapter = HTTPAdapter(pool_maxsize=pool_size, max_retries=retry)
+
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    @staticmethod
+    def download_listing(session: requests.Session, limiter: 'RateLimiter', path: str) -> Tuple[str, List[str]]:
+        """
+        :return: (path, entries of its listing)
+        """
+        limiter.wait(path)
+        response = session.get(path)
+        response.raise_for_status()
+
+        return path, HttpDocumentImporter.listdir(response.text)
+
 
-            # if directory
-            if path.endswith('/'):
-                if log:
-                    log(f"Downloading {path}")
+class RateLimiter:
+    """
+    Spaces out requests sent to each host, so there are at most `rate` requests per second; thread-safe
+    """
 
-                response = requests.get(path)
-                # TODO test response.status_code
-                for entry in HttpDocumentImporter.listdir(response.text):
-                    if not (entry.startswith('http://') or entry.startswith('https://')):
-                        entry = path + entry
+    def __init__(self, rate: float = None):
+        self.interval = 1 / rate if rate else 0
+        self.next_at = {}
+        self.lock = threading.Lock()
 
-                    if entry.endswith('/'):  # dir
-                        path_queue.append(entry)
+    def wait(self, url: str):
+        if not self.interval:
+            return
 
-                    elif not pattern or pattern_re.match(entry):  # file
-                        yield entry
+        host = urllib.parse.urlsplit(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            at = max(now, self.next_at.get(host, now))
+            self.next_at[host] = at + self.interval
 
-            elif not pattern or pattern_re.match(path):
-                yield path
+        if at > now:
+            time.sleep(at - now)
 
 
 # Initialize and activate
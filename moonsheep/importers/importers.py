@@ -1,16 +1,27 @@
+import collections
+import datetime
+import logging
+import time
+import traceback
+import uuid
 from abc import abstractmethod
-from typing import Sequence
+from typing import List, Sequence
 
-from django.db import IntegrityError
-from django.http import HttpResponseBadRequest, HttpResponseRedirect
+from django.db import transaction
+from django.db.models import F, Q
+from django.http import HttpResponseBadRequest, HttpResponseRedirect, JsonResponse
+from django.shortcuts import get_object_or_404
 from django.urls import reverse
-from django.views.generic.base import TemplateView
+from django.utils import timezone
+from django.views.generic.base import TemplateView, View
 
-from moonsheep.models import Task
+from moonsheep.models import ImportJob, Task
 from moonsheep.plugins import PluginError, PCAInterface
 from moonsheep.registry import TASK_TYPES
 from moonsheep.settings import MOONSHEEP
 
+logger = logging.getLogger(__name__)
+
 
 class IDocumentImporter(PCAInterface):
     @abstractmethod
@@ -23,8 +34,48 @@ class IDocumentImporter(PCAInterface):
         pass
 
 
+class Frontier:
+    """
+    Paths that are still to be crawled by a resumable importer (having `resumable = True`)
+
+    Importer's `find_urls(frontier=...)` keeps it up to date, so between yielded urls it consistently describes
+    the rest of the crawl: directories being downloaded or consumed are kept until all their urls were yielded.
+    """
+
+    def __init__(self, paths: List[str] = None):
+        self.queued = collections.deque(paths or [])
+        self.open = {}
+        """Directories being downloaded or consumed, dict keeps them ordered"""
+
+        self.on_update = None
+        """Called by the importer after a directory was crawled completely, ie. to checkpoint a slow crawl"""
+
+    def updated(self):
+        if self.on_update is not None:
+            self.on_update()
+
+    def paths(self) -> List[str]:
+        return list(self.open) + list(self.queued)
+
+    def __bool__(self):
+        return bool(self.queued or self.open)
+
+
 # TODO move it to BaseDocumentImporter once it is created
-def import_documents(importer, tasks_to_create=[], **options):
+def import_documents(importer, tasks_to_create=[], *, batch_size: int = 1000, checkpoint=None,
+                     checkpoint_interval: float = 60, **options) -> int:
+    """
+    Creates documents with their initial tasks for urls found by the importer
+
+    Urls are inserted in batches of `batch_size` with `bulk_create`, the same goes for tasks.
+    Urls already imported are skipped, also when they're inserted concurrently by another import.
+
+    :param checkpoint: function called after each batch with numbers of processed urls and created documents
+    :param checkpoint_interval: seconds after which a smaller batch is inserted and checkpointed, so a slow crawl
+        saves its progress too. With a resumable importer it's also checked after each crawled directory,
+        even if no urls were found.
+    :return: number of created documents
+    """
     if not tasks_to_create:
         tasks_to_create = MOONSHEEP['DOCUMENT_INITIAL_TASKS']
 
@@ -34,38 +85,170 @@ def import_documents(importer, tasks_to_create=[], **options):
 
     dry_run = options.pop('dry_run', False)
 
-    # TODO options should be passed here or during importer construction?
-    # when do we have an instance of importer, when a class available?
-    for url in importer.find_urls(**options):
-        print(f"Creating {model_label}[url={url}] with tasks {', '.join(tasks_to_create)}")
-        if dry_run:
-            continue
+    def import_batch(urls) -> int:
+        # also drops duplicates found by the importer, keeping the order
+        urls = list(dict.fromkeys(urls))
+        existing = set(model.objects.filter(url__in=urls).values_list('url', flat=True))
+
+        new_urls = []
+        for url in urls:
+            if url in existing:
+                print(f"Skipping {model_label}[url={url}] as duplicate")
+            else:
+                print(f"Creating {model_label}[url={url}] with tasks {', '.join(tasks_to_create)}")
+                new_urls.append(url)
+
+        if dry_run or not new_urls:
+            return len(new_urls)
 
-        # TODO can we create/insert many at once?
         # We expect that the DOCUMENT_MODEL should have url field
         # TODO one might not want to create object instantly, but only after task is cross-checked
         # in the domain db we rather want to have only filled in data
         # maybe this should be steered by on_document_create hook that might be implemented (and also customized)
         # TODO doc Document should have url field, and no other field should be required on the model
+        with transaction.atomic():
+            # ids are not returned when conflicts are ignored, so they are queried afterwards
+            model.objects.bulk_create([model(url=url) for url in new_urls], ignore_conflicts=True)
+            doc_ids = dict(model.objects.filter(url__in=new_urls).values_list('url', 'id'))
+
+            # Create needed tasks, duplicates violate unique (type, params) and are skipped
+            Task.objects.bulk_create([
+                Task(
+                    type=t,
+                    params={
+                        'url': url,
+                    },
+                    doc_id=doc_ids[url],  # pointer to document object, might be helpful for debugging
+                    priority=1.0,  # TODO compute when setting https://github.com/themoonsheep/moonsheep/issues/50
+                ) for url in new_urls for t in tasks_to_create
+            ], ignore_conflicts=True)
+
+        return len(new_urls)
+
+    created = 0
+    batch = []
+    checkpointed_at = time.monotonic()
+
+    def flush():
+        nonlocal created, batch, checkpointed_at
+        batch_created = import_batch(batch) if batch else 0
+        created += batch_created
+        if checkpoint:
+            checkpoint(len(batch), batch_created)
+        batch = []
+        checkpointed_at = time.monotonic()
+
+    def checkpoint_due() -> bool:
+        return checkpoint is not None and time.monotonic() - checkpointed_at >= checkpoint_interval
+
+    frontier = options.get('frontier', None)
+    if frontier is not None:
+        frontier.on_update = lambda: flush() if checkpoint_due() else None
+
+    # TODO options should be passed here or during importer construction?
+    # when do we have an instance of importer, when a class available?
+    for url in importer.find_urls(**options):
+        batch.append(url)
+        if len(batch) >= batch_size or checkpoint_due():
+            flush()
+
+    if batch:
+        flush()
+
+    return created
+
+
+class ImportJobLost(Exception):
+    """
+    Raised in a worker which job was taken over by another worker
+    """
+    pass
+
+
+def _update_job(job: ImportJob, **fields):
+    """
+    Saves job's fields unless the job was taken over by another worker in the meantime
+
+    :raise ImportJobLost: if the job is not owned by this worker anymore
+    """
+    if not ImportJob.objects.filter(pk=job.pk, worker_id=job.worker_id).update(updated_at=timezone.now(), **fields):
+        raise ImportJobLost(f"{job} was taken over by another worker")
+
+
+def run_import_job(job: ImportJob, batch_size: int = 1000, checkpoint_interval: float = 60):
+    """
+    Runs import job checkpointing its progress after each batch
+
+    A resumable importer continues from job's frontier, others find all urls again,
+    while documents imported before are skipped as duplicates.
+
+    Progress is saved only while the job is owned by this worker (see `claim_import_job`).
+    If it was taken over, ie. this worker was considered gone, the import is stopped.
+    """
+    importer = IDocumentImporter.implementations().service(key=job.importer)
+    if importer is None:
+        raise PluginError("Could not find importer with id '%s'" % job.importer)
+
+    options = dict(job.options)
+    frontier = None
+    if getattr(importer, 'resumable', False):
+        frontier = Frontier(job.frontier)
+        options['frontier'] = frontier
+
+    def checkpoint(processed, created):
+        fields = dict(processed_count=F('processed_count') + processed, created_count=F('created_count') + created)
+        if frontier is not None:
+            job.frontier = fields['frontier'] = frontier.paths()
+        _update_job(job, **fields)
+
+        job.processed_count += processed
+        job.created_count += created
+
+    try:
         try:
-            d = model.objects.create(**{'url': url})
-        except IntegrityError as e:
-            if str(e).startswith("UNIQUE constraint failed"):
-                print("\tSkipping url as duplicate")
-                continue
-
-            raise e
-
-        # Create needed tasks
-        for t in tasks_to_create:
-            Task.objects.create(**{
-                'type': t,
-                'params': {
-                    'url': url,
-                },
-                'doc_id': d.id,  # pointer to document object, might be helpful for debugging
-                'priority': 1.0,  # TODO compute when setting https://github.com/themoonsheep/moonsheep/issues/50
-            })
+            import_documents(importer, job.tasks_to_create, batch_size=batch_size, checkpoint=checkpoint,
+                             checkpoint_interval=checkpoint_interval, **options)
+        except ImportJobLost:
+            raise
+        except Exception:
+            # the job is left failed with its last checkpoint, so it can be resumed after fixing the problem
+            logger.exception(f"{job} failed")
+            job.state = ImportJob.FAILED
+            job.error = traceback.format_exc()
+            _update_job(job, state=job.state, error=job.error)
+            return
+
+        job.state = ImportJob.DONE
+        job.frontier = []
+        _update_job(job, state=job.state, frontier=job.frontier)
+
+    except ImportJobLost:
+        logger.warning(f"{job} was taken over by another worker, stopping")
+        job.refresh_from_db()
+
+
+def claim_import_job(stale_after: int = 600) -> ImportJob:
+    """
+    Takes the oldest pending job, or a running one not checkpointed for `stale_after` seconds as its worker
+    is probably gone; several workers can run at once.
+
+    Claimed job gets a new `worker_id`, so the previous worker (if it's just slow) won't save its progress anymore.
+
+    :return: job marked as running or None if there is nothing to do
+    """
+    with transaction.atomic():
+        stale = timezone.now() - datetime.timedelta(seconds=stale_after)
+        job = ImportJob.objects.select_for_update(skip_locked=True) \
+            .filter(Q(state=ImportJob.PENDING) | Q(state=ImportJob.RUNNING, updated_at__lt=stale)) \
+            .order_by('id').first()
+        if job is None:
+            return None
+
+        job.state = ImportJob.RUNNING
+        job.error = ''
+        job.worker_id = uuid.uuid4()
+        job.save(update_fields=['state', 'error', 'worker_id', 'updated_at'])
+        return job
 
 
 class ImporterView(TemplateView):
@@ -91,7 +274,7 @@ class ImporterView(TemplateView):
         context.update({
             'label': str(importer),
             'template_name': importer.template_name,
-            'all_tasks': TASK_TYPES,
+            'all_tasks': list(TASK_TYPES.keys()),
             'tasks_to_create': MOONSHEEP['DOCUMENT_INITIAL_TASKS'],
         })
         return context
@@ -106,26 +289,45 @@ class ImporterView(TemplateView):
         return self.render_to_response(self.get_context_data())
 
     def post(self, request, *args, **kwargs):
-        importer = self.get_importer()
+        self.get_importer()
 
         tasks_to_create = MOONSHEEP['DOCUMENT_INITIAL_TASKS']
         if not tasks_to_create:
-            tasks_to_create = request.POST['tasks_to_create']
+            tasks_to_create = request.POST.getlist('tasks_to_create')
 
         if not tasks_to_create:
             # TODO re-render the form with err message
-            raise HttpResponseBadRequest("tasks_to_create should be provided")
+            return HttpResponseBadRequest("tasks_to_create should be provided")
 
-        import_documents(importer, tasks_to_create, request.POST)
-        # TODO error handling, retry?
-        # TODO progress screen
+        options = request.POST.dict()
+        for param in ['csrfmiddlewaretoken', 'tasks_to_create']:
+            options.pop(param, None)
+
+        # Import is run by `moonsheep_import_worker`, its progress is served by ImportJobView
+        job = ImportJob.objects.create(importer=self.kwargs['importer_id'], options=options,
+                                       tasks_to_create=tasks_to_create)
 
+        # TODO progress screen
         # TODO flash message was successful
-        return HttpResponseRedirect(reverse('documents'))
-
-        # request.POST
-        # if form.is_valid():
-        #     # <process form cleaned data>
-        #     return HttpResponseRedirect('/success/')
-        #
-        # return render(request, self.template_name, {'form': form})
+        return HttpResponseRedirect(reverse('import-job', kwargs={'job_id': job.id}))
+
+
+class ImportJobView(View):
+    """
+    Serves progress of an import job as JSON
+    """
+
+    def get(self, request, *args, **kwargs):
+        job = get_object_or_404(ImportJob, pk=kwargs['job_id'])
+
+        return JsonResponse({
+            'id': job.id,
+            'importer': job.importer,
+            'state': job.state,
+            'processed': job.processed_count,
+            'created': job.created_count,
+            'frontier_size': len(job.frontier) if job.frontier is not None else None,
+            'error': job.error,
+            'created_at': job.created_at,
+            'updated_at': job.updated_at,
+        })
@@ -1,5 +1,10 @@
 import os
+import threading
+import time
 import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
 
 from moonsheep.importers import HttpDocumentImporter
 from django.core import management
@@ -45,6 +50,106 @@ class TestHttpImporter(unittest.TestCase):
                          "Current dir should not be returned")
 
 
+class ListingHandler(BaseHTTPRequestHandler):
+    """
+    Serves index listings of `server.tree`, directories set in `server.flaky` fail with 503 on the first request
+    """
+
+    def do_GET(self):
+        self.server.requested.append(self.path)
+
+        if self.path in self.server.flaky:
+            self.server.flaky.remove(self.path)
+            self.send_error(503)
+            return
+
+        entries = self.server.tree.get(self.path, None)
+        if entries is None:
+            self.send_error(404)
+            return
+
+        body = ''.join(f'<a href="{entry}">{entry}</a>\n' for entry in ['../'] + entries).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHttpImporterCrawling(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ListingHandler)
+        self.server.tree = {
+            '/root/': ['a.pdf', 'b.txt'] + [f'dir{i}/' for i in range(10)],
+        }
+        for i in range(10):
+            self.server.tree[f'/root/dir{i}/'] = [f'{i}.pdf', 'sub/']
+            self.server.tree[f'/root/dir{i}/sub/'] = [f'{i}-sub.pdf']
+        self.server.flaky = set()
+        self.server.requested = []
+
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.host = f'http://127.0.0.1:{self.server.server_port}'
+
+        self.importer = HttpDocumentImporter("http-test")
+        self.importer.backoff_factor = 0
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_find_urls(self):
+        urls = list(self.importer.find_urls(self.host, '*.pdf', ['/root/'], workers=4))
+
+        expected = [f'{self.host}/root/a.pdf'] + [f'{self.host}/root/dir{i}/{i}.pdf' for i in range(10)] \
+            + [f'{self.host}/root/dir{i}/sub/{i}-sub.pdf' for i in range(10)]
+        self.assertCountEqual(urls, expected)
+        self.assertEqual(len(self.server.requested), 21, "Each listing should be downloaded once")
+
+    def test_duplicated_dirs(self):
+        # also linked with an absolute url from another listing
+        self.server.tree['/root/dir1/'].append(f'{self.host}/root/dir0/')
+
+        urls = list(self.importer.find_urls(self.host, '*.pdf', ['/root/dir0/', '/root/dir0/', '/root/dir1/'],
+                                            workers=4))
+
+        self.assertCountEqual(urls, [f'{self.host}/root/dir{i}/{i}.pdf' for i in range(2)]
+                              + [f'{self.host}/root/dir{i}/sub/{i}-sub.pdf' for i in range(2)])
+        self.assertEqual(self.server.requested.count('/root/dir0/'), 1)
+
+    def test_lazy(self):
+        urls = self.importer.find_urls(self.host, '*.pdf', ['/root/'], workers=1)
+
+        self.assertEqual(next(urls), f'{self.host}/root/a.pdf')
+        self.assertEqual(self.server.requested, ['/root/'])
+
+        next(urls)
+        urls.close()
+        self.assertEqual(len(self.server.requested), 2)
+
+    def test_retry(self):
+        self.server.flaky = {'/root/dir3/'}
+
+        urls = list(self.importer.find_urls(self.host, '*.pdf', ['/root/'], retries=2))
+
+        self.assertIn(f'{self.host}/root/dir3/3.pdf', urls)
+        self.assertEqual(self.server.requested.count('/root/dir3/'), 2)
+
+    def test_error(self):
+        with self.assertRaises(requests.HTTPError):
+            list(self.importer.find_urls(self.host, None, ['/missing/']))
+
+    def test_rate_limit(self):
+        start = time.monotonic()
+        list(self.importer.find_urls(self.host, None, ['/root/dir0/', '/root/dir1/'], workers=4, rate_limit=10))
+
+        # 4 requests to one host, spaced out by 0.1s
+        self.assertGreaterEqual(time.monotonic() - start, 0.3)
+
+
 # class TestHttpImporterCommand(unittest.TestCase):
 #     # TODO @patch and assert HttpDocumentImporter.find_urls
 #     def host_with_multiple_paths(self):
@@ -0,0 +1,186 @@
+import json
+import threading
+from http.server import ThreadingHTTPServer
+from typing import Sequence
+from unittest.mock import patch
+
+from django.test import TestCase, RequestFactory, override_settings
+
+from moonsheep.importers.importers import import_documents, IDocumentImporter, ImporterView, ImportJobView, \
+    claim_import_job, run_import_job, Frontier
+from moonsheep.importers.tests.test_http import ListingHandler
+from moonsheep.models import ImportJob, Task
+from moonsheep.settings import MOONSHEEP
+from moonsheep.tests.models import Document
+
+TASK_TYPE = 'moonsheep.tests.tasks.SimpleTask'
+
+
+class ListImporter(IDocumentImporter):
+    def __init__(self, urls):
+        self.urls = urls
+
+    def find_urls(self, **options) -> Sequence[str]:
+        return self.urls
+
+
+@patch.dict(MOONSHEEP, {'DOCUMENT_MODEL': Document, 'DOCUMENT_INITIAL_TASKS': [TASK_TYPE]})
+@patch('builtins.print')
+class ImportDocumentsTest(TestCase):
+    def test_import(self, _print):
+        urls = [f'http://example.com/{i}' for i in range(25)]
+
+        created = import_documents(ListImporter(urls), batch_size=10)
+
+        self.assertEqual(created, 25)
+        self.assertEqual(set(Document.objects.values_list('url', flat=True)), set(urls))
+        for doc in Document.objects.all():
+            task = Task.objects.get(doc_id=doc.id)
+            self.assertEqual(task.type, TASK_TYPE)
+            self.assertEqual(task.params, {'url': doc.url})
+
+    def test_skip_duplicates(self, _print):
+        Document.objects.create(url='http://example.com/1')
+
+        created = import_documents(ListImporter(['http://example.com/1', 'http://example.com/2',
+                                                 'http://example.com/2', 'http://example.com/3']), batch_size=2)
+
+        self.assertEqual(created, 2)
+        self.assertEqual(Document.objects.count(), 3)
+        self.assertEqual(Task.objects.count(), 2)
+        self.assertNotIn({'url': 'http://example.com/1'}, [task.params for task in Task.objects.all()])
+
+    def test_dry_run(self, _print):
+        created = import_documents(ListImporter(['http://example.com/1']), dry_run=True)
+
+        self.assertEqual(created, 1)
+        self.assertFalse(Document.objects.exists())
+        self.assertFalse(Task.objects.exists())
+
+
+@patch.dict(MOONSHEEP, {'DOCUMENT_MODEL': Document, 'DOCUMENT_INITIAL_TASKS': [TASK_TYPE]})
+@patch('builtins.print')
+class ImportJobTest(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ListingHandler)
+        self.server.tree = {
+            '/root/': ['a.pdf'] + [f'dir{i}/' for i in range(10)],
+        }
+        for i in range(10):
+            self.server.tree[f'/root/dir{i}/'] = [f'{i}-{j}.pdf' for j in range(3)]
+        self.server.flaky = set()
+        self.server.requested = []
+
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.host = f'http://127.0.0.1:{self.server.server_port}'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_resume(self, _print):
+        ImportJob.objects.create(importer='http-1', tasks_to_create=[TASK_TYPE],
+                                 options={'host': self.host, 'pattern': '*.pdf', 'paths': ['/root/'], 'workers': 1})
+
+        dir7 = self.server.tree.pop('/root/dir7/')
+        job = claim_import_job()
+        self.assertEqual(job.state, ImportJob.RUNNING)
+        run_import_job(job, batch_size=5)
+
+        job.refresh_from_db()
+        self.assertEqual(job.state, ImportJob.FAILED)
+        self.assertIn('HTTPError', job.error)
+        self.assertEqual(job.processed_count, 20)
+        self.assertEqual(job.processed_count, Document.objects.count())
+        self.assertIn(f'{self.host}/root/dir7/', job.frontier)
+
+        # failed jobs are left for the operator
+        self.assertIsNone(claim_import_job())
+
+        self.server.tree['/root/dir7/'] = dir7
+        self.server.requested = []
+        ImportJob.objects.filter(pk=job.pk).update(state=ImportJob.PENDING)
+        job = claim_import_job()
+        run_import_job(job, batch_size=5)
+
+        job.refresh_from_db()
+        self.assertEqual(job.state, ImportJob.DONE)
+        self.assertEqual(Document.objects.count(), 31)
+        self.assertEqual(Task.objects.count(), 31)
+        self.assertEqual(job.created_count, 31)
+        self.assertNotIn('/root/', self.server.requested, "Crawling should be resumed, not started over")
+
+    def test_stale(self, _print):
+        job = ImportJob.objects.create(importer='http-1', tasks_to_create=[TASK_TYPE], options={},
+                                       state=ImportJob.RUNNING)
+
+        self.assertIsNone(claim_import_job(stale_after=600))
+        self.assertEqual(claim_import_job(stale_after=0), job)
+
+    def test_checkpoint_interval(self, _print):
+        importer = IDocumentImporter.implementations().service(key='http-1')
+        frontier = Frontier()
+        checkpoints = []
+
+        def checkpoint(processed, created):
+            checkpoints.append((processed, frontier.paths()))
+
+        # few files match, so batches are never filled
+        import_documents(importer, [TASK_TYPE], batch_size=1000, checkpoint=checkpoint, checkpoint_interval=0,
+                         host=self.host, pattern='*/a.pdf', paths=['/root/'], workers=1, frontier=frontier)
+
+        self.assertEqual(Document.objects.count(), 1)
+        # the url and each of 11 crawled directories
+        self.assertEqual(len(checkpoints), 12)
+        self.assertEqual(sum(processed for processed, paths in checkpoints), 1)
+        self.assertEqual(checkpoints[-1], (0, []))
+        self.assertIn(f'{self.host}/root/dir9/', checkpoints[1][1])
+
+    def test_taken_over(self, _print):
+        ImportJob.objects.create(importer='http-1', tasks_to_create=[TASK_TYPE],
+                                 options={'host': self.host, 'pattern': '*.pdf', 'paths': ['/root/'], 'workers': 1})
+        slow = claim_import_job()
+        taken_over = claim_import_job(stale_after=0)
+        self.assertNotEqual(slow.worker_id, taken_over.worker_id)
+
+        # the slow worker stops at its first checkpoint without saving anything
+        run_import_job(slow, batch_size=5)
+        self.assertEqual(Document.objects.count(), 5)
+        self.assertEqual(slow.state, ImportJob.RUNNING)
+        self.assertEqual(slow.processed_count, 0)
+
+        run_import_job(taken_over, batch_size=5)
+
+        taken_over.refresh_from_db()
+        self.assertEqual(taken_over.state, ImportJob.DONE)
+        self.assertEqual(taken_over.processed_count, 31)
+        self.assertEqual(Document.objects.count(), 31)
+
+
+@override_settings(ROOT_URLCONF='moonsheep.urls')
+@patch.dict(MOONSHEEP, {'DOCUMENT_INITIAL_TASKS': []})
+class ImportJobViewsTest(TestCase):
+    def test_create_job(self):
+        request = RequestFactory().post('/documents/import/http-1', {
+            'host': 'http://example.com', 'paths': '/root/ /other/', 'tasks_to_create': [TASK_TYPE]
+        })
+        response = ImporterView.as_view()(request, importer_id='http-1')
+
+        job = ImportJob.objects.get()
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.url, f'/documents/import/jobs/{job.id}')
+        self.assertEqual(job.state, ImportJob.PENDING)
+        self.assertEqual(job.options, {'host': 'http://example.com', 'paths': '/root/ /other/'})
+        self.assertEqual(job.tasks_to_create, [TASK_TYPE])
+
+    def test_progress(self):
+        job = ImportJob.objects.create(importer='http-1', tasks_to_create=[TASK_TYPE], options={},
+                                       processed_count=10, created_count=8, frontier=['http://example.com/a/'])
+
+        response = ImportJobView.as_view()(RequestFactory().get('/'), job_id=job.id)
+
+        data = json.loads(response.content)
+        self.assertEqual(data['state'], ImportJob.PENDING)
+        self.assertEqual(data['processed'], 10)
+        self.assertEqual(data['created'], 8)
+        self.assertEqual(data['frontier_size'], 1)
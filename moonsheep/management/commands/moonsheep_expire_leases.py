@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from moonsheep.models import TaskLease
+
+
+class Command(BaseCommand):
+    help = 'Deletes expired task leases'
+
+    def handle(self, *args, **options):
+        deleted, _ = TaskLease.objects.expired().delete()
+
+        self.stdout.write(f"Deleted {deleted} expired leases")
@@ -10,8 +10,12 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('app_label', type=str, metavar='app_label', help='Specify which application\'s data should be exported')
-        parser.add_argument('format', type=str, metavar='format', help='Format: xlsx')
+        parser.add_argument('format', type=str, metavar='format', help='Format: xlsx, frictionless, csv, ndjson')
         parser.add_argument('-o', dest='output', type=str, help="Save export to output file [if nothing given will output to stdout")
+        parser.add_argument('--model', dest='model', type=str,
+                            help="Model to be exported to stdout by exporters writing a file per model (csv, ndjson)")
+        parser.add_argument('--delta', dest='delta', type=str, nargs='?', const='default',
+                            help="Export only objects past the watermark of the last delta export of given name (defaults to 'default')")
 
     def handle(self, *args, **options):
         app_label = options['app_label']
@@ -25,4 +29,12 @@ class Command(BaseCommand):
         if exporter_cls is None:
             raise NotImplementedError(f"There is no '{fmt}' exporter defined")
 
-        exporter_cls(app_label).export(output)
+        export_options = {}
+        if options.get('model', None):
+            export_options['model'] = options['model']
+
+        exporter = exporter_cls(app_label, delta=options.get('delta', None))
+        exporter.export(output, **export_options)
+
+        if exporter.delta is not None:
+            exporter.save_watermarks()
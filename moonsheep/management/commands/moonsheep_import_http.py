@@ -16,6 +16,12 @@ class Command(BaseCommand):
                             help="*-wildcarded pattern of the file names to be included, ie. -f *.pdf")
         parser.add_argument('--dry-run', dest='dry_run', type=bool, nargs='?', default=False, const=True,
                             help='Dry run to see what would get imported without actually importing it')
+        parser.add_argument('--workers', dest='workers', type=int, default=4,
+                            help='Number of directory listings downloaded at once')
+        parser.add_argument('--rate-limit', dest='rate_limit', type=float, default=None,
+                            help='Maximal number of requests per second sent to a host')
+        parser.add_argument('--batch-size', dest='batch_size', type=int, default=1000,
+                            help='Number of documents inserted at once')
 
     def handle(self, *args, **options):
         host = options['host']
@@ -23,4 +29,5 @@ class Command(BaseCommand):
 
         # TODO remove; opora docs: https://opora.engnroom.org/filerepo/2016/%d0%86_%d0%9a%d0%92%d0%90%d0%a0%d0%a2%d0%90%d0%9b_%d0%a1%d0%9a%d0%90%d0%9d/
         importer = HttpDocumentImporter("http")
-        import_documents(importer, host=host, paths=paths, pattern=options['pattern'], dry_run=options['dry_run'])
+        import_documents(importer, host=host, paths=paths, pattern=options['pattern'], dry_run=options['dry_run'],
+                         batch_size=options['batch_size'], workers=options['workers'], rate_limit=options['rate_limit'])
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from moonsheep.importers.importers import claim_import_job, run_import_job
+from moonsheep.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = 'Runs import jobs created in the importer interface, resuming interrupted ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', dest='batch_size', type=int, default=1000,
+                            help="Number of documents inserted at once, progress is saved after each batch")
+        parser.add_argument('--stale-after', dest='stale_after', type=int, default=600,
+                            help="Seconds after which a running job without progress is taken over")
+        parser.add_argument('--retry-failed', dest='retry_failed', type=bool, nargs='?', default=False, const=True,
+                            help='Resume failed jobs too')
+        parser.add_argument('--loop', dest='loop', type=bool, nargs='?', default=False, const=True,
+                            help='Keep on waiting for new jobs instead of exiting when there are none')
+        parser.add_argument('--sleep', dest='sleep', type=float, default=5,
+                            help="Seconds to wait before checking for new jobs again")
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            ImportJob.objects.filter(state=ImportJob.FAILED).update(state=ImportJob.PENDING)
+
+        total = 0
+        while True:
+            job = claim_import_job(options['stale_after'])
+            if job is None:
+                if not options['loop']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            self.stdout.write(f"Running {job}")
+            run_import_job(job, batch_size=options['batch_size'])
+            self.stdout.write(f"{job} {job.state}: {job.processed_count} urls processed, "
+                              f"{job.created_count} documents created")
+            total += 1
+
+        self.stdout.write(f"Run {total} jobs")
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from moonsheep.statistics import rebuild_user_stats
+
+
+class Command(BaseCommand):
+    help = 'Recounts entries and verified entries of all users, ie. after entries were changed bypassing Moonsheep'
+
+    def handle(self, *args, **options):
+        rebuild_user_stats()
+
+        self.stdout.write("User stats rebuilt")
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from moonsheep.statistics import refresh_stats
+
+
+class Command(BaseCommand):
+    help = 'Precomputes statistics shown on dashboards and stores them in the cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', dest='loop', type=bool, nargs='?', default=False, const=True,
+                            help='Keep on refreshing statistics instead of exiting after the first run')
+        parser.add_argument('--sleep', dest='sleep', type=float, default=60,
+                            help="Seconds between refreshes, should be shorter than MOONSHEEP['STATISTICS_CACHE_TTL']")
+
+    def handle(self, *args, **options):
+        while True:
+            refresh_stats()
+
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
+
+        self.stdout.write("Statistics refreshed")
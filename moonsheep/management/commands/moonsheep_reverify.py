@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from moonsheep.models import Task
+from moonsheep.verification import reverify
+
+
+class Command(BaseCommand):
+    help = 'Cross-checks tasks again, ie. after changing verifiers or MIN_ENTRIES_TO_* settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', dest='types', nargs='+', metavar='task_type',
+                            help='Verify only tasks of given types (full names, ie. app.tasks.FindTableTask)')
+        parser.add_argument('--state', dest='states', nargs='+', default=[Task.OPEN, Task.DIRTY],
+                            choices=[Task.OPEN, Task.DIRTY, Task.CROSSCHECKED],
+                            help='Verify only tasks in given states (defaults to open and dirty)')
+        parser.add_argument('--dry-run', dest='dry_run', type=bool, nargs='?', default=False, const=True,
+                            help="Only report what would change")
+        parser.add_argument('--chunk-size', dest='chunk_size', type=int, default=1000,
+                            help="Number of tasks processed at once")
+        parser.add_argument('--workers', dest='workers', type=int, default=None,
+                            help="Number of processes cross-checking entries, defaults to number of CPUs. "
+                                 "Set 0 to cross-check in the main process")
+
+    def handle(self, *args, **options):
+        tasks = Task.objects.filter(state__in=options['states'])
+        if options['types']:
+            tasks = tasks.filter(type__in=options['types'])
+
+        counts = reverify(tasks, chunk_size=options['chunk_size'], workers=options['workers'],
+                          dry_run=options['dry_run'])
+
+        prefix = "Would change" if options['dry_run'] else "Changed"
+        self.stdout.write(f"{prefix}: {counts[Task.CROSSCHECKED]} crosschecked, {counts[Task.DIRTY]} dirty, "
+                          f"{counts[Task.OPEN]} open; {counts['unchanged']} unchanged, {counts['failed']} failed")
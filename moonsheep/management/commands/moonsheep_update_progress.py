@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from moonsheep.statistics import process_pending_progress_updates, update_total_progress_bulk
+
+
+class Command(BaseCommand):
+    help = 'Updates total progress of tasks and documents'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', dest='all', type=bool, nargs='?', default=False, const=True,
+                            help='Recompute progress of all tasks and documents')
+        parser.add_argument('--doc', dest='doc_ids', type=int, nargs='+', metavar='doc_id',
+                            help='Recompute progress of all tasks of given documents')
+        parser.add_argument('--batch-size', dest='batch_size', type=int, default=1000,
+                            help="Number of scheduled tasks processed at once")
+        parser.add_argument('--loop', dest='loop', type=bool, nargs='?', default=False, const=True,
+                            help='Keep on waiting for scheduled updates instead of exiting when there are none')
+        parser.add_argument('--sleep', dest='sleep', type=float, default=5,
+                            help="Seconds to wait before checking for scheduled updates again")
+
+    def handle(self, *args, **options):
+        if options['all'] or options['doc_ids']:
+            update_total_progress_bulk(doc_ids=options['doc_ids'])
+            self.stdout.write("Progress updated")
+            return
+
+        # process updates scheduled with MOONSHEEP['PROGRESS_UPDATE'] = 'deferred'
+        total = 0
+        while True:
+            processed = process_pending_progress_updates(options['batch_size'])
+            total += processed
+
+            if not processed:
+                if not options['loop']:
+                    break
+                time.sleep(options['sleep'])
+
+        self.stdout.write(f"Updated progress of {total} tasks")
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from moonsheep.verification import process_jobs, retry_failed_jobs
+
+
+class Command(BaseCommand):
+    help = 'Cross-checks queued entries, used with MOONSHEEP[\'VERIFICATION\'] = \'queued\''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', dest='batch_size', type=int, default=100,
+                            help="Number of tasks with queued entries verified in one transaction")
+        parser.add_argument('--retry-failed', dest='retry_failed', type=bool, nargs='?', default=False, const=True,
+                            help='Verify again tasks which verification failed before')
+        parser.add_argument('--loop', dest='loop', type=bool, nargs='?', default=False, const=True,
+                            help='Keep on waiting for new entries instead of exiting when the queue is empty')
+        parser.add_argument('--sleep', dest='sleep', type=float, default=1,
+                            help="Seconds to wait before checking an empty queue again")
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            retry_failed_jobs()
+
+        total = 0
+        while True:
+            processed = process_jobs(options['batch_size'])
+            total += processed
+
+            if not processed:
+                if not options['loop']:
+                    break
+                time.sleep(options['sleep'])
+
+        self.stdout.write(f"Processed {total} entries")
@@ -1,3 +1,4 @@
+import functools
 import importlib
 import inspect
 import json
@@ -71,6 +72,7 @@ class ModelMapper:
         return self.klass(**params)
 
 
+@functools.lru_cache(maxsize=None)
 def klass_from_name(name):
     parts = name.split('.')
     module_name, class_name = '.'.join(parts[:-1]), parts[-1]
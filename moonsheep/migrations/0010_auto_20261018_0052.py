@@ -0,0 +1,17 @@
+# Generated by Django 3.0.14 on 2026-10-18 00:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moonsheep', '0009_auto_20191116_1249'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['state', 'priority', 'id'], name='task_state_priority_id'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.0.14 on 2026-10-18 00:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moonsheep', '0011_auto_20261018_0054'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VerificationJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='moonsheep.Entry')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='moonsheep.Task')),
+            ],
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.0.14 on 2026-10-18 00:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moonsheep', '0012_verificationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingProgressUpdate',
+            fields=[
+                ('task', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='moonsheep.Task')),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.0.14 on 2026-10-18 00:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moonsheep', '0013_pendingprogressupdate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='children_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='children_progress_sum',
+            field=models.DecimalField(decimal_places=3, default=0, max_digits=15),
+        ),
+        migrations.RunSQL(
+            """UPDATE moonsheep_task t
+            SET children_count = c.count, children_progress_sum = c.progress_sum
+            FROM (
+                SELECT parent_id, COUNT(*) AS count, SUM(total_progress) AS progress_sum
+                FROM moonsheep_task WHERE parent_id IS NOT NULL GROUP BY parent_id
+            ) c
+            WHERE t.id = c.parent_id""",
+            migrations.RunSQL.noop
+        ),
+    ]
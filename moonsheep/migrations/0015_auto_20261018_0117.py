@@ -0,0 +1,28 @@
+# Generated by Django 3.0.14 on 2026-10-18 01:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moonsheep', '0014_auto_20261018_0059'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportWatermark',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('app_label', models.CharField(max_length=100)),
+                ('model', models.CharField(max_length=100)),
+                ('value', models.CharField(max_length=255, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='exportwatermark',
+            constraint=models.UniqueConstraint(fields=('name', 'app_label', 'model'), name='unique_watermark_name_model'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.0.14 on 2026-10-18 01:23
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moonsheep', '0015_auto_20261018_0117'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('app_label', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+                ('modified_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
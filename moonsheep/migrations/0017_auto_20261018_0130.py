@@ -0,0 +1,35 @@
+# Generated by Django 3.0.14 on 2026-10-18 01:30
+
+import django.core.serializers.json
+from django.db import migrations, models
+import moonsheep.json_field
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moonsheep', '0016_dataversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('importer', models.CharField(max_length=255)),
+                ('options', moonsheep.json_field.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('tasks_to_create', moonsheep.json_field.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('state', models.CharField(choices=[('pending', 'pending'), ('running', 'running'), ('done', 'done'), ('failed', 'failed')], default='pending', max_length=10)),
+                ('frontier', moonsheep.json_field.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('processed_count', models.IntegerField(default=0)),
+                ('created_count', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='importjob',
+            index=models.Index(fields=['state', 'updated_at'], name='import_job_state_updated_at'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.0.14 on 2026-10-18 01:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moonsheep', '0017_auto_20261018_0130'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('entries_count', models.IntegerField(default=0)),
+                ('verified_entries_count', models.IntegerField(default=0)),
+                ('last_activity', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'user stats',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='userstats',
+            index=models.Index(fields=['-entries_count'], name='userstats_entries'),
+        ),
+        migrations.AddIndex(
+            model_name='userstats',
+            index=models.Index(fields=['-verified_entries_count'], name='userstats_verified_entries'),
+        ),
+        migrations.AddIndex(
+            model_name='userstats',
+            index=models.Index(fields=['last_activity'], name='userstats_last_activity'),
+        ),
+        migrations.RunSQL(
+            """INSERT INTO moonsheep_userstats (user_id, entries_count, verified_entries_count)
+            SELECT e.user_id, COUNT(*), COUNT(*) FILTER (WHERE t.state = 'checked' AND NOT e.closed_manually)
+            FROM moonsheep_entry e JOIN moonsheep_task t ON t.id = e.task_id
+            GROUP BY e.user_id""",
+            migrations.RunSQL.noop
+        ),
+    ]
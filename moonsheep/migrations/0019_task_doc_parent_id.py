@@ -0,0 +1,17 @@
+# Generated by Django 3.0.14 on 2026-10-18 01:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moonsheep', '0018_userstats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['doc_id', 'parent', 'id'], name='task_doc_parent_id'),
+        ),
+    ]
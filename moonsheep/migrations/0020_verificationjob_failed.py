@@ -0,0 +1,23 @@
+# Generated by Django 3.0.14 on 2026-10-18 02:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moonsheep', '0019_task_doc_parent_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='verificationjob',
+            name='error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='verificationjob',
+            name='failed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.14 on 2026-10-18 02:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moonsheep', '0020_verificationjob_failed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='worker_id',
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+    ]
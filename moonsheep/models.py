@@ -4,10 +4,13 @@ from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractUser
 from django.core import validators
 from django.db import models
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
 from django.utils.text import slugify
 from django.utils.translation import ugettext_lazy as _
 
 from moonsheep.json_field import JSONField
+from moonsheep.settings import MOONSHEEP
 
 
 def generate_password(bits=160):
@@ -86,6 +89,28 @@ class User(AbstractUser):
 
 
 class TaskQuerySet(models.QuerySet):
+    def open_for(self, user):
+        """
+        Open tasks that given user didn't contribute to, the most important first
+        """
+        return self.annotate(contributed=models.Exists(Entry.objects.filter(task=models.OuterRef('pk'), user=user))) \
+            .filter(state=Task.OPEN, contributed=False) \
+            .order_by('-priority', '-id')
+
+    def not_reserved(self, user):
+        """
+        Tasks that are not reserved by other users for more entries than still needed to cross-check them
+        """
+        entries = Entry.objects.filter(task=models.OuterRef('pk')).order_by().values('task') \
+            .annotate(count=models.Count('*')).values('count')
+        leases = TaskLease.objects.active().filter(task=models.OuterRef('pk')).exclude(user=user) \
+            .order_by().values('task').annotate(count=models.Count('*')).values('count')
+
+        return self.annotate(
+            entries_count=Coalesce(models.Subquery(entries, output_field=models.IntegerField()), 0),
+            leases_count=Coalesce(models.Subquery(leases, output_field=models.IntegerField()), 0),
+        ).filter(leases_count__lt=Greatest(MOONSHEEP['MIN_ENTRIES_TO_CROSSCHECK'] - models.F('entries_count'), 1))
+
     def dirty(self):
         return self.filter(state=Task.DIRTY).order_by('-priority', '-id')
 
@@ -102,6 +127,34 @@ class TaskQuerySet(models.QuerySet):
             return None
 
 
+class UserStats(models.Model):
+    """
+    Contribution counters of a user, maintained as entries are sent and cross-checked
+
+    Rebuild them with `moonsheep_rebuild_user_stats` if entries were changed bypassing Moonsheep.
+    """
+
+    user = models.OneToOneField('User', models.CASCADE, primary_key=True, related_name='stats')
+
+    entries_count = models.IntegerField(default=0)
+    """Number of entries sent"""
+
+    verified_entries_count = models.IntegerField(default=0)
+    """Number of entries sent to tasks that were cross-checked"""
+
+    last_activity = models.DateTimeField(null=True, blank=True)
+    """When the last entry was sent"""
+
+    class Meta:
+        verbose_name_plural = "user stats"
+        indexes = [
+            # Leaderboards and active users
+            models.Index(fields=['-entries_count'], name='userstats_entries'),
+            models.Index(fields=['-verified_entries_count'], name='userstats_verified_entries'),
+            models.Index(fields=['last_activity'], name='userstats_last_activity'),
+        ]
+
+
 class Task(models.Model):
     """
     A specific Task that users will work on.
@@ -139,6 +192,14 @@ class Task(models.Model):
     total_progress = models.DecimalField(decimal_places=3, max_digits=6, default=0,
                                          validators=[validators.MaxValueValidator(100),
                                                      validators.MinValueValidator(0)])
+
+    # Maintained on subtasks changes, so progress can be updated without aggregating over all subtasks
+    children_count = models.IntegerField(default=0)
+    """Number of subtasks"""
+
+    children_progress_sum = models.DecimalField(decimal_places=3, max_digits=15, default=0)
+    """Sum of total_progress of all subtasks"""
+
     # States
     OPEN = 'open'
     DIRTY = 'dirty'
@@ -154,7 +215,10 @@ class Task(models.Model):
             models.UniqueConstraint(fields=['type', 'params'], name='unique_type_params')
         ]
         indexes = [
-            # TODO based on queries, most likely: models.Index(fields=['state', 'priority']),
+            # Serving tasks by the chooser: WHERE state = ? ORDER BY priority DESC, id DESC
+            models.Index(fields=['state', 'priority', 'id'], name='task_state_priority_id'),
+            # Document's tasks tree loaded level by level: WHERE doc_id = ? AND parent_id = ? ORDER BY id
+            models.Index(fields=['doc_id', 'parent', 'id'], name='task_doc_parent_id'),
         ]
 
     def __str__(self):
@@ -177,6 +241,153 @@ class Entry(models.Model):
         verbose_name_plural = "entries"
 
 
+class VerificationJob(models.Model):
+    """
+    Entry waiting to be cross-checked by `moonsheep_verify` worker, used if MOONSHEEP['VERIFICATION'] == 'queued'
+    """
+
+    entry = models.ForeignKey(Entry, models.CASCADE)
+    task = models.ForeignKey(Task, models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    failed_at = models.DateTimeField(null=True, blank=True)
+    """Set if verification of the task failed, such jobs are left until retried with `moonsheep_verify --retry-failed`"""
+
+    error = models.TextField(blank=True)
+
+
+class PendingProgressUpdate(models.Model):
+    """
+    Task which total progress (and its parents') should be recomputed by `moonsheep_update_progress` worker,
+    used if MOONSHEEP['PROGRESS_UPDATE'] == 'deferred'
+    """
+
+    task = models.OneToOneField(Task, models.CASCADE, primary_key=True)
+
+
+class TaskLeaseQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(expires_at__gt=timezone.now())
+
+    def expired(self):
+        return self.filter(expires_at__lte=timezone.now())
+
+
+class TaskLease(models.Model):
+    """
+    Reservation of a task served to a user
+
+    It is released when user sends an entry. Otherwise it's just ignored after it expires,
+    expired leases are deleted in bulk by `moonsheep_expire_leases` command.
+    """
+
+    objects = TaskLeaseQuerySet.as_manager()
+
+    task = models.ForeignKey(Task, models.CASCADE, related_name='leases')
+    user = models.ForeignKey(User, models.CASCADE)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'user'], name='unique_lease_task_user')
+        ]
+
+
+class ImportJob(models.Model):
+    """
+    Import of documents run in background by `moonsheep_import_worker`
+
+    Progress is checkpointed after each batch of imported urls, so an interrupted job is resumed
+    from the saved crawl frontier instead of starting over.
+    """
+
+    importer = models.CharField(max_length=255)
+    """Key of the IDocumentImporter implementation"""
+
+    options = JSONField()
+    """Options passed to importer's find_urls"""
+
+    tasks_to_create = JSONField()
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    state = models.CharField(max_length=10, choices=[(s, s) for s in [PENDING, RUNNING, DONE, FAILED]],
+                             default=PENDING)
+
+    frontier = JSONField(null=True, blank=True)
+    """Paths not crawled completely yet (if importer is resumable), None before the first checkpoint"""
+
+    worker_id = models.UUIDField(null=True, blank=True, editable=False)
+    """Lease token of the worker running the job, a new one is set whenever the job is claimed"""
+
+    processed_count = models.IntegerField(default=0)
+    """Number of urls found and imported so far, including skipped duplicates"""
+
+    created_count = models.IntegerField(default=0)
+    """Number of documents created so far"""
+
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    """Updated at each checkpoint, running jobs not updated for long are taken over by other workers"""
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['state', 'updated_at'], name='import_job_state_updated_at'),
+        ]
+
+    def __str__(self):
+        return f"ImportJob[{self.id}]"
+
+
+class ExportWatermark(models.Model):
+    """
+    Value of the watermark field of the last object exported in a delta export of a model
+
+    Watermark field is set in model's `Exported.watermark` and defaults to the primary key.
+    """
+
+    name = models.CharField(max_length=100)
+    """Name of the delta export, so several consumers can follow their own exports"""
+
+    app_label = models.CharField(max_length=100)
+    model = models.CharField(max_length=100)
+    value = models.CharField(max_length=255, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'app_label', 'model'], name='unique_watermark_name_model')
+        ]
+
+
+class DataVersion(models.Model):
+    """
+    Version of app's data exposed by the API, bumped whenever verified data is saved
+    or a document becomes fully verified (or stops being so)
+
+    Used for ETag/Last-Modified headers and to invalidate cached API responses.
+    """
+
+    app_label = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    modified_at = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def current(cls, app_label) -> 'DataVersion':
+        return cls.objects.get_or_create(app_label=app_label)[0]
+
+    @classmethod
+    def bump(cls):
+        """
+        Mark data of all apps as changed, it's not known which models save_verified_data has touched
+        """
+        cls.objects.update(version=models.F('version') + 1, modified_at=timezone.now())
+
+
 class DocumentQuerySet(models.QuerySet):
     def exported(self) -> models.QuerySet:
         return self.filter(progress=100)
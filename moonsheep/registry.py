@@ -1,9 +1,12 @@
 # encoding: utf-8
 
 from contextlib import contextmanager
+from typing import Type
 
 import django.db.models
+from django.core.exceptions import ImproperlyConfigured
 
+from .mapper import klass_from_name
 from .settings import MOONSHEEP
 
 
@@ -12,15 +15,42 @@ def register(task_class):
     if not issubclass(task_class, AbstractTask):
         raise ValueError('Task_class must subclass AbstractTask')
 
-    if task_class not in TASK_TYPES:
-        TASK_TYPES.append(task_class.name)
+    TASK_TYPES[task_class.name] = task_class
 
     return task_class
 
 
 def unregister(task_class):
-    if task_class in TASK_TYPES:
-        TASK_TYPES.remove(task_class.name)
+    TASK_TYPES.pop(task_class.name, None)
+
+
+def get_task_class(name: str) -> Type['AbstractTask']:
+    """
+    Returns task class given its full name, ie. 'app.tasks.FindTableTask'
+
+    Registered tasks are returned straight away, others are imported only once.
+    """
+    task_class = TASK_TYPES.get(name, None)
+    if task_class is None:
+        task_class = klass_from_name(name)
+
+    return task_class
+
+
+def validate_tasks():
+    """
+    Checks that tasks referenced in configuration can be loaded, it's called when Django starts
+    """
+    from .tasks import AbstractTask
+
+    for name in MOONSHEEP.get('DOCUMENT_INITIAL_TASKS', []):
+        try:
+            task_class = get_task_class(name)
+        except Exception as e:
+            raise ImproperlyConfigured(f"Task {name} set in @document(on_import_create) couldn't be loaded") from e
+
+        if not (isinstance(task_class, type) and issubclass(task_class, AbstractTask)):
+            raise ImproperlyConfigured(f"Task {name} set in @document(on_import_create) must subclass AbstractTask")
 
 
 @contextmanager
@@ -61,7 +91,7 @@ def document(on_import_create=[]):
             raise ValueError(
                 "You should specify tasks to create on document upload using on_import_create decorator parameter")
 
-        # TODO add validation on_import_create - those tasks should exist
+        # on_import_create tasks are validated when Django starts, see registry.validate_tasks
 
         MOONSHEEP['DOCUMENT_MODEL'] = model_class
         MOONSHEEP['DOCUMENT_INITIAL_TASKS'] = on_import_create
@@ -80,6 +110,6 @@ def get_document_model():
     return MOONSHEEP['DOCUMENT_MODEL']
 
 
-# TODO won't dict with actual classes be helpful here?
 # TODO move it into settings to avoid circular dependencies?
-TASK_TYPES = []
+TASK_TYPES = {}
+"""Registered tasks: full name -> task class"""
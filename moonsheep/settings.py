@@ -11,7 +11,13 @@ MOONSHEEP = {
     'MIN_ENTRIES_TO_CROSSCHECK': 3,
     'MIN_ENTRIES_TO_MARK_DIRTY': 4,
     'FAKER_LOCALE': 'it_IT',  # See supported locales at https://github.com/joke2k/faker#localization
-    'USER_AUTHENTICATION': 'anonymous'  # available settings: 'nickname', 'anonymous', TODO email #60
+    'USER_AUTHENTICATION': 'anonymous',  # available settings: 'nickname', 'anonymous', TODO email #60
+    'TASK_CHOOSER': 'default',  # slug of TaskChooser implementation serving tasks to users
+    'VERIFICATION': 'sync',  # 'sync' to cross-check in the request sending an entry, 'queued' to leave it to a worker
+    'PROGRESS_UPDATE': 'sync',  # 'sync' to update progress after each entry, 'deferred' to leave it to a worker
+    'TASK_LEASE_TTL': 30 * 60,  # seconds for which a served task is reserved for the user, None disables leasing
+    'STATISTICS_CACHE_TTL': 5 * 60,  # seconds for which dashboard statistics are cached
+    'API_CACHE_TIMEOUT': None,  # seconds for which AppApi responses are cached, None disables caching
     # 'APP': 'myapp'  # needs to be set in project # TODO (should not be set at all)
 }
 
@@ -0,0 +1,25 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import Signal, receiver
+
+from moonsheep import statistics
+from moonsheep.models import DataVersion, Entry
+
+verified_data_saved = Signal()
+"""
+Sent after verified data of a task has been saved (also when closed manually by a moderator)
+
+Arguments: sender - task class, task - task instance (AbstractTask), data - verified data
+"""
+
+
+@receiver(verified_data_saved)
+def _bump_data_version(sender, **kwargs):
+    transaction.on_commit(DataVersion.bump)
+
+
+@receiver(post_save, sender=Entry)
+def _count_entry(sender, instance, created, raw=False, **kwargs):
+    # counted whichever way entries are created: views, admin, API or shell
+    if created and not raw:
+        statistics.entry_created(instance)
@@ -1,12 +1,17 @@
+import collections
+import datetime
 from decimal import Decimal
+from typing import Iterable, List
 
 import psycopg2
-from django.db import connections
-from django.db.models import F, Avg, Count
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import F, Avg, Count, Q, Sum
 from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 from moonsheep import models
-from moonsheep.models import Task
+from moonsheep.models import Task, DataVersion, PendingProgressUpdate, User, UserStats
 from moonsheep.settings import MOONSHEEP
 
 
@@ -14,44 +19,221 @@ def update_total_progress(task: models.Task):
     """
     Update total progress of given task and all of its parents
 
-    # TODO in the future this should be run effectively by some backend job regularly #138
-    :param task:
-    :return:
+    Parents keep count and sum of progress of their subtasks, so instead of aggregating subtasks
+    only the difference of a child's progress is propagated up the tree; it stops as soon as progress doesn't change.
+
+    :param task: task which own progress has been changed and saved
     """
     from moonsheep.tasks import AbstractTask
 
-    while True:
-        # Update total progress of given task
-        # total_progress = ( average(subtasks progress) * average_number_of_subtasks(configured in task) + own_progress)
-        #                   / (average_number_of_subtasks(configured in task) + 1)
+    # Update total progress of given task
+    # total_progress = ( average(subtasks progress) * average_number_of_subtasks(configured in task) + own_progress)
+    #                   / (average_number_of_subtasks(configured in task) + 1)
+    if task.own_progress < 100:
+        # it has not subtasks yet, guess its number
+        average_number_of_subtasks = AbstractTask.create_task_instance(task).average_subtasks_count()
+        total_progress_sql = '%s'
+        params = [task.own_progress / (average_number_of_subtasks + 1)]
+    else:
+        # own_progress == 100, so there might be subtasks
+        total_progress_sql = '(t.children_progress_sum + 100) / (t.children_count + 1)'
+        params = []
 
-        if task.own_progress < 100:
-            # it has not subtasks yet, guess its number
-            average_number_of_subtasks = AbstractTask.create_task_instance(task).average_subtasks_count()
-            task.total_progress = task.own_progress / (average_number_of_subtasks + 1)
-        else:
-            # own_progress == 100, so there might be subtasks
-            subtasks = Task.objects.filter(parent=task) \
-                .aggregate(average_progress=Coalesce(Avg('total_progress'), 0), count=Count('id'))
+    task_table = Task._meta.db_table
 
-            task.total_progress = Decimal(
-                subtasks['average_progress'] * subtasks['count'] + 100) / (
-                                          subtasks['count'] + 1)
-        task.save()
+    with transaction.atomic(), connections['default'].cursor() as cursor:
+        cursor.execute(f"""UPDATE {task_table} t SET total_progress = {total_progress_sql}
+            FROM (SELECT id, total_progress FROM {task_table} WHERE id = %s FOR UPDATE) old
+            WHERE t.id = old.id
+            RETURNING t.total_progress, t.total_progress - old.total_progress, t.parent_id""", params + [task.id])
+        task.total_progress, delta, parent_id = cursor.fetchone()
 
         # Update total progress of all of its parents
-        if task.parent_id:
-            task = task.parent
-        else:
-            break
+        while parent_id and delta:
+            cursor.execute(f"""UPDATE {task_table} t SET
+                children_progress_sum = t.children_progress_sum + %s,
+                total_progress = CASE WHEN t.own_progress < 100 THEN t.total_progress
+                    ELSE (t.children_progress_sum + %s + 100) / (t.children_count + 1) END
+                FROM (SELECT id, total_progress FROM {task_table} WHERE id = %s FOR UPDATE) old
+                WHERE t.id = old.id
+                RETURNING t.total_progress - old.total_progress, t.parent_id""", [delta, delta, parent_id])
+            delta, parent_id = cursor.fetchone()
 
-    # now it must be a doc-descendant task, so compute progress of a document
     # Progress of a document is an average total progress of all of tasks created on such document.
     doc_progress = Task.objects.filter(doc_id=task.doc_id, parent=None) \
         .aggregate(Avg('total_progress'))['total_progress__avg']
 
-    Document = MOONSHEEP['DOCUMENT_MODEL']
-    Document.objects.filter(id=task.doc_id).update(progress=doc_progress)
+    doc_table = MOONSHEEP['DOCUMENT_MODEL']._meta.db_table
+    with connections['default'].cursor() as cursor:
+        cursor.execute(f"""UPDATE {doc_table} d SET progress = %s
+            FROM (SELECT id, progress FROM {doc_table} WHERE id = %s FOR UPDATE) old
+            WHERE d.id = old.id
+            RETURNING (old.progress = 100) <> (d.progress = 100)""", [doc_progress, task.doc_id])
+        _exported_changed(cursor.fetchall())
+
+
+def _exported_changed(rows):
+    """
+    Bumps DataVersion if any document became fully verified or stopped being so, as only those are exported
+
+    :param rows: (bool,) rows returned by document progress updates telling if the document crossed 100
+    """
+    if any(crossed for crossed, in rows):
+        transaction.on_commit(DataVersion.bump)
+
+
+def subtask_created(task: models.Task):
+    """
+    Count newly created task in its parent's subtasks
+    """
+    if task.parent_id:
+        Task.objects.filter(id=task.parent_id).update(
+            children_count=F('children_count') + 1,
+            children_progress_sum=F('children_progress_sum') + task.total_progress
+        )
+
+
+def progress_changed(task: models.Task):
+    """
+    Update total progress of given task and all of its parents right away
+    or schedule it for `moonsheep_update_progress` worker if MOONSHEEP['PROGRESS_UPDATE'] == 'deferred'
+
+    :param task: task which own progress has been changed and saved
+    """
+    if MOONSHEEP['PROGRESS_UPDATE'] == 'deferred':
+        schedule_progress_update([task.id])
+    else:
+        update_total_progress(task)
+
+
+def schedule_progress_update(task_ids: Iterable[int]):
+    """
+    Mark tasks to have their total progress updated by `moonsheep_update_progress` worker.
+    Several changes of a task before worker runs are recomputed once.
+    """
+    PendingProgressUpdate.objects.bulk_create([PendingProgressUpdate(task_id=task_id) for task_id in task_ids],
+                                              ignore_conflicts=True)
+
+
+def process_pending_progress_updates(batch_size: int = 1000) -> int:
+    """
+    Update total progress of a batch of tasks scheduled by `schedule_progress_update`
+
+    :param batch_size: maximal number of tasks taken at once
+    :return: number of processed tasks
+    """
+    table_name = PendingProgressUpdate._meta.db_table
+
+    with connections['default'].cursor() as cursor:
+        # Take tasks out of the queue at once, they will be scheduled again if progress changes meanwhile
+        cursor.execute(f"""DELETE FROM {table_name} WHERE task_id IN (
+            SELECT task_id FROM {table_name} LIMIT %s FOR UPDATE SKIP LOCKED
+        ) RETURNING task_id""", [batch_size])
+        task_ids = [row[0] for row in cursor.fetchall()]
+
+    if task_ids:
+        update_total_progress_bulk(task_ids=task_ids)
+
+    return len(task_ids)
+
+
+def update_total_progress_bulk(task_ids: Iterable[int] = None, doc_ids: Iterable[int] = None):
+    """
+    Update total progress of many tasks, their parents and documents at once
+
+    Instead of walking up from each task, tasks are grouped by their depth in the tree (found by recursive queries)
+    and each level is updated with one query starting from the deepest.
+
+    :param task_ids: update given tasks and all of their parents
+    :param doc_ids: update all tasks of given documents
+    If none is given all tasks are updated.
+    """
+    from moonsheep.tasks import AbstractTask
+
+    task_table = Task._meta.db_table
+    doc_table = MOONSHEEP['DOCUMENT_MODEL']._meta.db_table
+
+    if task_ids is not None:
+        task_ids = list(task_ids)
+        # walk up from each task, depth of a task is the distance from its root
+        depths_sql = f"""WITH RECURSIVE chain(start_id, id, parent_id, distance) AS (
+            SELECT id, id, parent_id, 0 FROM {task_table} WHERE id = ANY(%s)
+            UNION ALL
+            SELECT chain.start_id, t.id, t.parent_id, chain.distance + 1
+            FROM {task_table} t JOIN chain ON t.id = chain.parent_id
+        )
+        SELECT DISTINCT id, MAX(distance) OVER (PARTITION BY start_id) - distance FROM chain"""
+        depths_params = [task_ids]
+
+    else:
+        scope = Task.objects.all()
+        roots_filter = ''
+        depths_params = []
+        if doc_ids is not None:
+            doc_ids = list(doc_ids)
+            scope = scope.filter(doc_id__in=doc_ids)
+            roots_filter = 'AND doc_id = ANY(%s)'
+            depths_params = [doc_ids]
+
+        # walk down from root tasks
+        depths_sql = f"""WITH RECURSIVE tree(id, depth) AS (
+            SELECT id, 0 FROM {task_table} WHERE parent_id IS NULL {roots_filter}
+            UNION ALL
+            SELECT t.id, tree.depth + 1 FROM {task_table} t JOIN tree ON t.parent_id = tree.id
+        )
+        SELECT id, depth FROM tree"""
+
+    with connections['default'].cursor() as cursor:
+        cursor.execute(depths_sql, depths_params)
+        levels = collections.defaultdict(list)
+        for task_id, depth in cursor.fetchall():
+            levels[depth].append(task_id)
+
+        if task_ids is not None:
+            # tasks might have been given from the middle of the tree, so take all the ones that were walked
+            scope = Task.objects.filter(id__in=[task_id for ids in levels.values() for task_id in ids])
+            doc_ids = list(Task.objects.filter(id__in=task_ids).values_list('doc_id', flat=True).distinct())
+
+        # Tasks without subtasks yet don't depend on other tasks, their number of subtasks is guessed by the task type
+        unfinished = []
+        for task in scope.filter(own_progress__lt=100).iterator(chunk_size=1000):
+            average_number_of_subtasks = AbstractTask.create_task_instance(task).average_subtasks_count()
+            task.total_progress = task.own_progress / (average_number_of_subtasks + 1)
+            unfinished.append(task)
+
+            if len(unfinished) >= 1000:
+                Task.objects.bulk_update(unfinished, ['total_progress'])
+                unfinished = []
+        Task.objects.bulk_update(unfinished, ['total_progress'])
+
+        # Finished tasks depend on their subtasks, so update them level by level starting from the deepest
+        # Subtasks counters are rebuilt on the way
+        for depth in sorted(levels.keys(), reverse=True):
+            cursor.execute(f"""UPDATE {task_table} t
+                SET children_count = c.count,
+                    children_progress_sum = COALESCE(c.progress_sum, 0),
+                    total_progress = CASE WHEN t.own_progress < 100 THEN t.total_progress
+                        ELSE (COALESCE(c.progress_sum, 0) + 100) / (c.count + 1) END
+                FROM (
+                    SELECT p.id, SUM(s.total_progress) AS progress_sum, COUNT(s.id) AS count
+                    FROM {task_table} p LEFT JOIN {task_table} s ON s.parent_id = p.id
+                    WHERE p.id = ANY(%s)
+                    GROUP BY p.id
+                ) c
+                WHERE t.id = c.id""", [levels[depth]])
+
+        # Progress of a document is an average total progress of all of tasks created on such document.
+        docs_filter = 'AND doc_id = ANY(%s)' if doc_ids is not None else ''
+        cursor.execute(f"""UPDATE {doc_table} d
+            SET progress = r.progress
+            FROM (
+                SELECT doc_id, AVG(total_progress) AS progress FROM {task_table}
+                WHERE parent_id IS NULL {docs_filter}
+                GROUP BY doc_id
+            ) r, {doc_table} old
+            WHERE d.id = r.doc_id AND old.id = d.id
+            RETURNING (old.progress = 100) <> (d.progress = 100)""", [doc_ids] if doc_ids is not None else [])
+        _exported_changed(cursor.fetchall())
 
 
 def stats_documents_verified():
@@ -65,8 +247,6 @@ def stats_documents_verified():
     - total_progress
     - remaining
     """
-    # TODO cache it
-
     table_name = MOONSHEEP['DOCUMENT_MODEL'].objects.model._meta.db_table
 
     conn = connections['default']
@@ -81,55 +261,113 @@ def stats_documents_verified():
         """)
         docs = cursor.fetchone()
 
-    docs['verified_percents'] = Decimal(docs['verified']) / docs['total']
+    docs['verified_percents'] = Decimal(docs['verified']) / docs['total'] if docs['total'] else Decimal(0)
     docs['remaining'] = int(docs['total'] - docs['verified'])
 
-    return docs
+    return dict(docs)
 
 
 def stats_users():
     """
-    Show user stats
+    Show user stats, read from counters kept in UserStats
 
     :return: dict
     - registered
     - participated (at least one entry)
     - entries_total - number of all entries sent
-    - active TODO #140
+    - active - sending entries in the last 24 hours
     """
-    # TODO cache it
+    users = UserStats.objects.filter(user__is_staff=False).aggregate(
+        participated=Count('pk', filter=Q(entries_count__gt=0)),
+        entries_total=Coalesce(Sum('entries_count'), 0),
+        active=Count('pk', filter=Q(last_activity__gte=timezone.now() - datetime.timedelta(days=1))),
+    )
+    users['registered'] = User.objects.filter(is_staff=False).count()
 
-    conn = connections['default']
-    conn.ensure_connection()
+    return users
 
-    with conn.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-        cursor.execute("""
-select
-	count(id) as registered,
-	count(id) FILTER(where entries_count > 0) as participated,
-	sum(entries_count) as entries_total
-	from (
-	select
-		u.id as id,
-		count(e.id) as "entries_count"
-		-- max(e.timestamp)
-	from
-		"moonsheep_user" u
-	left join "moonsheep_entry" e on
-		e.user_id = u.id
-	where
-		u.is_staff = false
-	group by u.id) u
-""")
-
-        users = cursor.fetchone()
 
-    return users
+def entry_created(entry: models.Entry):
+    """
+    Count user's new entry
+    """
+    table_name = UserStats._meta.db_table
+
+    with connections['default'].cursor() as cursor:
+        cursor.execute(f"""INSERT INTO {table_name} (user_id, entries_count, verified_entries_count, last_activity)
+            VALUES (%s, 1, 0, %s)
+            ON CONFLICT (user_id) DO UPDATE SET
+                entries_count = {table_name}.entries_count + 1,
+                last_activity = EXCLUDED.last_activity""", [entry.user_id, timezone.now()])
+
+
+def entries_verified(task_id: int):
+    """
+    Count entries of a task that has been just cross-checked as verified
+    """
+    UserStats.objects.filter(user__in=models.Entry.objects.filter(task_id=task_id, closed_manually=False)
+                             .values('user_id')) \
+        .update(verified_entries_count=F('verified_entries_count') + 1)
+
+
+def rebuild_user_stats():
+    """
+    Recount entries of all users, ie. after entries were changed bypassing Moonsheep. Last activity is kept.
+    """
+    table_name = UserStats._meta.db_table
+
+    with connections['default'].cursor() as cursor:
+        cursor.execute(f"""INSERT INTO {table_name} (user_id, entries_count, verified_entries_count)
+            SELECT u.id, COUNT(e.id), COUNT(e.id) FILTER (WHERE t.state = %s AND NOT e.closed_manually)
+            FROM {User._meta.db_table} u
+            LEFT JOIN {models.Entry._meta.db_table} e ON e.user_id = u.id
+            LEFT JOIN {Task._meta.db_table} t ON t.id = e.task_id
+            GROUP BY u.id
+            ON CONFLICT (user_id) DO UPDATE SET
+                entries_count = EXCLUDED.entries_count,
+                verified_entries_count = EXCLUDED.verified_entries_count""", [Task.CROSSCHECKED])
+
+
+def leaderboard(by: str = 'entries', limit: int = 10) -> List[UserStats]:
+    """
+    Top users by the number of entries (by='entries') or verified entries (by='verified_entries')
+
+    :return: UserStats with their users
+    """
+    field = {'entries': 'entries_count', 'verified_entries': 'verified_entries_count'}[by]
+
+    return list(UserStats.objects.filter(user__is_staff=False, **{field + '__gt': 0})
+                .select_related('user').order_by('-' + field, 'user_id')[:limit])
+
+
+STATS = {
+    'documents_verified': stats_documents_verified,
+    'users': stats_users,
+}
+"""Statistics shown on dashboards, name -> function computing them"""
+
 
-# TODO
-# def stats_users_leaderboards():
-#     """
-#     Show user leaderboards:
-#     - by max entries
-#     - by accuracy
-#     """
+def _cache_key(name: str) -> str:
+    return 'moonsheep:stats:' + name
+
+
+def cached_stats(name: str) -> dict:
+    """
+    Returns statistics precomputed by `refresh_stats`
+
+    They're computed on the spot only if the cache has expired, ie. when `moonsheep_refresh_stats` is not running.
+    """
+    stats = cache.get(_cache_key(name))
+    if stats is None:
+        stats = STATS[name]()
+        cache.set(_cache_key(name), stats, MOONSHEEP['STATISTICS_CACHE_TTL'])
+
+    return stats
+
+
+def refresh_stats():
+    """
+    Computes all statistics and stores them in the cache for MOONSHEEP['STATISTICS_CACHE_TTL'] seconds
+    """
+    cache.set_many({_cache_key(name): compute() for name, compute in STATS.items()},
+                   MOONSHEEP['STATISTICS_CACHE_TTL'])
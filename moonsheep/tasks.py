@@ -5,12 +5,13 @@ from typing import List, Type
 from django.db import transaction
 from django.utils.decorators import classproperty
 
-from moonsheep import statistics
+from moonsheep import signals, statistics
+from moonsheep.choosers import get_task_chooser
 from moonsheep.json_field import JSONField
 from moonsheep.models import Task, Entry
 from moonsheep.settings import MOONSHEEP
 from .mapper import klass_from_name
-from .verifiers import MIN_CONFIDENCE, DEFAULT_DICT_VERIFIER
+from .verifiers import MIN_CONFIDENCE, plan_for
 from . import registry
 
 logger = logging.getLogger(__name__)
@@ -58,7 +59,7 @@ class AbstractTask(object):
             'url': url
         }
 
-    def verify_and_save(self, task_id: int) -> bool:
+    def verify_and_save(self, task_id: int, update_progress: bool = True, entries: List[Entry] = None) -> bool:
         """
         Called after a new entry was created. It crosschecks users' answers (entries) and if they match data is saved to structured db.
 
@@ -68,15 +69,19 @@ class AbstractTask(object):
         Progress of a task (and its parents) is being updated here.
 
         :param task_id: Identifier of the task
+        :param update_progress: Set to False if caller updates total progress of many tasks at once
+        :param entries: Task's entries if already loaded by the caller
         :return: True if cross-verified otherwise False
         """
 
         verified = False
+        was_crosschecked = self.instance.state == Task.CROSSCHECKED
 
         # Do the crosscheck if we have enough entries
         # TODO is task_id needed? we have self.instance.id
-        entries = Entry.objects.filter(task_id=task_id)
-        entries_count = entries.count()
+        if entries is None:
+            entries = list(Entry.objects.filter(task_id=task_id))
+        entries_count = len(entries)
 
         if entries_count >= MOONSHEEP['MIN_ENTRIES_TO_CROSSCHECK']:
             # So far we only take real data into account but in the future Verifiers might want also to look at users' "trustworthiness"
@@ -92,12 +97,16 @@ class AbstractTask(object):
                     # create new tasks
                     self.after_save(crosschecked)
 
+                    signals.verified_data_saved.send(sender=self.__class__, task=self, data=crosschecked)
+
+                    # entries are counted once, when the task becomes cross-checked
+                    if not was_crosschecked:
+                        statistics.entries_verified(task_id)
+
                 # update progress & state
                 self.instance.own_progress = 100
                 self.instance.state = Task.CROSSCHECKED
 
-                statistics.update_total_progress(self.instance)
-
             elif entries_count >= MOONSHEEP['MIN_ENTRIES_TO_MARK_DIRTY']:
                 self.instance.state = Task.DIRTY
 
@@ -106,10 +115,13 @@ class AbstractTask(object):
             self.instance.own_progress = 95 * (
                     1 - math.exp(-2 / MOONSHEEP['MIN_ENTRIES_TO_CROSSCHECK'] * entries_count))
 
-            statistics.update_total_progress(self.instance)
+        # Task's state might have changed also, so save that data;
+        # subtasks counters were updated in the database by after_save, so they're not overwritten here
+        self.instance.save(update_fields=['state', 'own_progress'])
+        get_task_chooser().task_updated(self.instance)
 
-        # Task's state might have changed also, so save that data
-        self.instance.save()
+        if update_progress:
+            statistics.progress_changed(self.instance)
 
         return verified
 
@@ -128,11 +140,15 @@ class AbstractTask(object):
             # create new tasks
             self.after_save(entry.data)
 
+            signals.verified_data_saved.send(sender=self.__class__, task=self, data=entry.data)
+
         # update progress & state
         self.instance.own_progress = 100
         self.instance.state = Task.CLOSED_MANUALLY
+        self.instance.save(update_fields=['state', 'own_progress'])
+        get_task_chooser().task_updated(self.instance)
 
-        statistics.update_total_progress(self.instance)
+        statistics.progress_changed(self.instance)
 
 
     def cross_check(self, entries: List[dict]) -> (dict, float):
@@ -142,7 +158,7 @@ class AbstractTask(object):
         :return (dict, float): (results, confidence)
         """
 
-        verifier = DEFAULT_DICT_VERIFIER(self, '')
+        verifier = plan_for(self)
         return verifier(entries)
 
     def save_verified_data(self, verified_data: dict):
@@ -179,7 +195,10 @@ class AbstractTask(object):
             'doc_id': properties['parent'].doc_id if 'parent' in properties else None
         })
 
-        return Task.objects.create(**properties)
+        task = Task.objects.create(**properties)
+        statistics.subtask_created(task)
+
+        return task
 
     # TODO change convention
     @staticmethod
@@ -191,7 +210,7 @@ class AbstractTask(object):
         :return: Task object
         """
 
-        klass = klass_from_name(task.type)
+        klass = registry.get_task_class(task.type)
         return klass(task)
 
     def average_subtasks_count(self):
@@ -5,7 +5,7 @@ from django.template import Library
 from django.template.defaultfilters import stringfilter
 from django.urls import reverse
 
-from moonsheep.statistics import stats_documents_verified, stats_users
+from moonsheep.statistics import cached_stats, leaderboard
 
 register = Library()
 
@@ -37,6 +37,16 @@ def pretty_url(value):
     return urllib.parse.unquote(os.path.basename(value))
 
 
-register.simple_tag(stats_documents_verified)
+@register.simple_tag
+def stats_documents_verified():
+    return cached_stats('documents_verified')
+
+
+@register.simple_tag
+def stats_users():
+    return cached_stats('users')
+
 
-register.simple_tag(stats_users)
+@register.simple_tag
+def stats_leaderboard(by='entries', limit=10):
+    return leaderboard(by, limit)
@@ -0,0 +1,13 @@
+from django.db import models
+
+from moonsheep.models import DocumentModel
+
+
+class Document(DocumentModel):
+    """
+    Document model used in tests
+    """
+    class Meta:
+        indexes = [
+            models.Index(fields=['progress', 'id'], name='document_progress_id'),
+        ]
@@ -0,0 +1,24 @@
+from moonsheep.tasks import AbstractTask
+
+
+class SimpleTask(AbstractTask):
+    """
+    Task used in tests, it records verified data instead of saving it in a domain model
+    """
+    saved = []
+
+    def save_verified_data(self, verified_data: dict):
+        SimpleTask.saved.append((self.instance.id, verified_data))
+
+    def average_subtasks_count(self):
+        return 0
+
+
+class ParentTask(SimpleTask):
+    """
+    Task creating three subtasks after its data is verified
+    """
+
+    def after_save(self, verified_data):
+        for i in range(3):
+            SimpleTask.create(params={'parent': self.instance.id, 'row': i}, parent=self.instance)
@@ -0,0 +1,88 @@
+from unittest import SkipTest
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import include, path
+
+try:
+    import rest_framework_json_api.renderers  # NOQA
+except ImportError as e:
+    # djangorestframework-jsonapi 2.x imports django.utils.six removed in Django 3.0
+    raise SkipTest(f"djangorestframework-jsonapi configured in REST_FRAMEWORK can't be imported: {e}")
+
+from moonsheep.exporters.api import AppApi, CursorPagination
+from moonsheep.models import DataVersion
+from moonsheep.tests.models import Document
+
+JSON_API = 'application/vnd.api+json'
+
+urlpatterns = [
+    path('api/', include(AppApi('tests').urls)),
+    path('api-cursor/', include((AppApi('tests', pagination_class=CursorPagination).urls[0], 'api-cursor'))),
+    path('api-cached/', include((AppApi('tests', cache_timeout=60).urls[0], 'api-cached'))),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AppApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        for i in range(25):
+            Document.objects.create(url=f'http://example.com/{i}', progress=100)
+
+    def get(self, link, **headers):
+        return self.client.get(link, HTTP_ACCEPT=JSON_API, **headers)
+
+    def follow_pages(self, link):
+        urls = []
+        while link:
+            response = self.get(link)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], JSON_API)
+            data = response.json()
+            urls += [doc['attributes']['url'] for doc in data['data']]
+            link = data['links']['next']
+
+        return urls
+
+    def test_page_number_pagination(self):
+        data = self.get('/api/document/?page[number]=2').json()
+
+        self.assertEqual([doc['attributes']['url'] for doc in data['data']],
+                         [f'http://example.com/{i}' for i in range(10, 20)])
+        self.assertEqual(data['meta']['pagination']['count'], 25)
+        self.assertEqual(self.follow_pages('/api/document/'), [f'http://example.com/{i}' for i in range(25)])
+
+    def test_cursor_pagination(self):
+        self.assertEqual(self.follow_pages('/api-cursor/document/?page[size]=10'),
+                         [f'http://example.com/{i}' for i in range(25)])
+
+    def test_not_modified(self):
+        response = self.get('/api/document/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        response = self.get('/api/document/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        DataVersion.bump()
+
+        response = self.get('/api/document/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_cached(self):
+        first = self.get('/api-cached/document/')
+        self.assertEqual(first.status_code, 200)
+
+        Document.objects.filter(url='http://example.com/0').update(url='http://example.com/changed')
+
+        # only the data version is read
+        with self.assertNumQueries(1):
+            second = self.get('/api-cached/document/')
+        self.assertEqual(second.content, first.content)
+
+        DataVersion.bump()
+        third = self.get('/api-cached/document/')
+        self.assertIn('http://example.com/changed', [doc['attributes']['url'] for doc in third.json()['data']])
@@ -0,0 +1,214 @@
+import io
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core import management
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase as DjangoTestCase
+from django.utils import timezone
+
+from moonsheep.choosers import DefaultTaskChooser, CachedTaskChooser, TaskChooser, get_task_chooser
+from moonsheep.exceptions import NoTasksLeft
+from moonsheep.models import Task, Entry, User, TaskLease
+from moonsheep.settings import MOONSHEEP
+
+
+class DefaultTaskChooserTest(DjangoTestCase):
+    def setUp(self):
+        self.user = User.objects.create_pseudonymous(nickname='volunteer')
+        self.chooser = DefaultTaskChooser()
+
+    def create_task(self, url, **kwargs):
+        return Task.objects.create(type='app.tasks.FindTableTask', params={'url': url}, doc_id=1, **kwargs)
+
+    def test_registered(self):
+        self.assertIs(TaskChooser.implementations()['default'], DefaultTaskChooser)
+        self.assertIsInstance(get_task_chooser(), DefaultTaskChooser)
+
+    def test_not_configured(self):
+        slug = MOONSHEEP['TASK_CHOOSER']
+        MOONSHEEP['TASK_CHOOSER'] = 'missing'
+        try:
+            with self.assertRaises(ImproperlyConfigured):
+                get_task_chooser()
+        finally:
+            MOONSHEEP['TASK_CHOOSER'] = slug
+
+    def test_no_tasks(self):
+        with self.assertRaises(NoTasksLeft):
+            self.chooser.choose(self.user)
+
+    def test_skips_not_open(self):
+        self.create_task('http://a', state=Task.DIRTY)
+        self.create_task('http://b', state=Task.CROSSCHECKED)
+
+        with self.assertRaises(NoTasksLeft):
+            self.chooser.choose(self.user)
+
+    def test_excludes_contributed(self):
+        contributed = self.create_task('http://a')
+        Entry.objects.create(task=contributed, user=self.user, data={})
+        task = self.create_task('http://b')
+
+        for _ in range(5):
+            self.assertEqual(self.chooser.choose(self.user), task)
+
+    def test_highest_priority_first(self):
+        self.chooser.sample_size = 1
+        self.create_task('http://a', priority=0.2)
+        task = self.create_task('http://b', priority=0.9)
+        self.create_task('http://c', priority=0.5)
+
+        self.assertEqual(self.chooser.choose(self.user), task)
+
+
+
+
+class TaskLeaseTest(DjangoTestCase):
+    def setUp(self):
+        self.user = User.objects.create_pseudonymous(nickname='volunteer')
+        self.others = [User.objects.create_pseudonymous(nickname=f'other{i}') for i in range(3)]
+        self.chooser = DefaultTaskChooser()
+        self.task = Task.objects.create(type='app.tasks.FindTableTask', params={'url': 'http://a'}, doc_id=1)
+
+    def lease(self, user, seconds=60):
+        TaskLease.objects.create(task=self.task, user=user, expires_at=timezone.now() + timedelta(seconds=seconds))
+
+    def test_lease_created(self):
+        self.chooser.choose(self.user)
+
+        lease = TaskLease.objects.get(task=self.task, user=self.user)
+        self.assertGreater(lease.expires_at, timezone.now())
+
+    def test_lease_renewed(self):
+        self.chooser.choose(self.user)
+        self.chooser.choose(self.user)
+
+        self.assertEqual(TaskLease.objects.count(), 1)
+
+    def test_fully_reserved(self):
+        for u in self.others:
+            self.lease(u)
+
+        with self.assertRaises(NoTasksLeft):
+            self.chooser.choose(self.user)
+
+    def test_reserved_counts_entries(self):
+        Entry.objects.create(task=self.task, user=self.others[0], data={})
+        Entry.objects.create(task=self.task, user=self.others[1], data={})
+        self.lease(self.others[2])
+
+        with self.assertRaises(NoTasksLeft):
+            self.chooser.choose(self.user)
+
+    def test_more_entries_needed(self):
+        # cross-check failed, but task is not dirty yet
+        for u in self.others:
+            Entry.objects.create(task=self.task, user=u, data={})
+
+        self.assertEqual(self.chooser.choose(self.user), self.task)
+
+    def test_expired_ignored(self):
+        for u in self.others:
+            self.lease(u, seconds=-1)
+
+        self.assertEqual(self.chooser.choose(self.user), self.task)
+
+    def test_released_on_entry(self):
+        self.chooser.choose(self.user)
+        self.chooser.entry_added(Entry.objects.create(task=self.task, user=self.user, data={}))
+
+        self.assertFalse(TaskLease.objects.exists())
+
+    def test_expire_command(self):
+        self.lease(self.others[0], seconds=-1)
+        self.lease(self.others[1])
+
+        management.call_command('moonsheep_expire_leases', stdout=io.StringIO())
+
+        self.assertEqual(list(TaskLease.objects.values_list('user', flat=True)), [self.others[1].id])
+
+class CachedTaskChooserTest(DjangoTestCase):
+    def setUp(self):
+        self.user = User.objects.create_pseudonymous(nickname='volunteer')
+        self.chooser = CachedTaskChooser()
+
+    def create_task(self, url, **kwargs):
+        return Task.objects.create(type='app.tasks.FindTableTask', params={'url': url}, doc_id=1, **kwargs)
+
+    def test_no_tasks(self):
+        with self.assertRaises(NoTasksLeft):
+            self.chooser.choose(self.user)
+
+    @patch.dict(MOONSHEEP, {'TASK_LEASE_TTL': None})
+    def test_served_from_cache(self):
+        task = self.create_task('http://a')
+        self.chooser.choose(self.user)
+
+        with self.assertNumQueries(1):  # just loading the sampled tasks
+            self.assertEqual(self.chooser.choose(self.user), task)
+
+    def test_deleted_task(self):
+        deleted = self.create_task('http://a', priority=0.9)
+        task = self.create_task('http://b', priority=0.1)
+        self.chooser.sample_size = 1
+        self.chooser.choose(self.user)
+
+        deleted.delete()
+
+        self.assertEqual(self.chooser.choose(self.user), task)
+        self.assertNotIn(deleted.id, sum(self.chooser._buckets.values(), []))
+
+    def test_changed_by_other_process(self):
+        task = self.create_task('http://a')
+        self.chooser.choose(self.user)
+
+        # cross-checked elsewhere, this process is not notified
+        Task.objects.filter(pk=task.pk).update(state=Task.CROSSCHECKED)
+
+        with self.assertRaises(NoTasksLeft):
+            self.chooser.choose(self.user)
+
+    def test_reserved_by_others(self):
+        task = self.create_task('http://a')
+        self.chooser.choose(self.user)
+
+        for i in range(3):
+            other = User.objects.create_pseudonymous(nickname=f'other{i}')
+            TaskLease.objects.create(task=task, user=other, expires_at=timezone.now() + timedelta(seconds=60))
+
+        with self.assertRaises(NoTasksLeft):
+            self.chooser.choose(self.user)
+
+        # still open, so it's kept in cache
+        self.assertIn(task.id, sum(self.chooser._buckets.values(), []))
+
+    def test_entry_added(self):
+        task = self.create_task('http://a')
+        other = self.create_task('http://b', priority=0.1)
+        self.chooser.sample_size = 1
+        self.assertEqual(self.chooser.choose(self.user), task)
+
+        entry = Entry.objects.create(task=task, user=self.user, data={})
+        self.chooser.entry_added(entry)
+
+        self.assertEqual(self.chooser.choose(self.user), other)
+
+    def test_task_updated(self):
+        task = self.create_task('http://a')
+        self.chooser.choose(self.user)
+
+        task.state = Task.CROSSCHECKED
+        task.save()
+        self.chooser.task_updated(task)
+
+        with self.assertRaises(NoTasksLeft):
+            self.chooser.choose(self.user)
+
+    def test_falls_back_to_database(self):
+        self.chooser.cache_size = 1
+        contributed = self.create_task('http://a', priority=0.9)
+        Entry.objects.create(task=contributed, user=self.user, data={})
+        task = self.create_task('http://b', priority=0.1)
+
+        self.assertEqual(self.chooser.choose(self.user), task)
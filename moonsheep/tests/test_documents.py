@@ -0,0 +1,113 @@
+import json
+from unittest.mock import patch
+from urllib.parse import urlencode
+
+from django.http import Http404
+from django.test import TestCase, RequestFactory, override_settings
+
+from moonsheep.models import Task
+from moonsheep.settings import MOONSHEEP
+from moonsheep.tests.models import Document
+from moonsheep.tests.tasks import SimpleTask
+from moonsheep.views import DocumentListView, DocumentTasksView
+
+
+@override_settings(ROOT_URLCONF='moonsheep.urls')
+@patch.dict(MOONSHEEP, {'DOCUMENT_MODEL': Document})
+class DocumentListViewTest(TestCase):
+    def setUp(self):
+        # progress ties are ordered by id
+        for i, progress in enumerate([0, 50, 0, 100, 0, 50, 0]):
+            Document.objects.create(url=f'http://example.com/{i}', progress=progress)
+        self.expected = list(Document.objects.order_by('-progress', '-id'))
+
+    def get_context(self, **params):
+        view = DocumentListView()
+        view.setup(RequestFactory().get('/documents', params))
+        return view.get_context_data()
+
+    @patch.object(DocumentListView, 'paginate_by', 3)
+    def test_pages(self):
+        pages = []
+        context = self.get_context()
+        self.assertIsNone(context['previous_cursor'])
+        while True:
+            pages.append(context['documents'])
+            if not context['next_cursor']:
+                break
+            context = self.get_context(after=context['next_cursor'])
+
+        self.assertEqual(pages, [self.expected[0:3], self.expected[3:6], self.expected[6:]])
+
+        # and back
+        context = self.get_context(before=self.get_context(after=self.get_context()['next_cursor'])['previous_cursor'])
+        self.assertEqual(context['documents'], self.expected[0:3])
+        self.assertIsNone(context['previous_cursor'])
+        self.assertIsNotNone(context['next_cursor'])
+
+    @patch.object(DocumentListView, 'paginate_by', 3)
+    def test_last_page(self):
+        last_page = self.get_context(after=f"{self.expected[5].progress}_{self.expected[5].id}")
+
+        self.assertEqual(last_page['documents'], self.expected[6:])
+        self.assertIsNone(last_page['next_cursor'])
+
+    @patch.object(DocumentListView, 'paginate_by', 3)
+    def test_page_kept_in_links(self):
+        cursor = f"{self.expected[2].progress}_{self.expected[2].id}"
+        doc = self.expected[3]
+
+        context = self.get_context(after=cursor)
+        self.assertEqual(context['page_query'], urlencode({'after': cursor}))
+
+        # expanding a document keeps the page
+        context = self.get_context(after=cursor, details_of=doc.id)
+        self.assertEqual(context['page_query'], urlencode({'after': cursor}))
+        self.assertEqual(context['details_doc_id'], doc.id)
+
+        self.assertEqual(self.get_context()['page_query'], '')
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(Http404):
+            self.get_context(after='abc')
+
+    def test_details(self):
+        doc = self.expected[0]
+        root = Task.objects.create(type=SimpleTask.name, params={'n': 'root'}, doc_id=doc.id, children_count=1)
+        Task.objects.create(type=SimpleTask.name, params={'n': 'child'}, doc_id=doc.id, parent=root)
+
+        context = self.get_context(details_of=doc.id)
+
+        self.assertEqual(context['tasks'], [root])
+        self.assertIsNone(context['next_task'])
+        self.assertEqual(context['details_doc_id'], doc.id)
+
+
+class DocumentTasksViewTest(TestCase):
+    def setUp(self):
+        self.root = Task.objects.create(type=SimpleTask.name, params={'n': 'root'}, doc_id=1)
+        self.children = [Task.objects.create(type=SimpleTask.name, params={'n': i}, doc_id=1, parent=self.root)
+                         for i in range(5)]
+        Task.objects.create(type=SimpleTask.name, params={'n': 'other'}, doc_id=2)
+
+    def get(self, **params):
+        response = DocumentTasksView.as_view()(RequestFactory().get('/', params), doc_id=1)
+        return json.loads(response.content)
+
+    def test_top_level(self):
+        data = self.get()
+
+        self.assertEqual([t['id'] for t in data['tasks']], [self.root.id])
+        self.assertIsNone(data['next'])
+
+    @patch.object(DocumentTasksView, 'paginate_by', 2)
+    def test_subtasks_paginated(self):
+        ids = []
+        data = self.get(parent=self.root.id)
+        while True:
+            ids += [t['id'] for t in data['tasks']]
+            if not data['next']:
+                break
+            data = self.get(parent=self.root.id, after=data['next'])
+
+        self.assertEqual(ids, [t.id for t in self.children])
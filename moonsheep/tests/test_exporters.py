@@ -0,0 +1,417 @@
+import csv
+import io
+import json
+import os
+import tarfile
+import tempfile
+import zipfile
+from decimal import Decimal
+from unittest import TestCase as UnitTestCase, skipIf
+from unittest.mock import patch
+
+import openpyxl
+from django.core import management
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase as DjangoTestCase, TransactionTestCase, RequestFactory
+
+from moonsheep.exporters import FileExporter, CSVFileExporter, NDJSONFileExporter, PgCopyFileExporter, \
+    FrictionlessFileExporter, XLSXFileExporter
+from moonsheep.exporters.archive import stream_zip, stream_tar_gz
+from moonsheep.exporters.parquet import ParquetFileExporter
+from moonsheep.models import ExportWatermark, ImportJob, Task
+from moonsheep.settings import MOONSHEEP
+from moonsheep.tests.models import Document
+from moonsheep.views import ExporterView
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+class StreamingExportersTest(DjangoTestCase):
+    def setUp(self):
+        for i in range(5):
+            Document.objects.create(url=f'http://example.com/{i}', progress=100)
+
+    def test_registered(self):
+        implementations = FileExporter.implementations()
+
+        self.assertIs(implementations['csv'], CSVFileExporter)
+        self.assertIs(implementations['ndjson'], NDJSONFileExporter)
+        self.assertIs(implementations['pgcopy'], PgCopyFileExporter)
+
+    def test_csv(self):
+        exporter = CSVFileExporter('tests')
+        exporter.chunk_size = 2
+        output = io.StringIO()
+
+        exporter.export(output)
+
+        rows = list(csv.reader(io.StringIO(output.getvalue())))
+        self.assertEqual(rows[0], ['id', 'url'])
+        self.assertEqual([row[1] for row in rows[1:]], [f'http://example.com/{i}' for i in range(5)])
+
+    def test_csv_empty(self):
+        Document.objects.all().delete()
+        output = io.StringIO()
+
+        CSVFileExporter('tests').export(output)
+
+        self.assertEqual(output.getvalue().splitlines(), ['id,url'])
+
+    def test_ndjson(self):
+        exporter = NDJSONFileExporter('tests')
+        exporter.chunk_size = 2
+        output = io.BytesIO()
+
+        exporter.export(output, model='document')
+
+        rows = [json.loads(line) for line in output.getvalue().decode('utf-8').splitlines()]
+        self.assertEqual([row['url'] for row in rows], [f'http://example.com/{i}' for i in range(5)])
+
+    def test_chunks(self):
+        exporter = NDJSONFileExporter('tests')
+        exporter.chunk_size = 2
+
+        [(fname, content)] = list(exporter.files())
+
+        self.assertEqual(fname, 'document.ndjson')
+        self.assertEqual([piece.count(b'\n') for piece in content], [2, 2, 1])
+
+    def test_directory(self):
+        output = tempfile.mkdtemp()
+
+        CSVFileExporter('tests').export(output)
+
+        self.assertEqual(os.listdir(output), ['document.csv'])
+
+    def test_pgcopy(self):
+        Document.objects.create(url='http://example.com/not-exported', progress=50)
+        output = io.BytesIO()
+
+        PgCopyFileExporter('tests').export(output)
+
+        expected = io.StringIO()
+        CSVFileExporter('tests').export(expected)
+        self.assertEqual(output.getvalue().decode('utf-8').splitlines(), expected.getvalue().splitlines())
+        self.assertNotIn(b'\r\n', output.getvalue())
+
+    def test_pgcopy_streamed(self):
+        for i in range(5, 200):
+            Document.objects.create(url=f'http://example.com/{i}', progress=100)
+        exporter = PgCopyFileExporter('tests')
+        exporter.read_size = 100
+
+        [(fname, content)] = list(exporter.files())
+        self.assertEqual(next(content), b'id,url\n')
+        self.assertTrue(next(content).startswith(f'{Document.objects.order_by("pk").first().id},'.encode('utf-8')))
+
+        # stopped before COPY is finished
+        content.close()
+        self.assertEqual(Document.objects.count(), 200)
+
+        pieces = list(exporter.files())[0][1]
+        self.assertEqual(b''.join(pieces).count(b'\n'), 201)
+
+    def test_unknown_model(self):
+        with self.assertRaises(ValueError):
+            CSVFileExporter('tests').export(io.StringIO(), model='missing')
+
+
+class ArchiveTest(UnitTestCase):
+    files = [('a.csv', [b'id,url\n', b'1,http://a\n']), ('b.csv', [b'id\n'])]
+
+    def test_zip(self):
+        data = b''.join(stream_zip(self.files))
+
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            self.assertEqual(archive.namelist(), ['a.csv', 'b.csv'])
+            self.assertEqual(archive.read('a.csv'), b'id,url\n1,http://a\n')
+
+    def test_tar_gz(self):
+        data = b''.join(stream_tar_gz(self.files))
+
+        with tarfile.open(fileobj=io.BytesIO(data), mode='r:gz') as archive:
+            self.assertEqual(archive.getnames(), ['a.csv', 'b.csv'])
+            self.assertEqual(archive.extractfile('a.csv').read(), b'id,url\n1,http://a\n')
+
+    def test_zip_streamed(self):
+        generated = []
+
+        def content():
+            for i in range(3):
+                generated.append(i)
+                yield b'x' * 100000
+
+        stream = stream_zip([('big.csv', content())])
+        next(stream)
+
+        # first bytes are sent before the whole file is generated
+        self.assertEqual(generated, [0])
+
+
+@patch.dict(MOONSHEEP, {'APP': 'tests'})
+class ExporterViewTest(DjangoTestCase):
+    def setUp(self):
+        Document.objects.create(url='http://example.com/1', progress=100)
+
+    def get(self, slug, **params):
+        request = RequestFactory().get('/export/' + slug, params)
+        return ExporterView.as_view()(request, slug=slug)
+
+    def test_streamed_zip(self):
+        response = self.get('csv')
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="tests-csv.zip"')
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archive:
+            self.assertEqual(archive.read('document.csv').decode('utf-8').splitlines(),
+                             ['id,url', f'{Document.objects.get().id},http://example.com/1'])
+
+    def test_streamed_tar_gz(self):
+        response = self.get('ndjson', archive='tar.gz')
+
+        with tarfile.open(fileobj=io.BytesIO(b''.join(response.streaming_content)), mode='r:gz') as archive:
+            self.assertEqual(archive.getnames(), ['document.ndjson'])
+
+    def test_unknown_archive(self):
+        from django.http import Http404
+
+        with self.assertRaises(Http404):
+            self.get('csv', archive='rar')
+
+    def test_temporary_files_removed(self):
+        temp_dir = tempfile.mkdtemp()
+
+        with patch('moonsheep.views.tempfile.mkdtemp', return_value=temp_dir):
+            response = self.get('xlsx')
+
+        self.assertFalse(os.path.exists(temp_dir))
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'PK'))
+
+
+class FrictionlessExporterTest(TransactionTestCase):
+    def setUp(self):
+        for i in range(3):
+            Document.objects.create(url=f'http://example.com/{i}', progress=100)
+
+    def test_directory(self):
+        output = tempfile.mkdtemp()
+
+        FrictionlessFileExporter('tests').export(output)
+
+        self.assertEqual(sorted(os.listdir(output)), ['datapackage.json', 'document.csv'])
+        with open(os.path.join(output, 'datapackage.json')) as f:
+            datapackage = json.load(f)
+        self.assertEqual(datapackage['resources'][0]['path'], 'document.csv')
+        self.assertEqual([fld['name'] for fld in datapackage['resources'][0]['schema']['fields']], ['id', 'url'])
+
+    def test_zip(self):
+        output = os.path.join(tempfile.mkdtemp(), 'export.zip')
+
+        FrictionlessFileExporter('tests').export(output)
+
+        with zipfile.ZipFile(output) as archive:
+            self.assertEqual(archive.namelist(), ['datapackage.json', 'document.csv'])
+            self.assertEqual(len(archive.read('document.csv').splitlines()), 4)
+
+    def test_tar_gz(self):
+        output = os.path.join(tempfile.mkdtemp(), 'export.tar.gz')
+
+        FrictionlessFileExporter('tests').export(output)
+
+        with tarfile.open(output, 'r:gz') as archive:
+            self.assertEqual(archive.getnames(), ['datapackage.json', 'document.csv'])
+
+    def test_parallel(self):
+        exporter = FrictionlessFileExporter('tests')
+        [(slug, model_cls, serializer_cls, queryset)] = list(exporter.models())
+        models = [(f'{slug}{i}', model_cls, serializer_cls, queryset) for i in range(4)]
+        output = tempfile.mkdtemp()
+
+        with patch.object(exporter, 'models', return_value=iter(models)):
+            exporter.export(output, workers=2)
+
+        with open(os.path.join(output, 'datapackage.json')) as f:
+            datapackage = json.load(f)
+        self.assertEqual([r['path'] for r in datapackage['resources']], [f'document{i}.csv' for i in range(4)])
+        for i in range(4):
+            with open(os.path.join(output, f'document{i}.csv')) as f:
+                self.assertEqual(len(f.read().splitlines()), 4)
+
+
+class PkWatermark:
+    watermark = 'pk'
+
+
+@patch.object(Document.Exported, 'watermark', 'pk', create=True)
+class DeltaExportTest(DjangoTestCase):
+    def export(self, delta='consumer'):
+        exporter = NDJSONFileExporter('tests', delta=delta)
+        output = io.BytesIO()
+        exporter.export(output)
+        exporter.save_watermarks()
+
+        return [json.loads(line)['url'] for line in output.getvalue().decode('utf-8').splitlines()]
+
+    def test_only_new(self):
+        Document.objects.create(url='http://example.com/1', progress=100)
+        self.assertEqual(self.export(), ['http://example.com/1'])
+
+        Document.objects.create(url='http://example.com/2', progress=100)
+        self.assertEqual(self.export(), ['http://example.com/2'])
+        self.assertEqual(self.export(), [])
+
+        watermark = ExportWatermark.objects.get(name='consumer', app_label='tests', model='document')
+        self.assertEqual(watermark.value, str(Document.objects.get(url='http://example.com/2').id))
+
+    def test_names_independent(self):
+        Document.objects.create(url='http://example.com/1', progress=100)
+        self.export('one')
+
+        self.assertEqual(self.export('two'), ['http://example.com/1'])
+
+    def test_not_saved_without_commit(self):
+        Document.objects.create(url='http://example.com/1', progress=100)
+        NDJSONFileExporter('tests', delta='consumer').export(io.BytesIO())
+
+        self.assertEqual(self.export(), ['http://example.com/1'])
+
+    def test_watermark_field(self):
+        Document.objects.create(url='http://example.com/b', progress=100)
+        Document.objects.create(url='http://example.com/a', progress=100)
+        self.export()
+        Document.objects.create(url='http://example.com/c', progress=100)
+
+        with patch.object(Document.Exported, 'watermark', 'url', create=True):
+            self.assertEqual(self.export('by-url'), ['http://example.com/b', 'http://example.com/a',
+                                                     'http://example.com/c'])
+            Document.objects.create(url='http://example.com/aa', progress=100)
+            Document.objects.create(url='http://example.com/d', progress=100)
+            self.assertEqual(self.export('by-url'), ['http://example.com/d'])
+
+    def test_command(self):
+        Document.objects.create(url='http://example.com/1', progress=100)
+        output = tempfile.mkdtemp()
+
+        management.call_command('moonsheep_export', 'tests', 'csv', '-o', output, '--delta')
+        management.call_command('moonsheep_export', 'tests', 'csv', '-o', output, '--delta')
+
+        with open(os.path.join(output, 'document.csv')) as f:
+            self.assertEqual(f.read().splitlines(), ['id,url'])
+        self.assertTrue(ExportWatermark.objects.filter(name='default').exists())
+
+    def test_watermark_required(self):
+        Document.objects.create(url='http://example.com/1', progress=100)
+
+        with patch.object(Document.Exported, 'watermark', None):
+            with self.assertRaises(ImproperlyConfigured):
+                self.export()
+
+    @patch.object(Task, 'Exported', PkWatermark, create=True)
+    @patch.object(ImportJob, 'Exported', PkWatermark, create=True)
+    def test_command_one_model(self):
+        Task.objects.create(type='tests.tasks.SimpleTask', params={}, doc_id=1)
+        ImportJob.objects.create(importer='h1', options={}, tasks_to_create=[])
+
+        def export(model):
+            stdout = io.TextIOWrapper(io.BytesIO(), encoding='utf-8')
+            with patch('sys.stdout', stdout):
+                management.call_command('moonsheep_export', 'moonsheep', 'ndjson', '--model', model, '--delta')
+            return stdout.buffer.getvalue().decode('utf-8').splitlines()
+
+        self.assertEqual(len(export('task')), 1)
+        self.assertEqual(list(ExportWatermark.objects.values_list('model', flat=True)), ['task'])
+
+        # job added before the export of tasks is still exported
+        self.assertEqual(len(export('importjob')), 1)
+        self.assertEqual(export('importjob'), [])
+
+    def test_frictionless_describes_delta(self):
+        doc = Document.objects.create(url='http://example.com/1', progress=100)
+        output = tempfile.mkdtemp()
+
+        FrictionlessFileExporter('tests', delta='consumer').export(output)
+
+        with open(os.path.join(output, 'datapackage.json')) as f:
+            datapackage = json.load(f)
+        self.assertEqual(datapackage['delta'], 'consumer')
+        self.assertEqual(datapackage['resources'][0]['delta'], {'field': 'pk', 'since': None, 'until': str(doc.id)})
+
+
+@skipIf(pyarrow is None, "pyarrow is not installed")
+class ParquetExporterTest(DjangoTestCase):
+    def test_typed_schema(self):
+        exporter = ParquetFileExporter('tests')
+        [(slug, model_cls, serializer_cls, queryset)] = list(exporter.models())
+
+        schema, names = exporter.schema(serializer_cls, model_cls)
+
+        self.assertEqual(names, ['id', 'url'])
+        self.assertEqual(schema.field('id').type, pyarrow.int32())
+        self.assertFalse(schema.field('id').nullable)
+        self.assertEqual(schema.field('url').type, pyarrow.string())
+
+    def test_decimal(self):
+        progress = Document._meta.get_field('progress')
+
+        self.assertEqual(ParquetFileExporter.arrow_type(progress), pyarrow.decimal128(6, 3))
+
+    def test_row_groups(self):
+        for i in range(5):
+            Document.objects.create(url=f'http://example.com/{i}', progress=100)
+        exporter = ParquetFileExporter('tests')
+        exporter.chunk_size = 2
+        output = io.BytesIO()
+
+        exporter.export(output)
+
+        parquet_file = pyarrow.parquet.ParquetFile(io.BytesIO(output.getvalue()))
+        self.assertEqual(parquet_file.num_row_groups, 3)
+        self.assertEqual(parquet_file.read().column('url').to_pylist(), [f'http://example.com/{i}' for i in range(5)])
+
+    @patch.object(Document.Exported, 'exclude', [])
+    def test_values(self):
+        Document.objects.create(url='http://example.com/1', progress=100)
+        output = io.BytesIO()
+
+        ParquetFileExporter('tests').export(output)
+
+        table = pyarrow.parquet.read_table(io.BytesIO(output.getvalue()))
+        self.assertEqual(table.column('progress').to_pylist(), [Decimal('100.000')])
+
+
+class XLSXExporterTest(DjangoTestCase):
+    def setUp(self):
+        for i in range(5):
+            Document.objects.create(url=f'http://example.com/{i}', progress=100)
+
+    def read(self, data):
+        workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True)
+        return [list(row) for row in workbook['document'].values]
+
+    def test_rows(self):
+        exporter = XLSXFileExporter('tests')
+        exporter.chunk_size = 2
+        output = io.BytesIO()
+
+        exporter.export(output)
+
+        rows = self.read(output.getvalue())
+        self.assertEqual(rows[0], ['id', 'url'])
+        self.assertEqual([row[1] for row in rows[1:]], [f'http://example.com/{i}' for i in range(5)])
+
+    def test_text_stream_with_buffer(self):
+        # ie. sys.stdout
+        buffer = io.BytesIO()
+        output = io.TextIOWrapper(buffer)
+
+        XLSXFileExporter('tests').export(output)
+
+        self.assertEqual(len(self.read(buffer.getvalue())), 6)
+
+    def test_text_stream(self):
+        with self.assertRaises(ValueError):
+            XLSXFileExporter('tests').export(io.StringIO())
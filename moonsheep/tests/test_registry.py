@@ -0,0 +1,46 @@
+from unittest.mock import patch
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+from moonsheep import registry
+from moonsheep.models import Task
+from moonsheep.settings import MOONSHEEP
+from moonsheep.tasks import AbstractTask
+from moonsheep.tests.tasks import SimpleTask
+
+
+class RegistryTest(SimpleTestCase):
+    def tearDown(self):
+        registry.unregister(SimpleTask)
+
+    def test_register(self):
+        registry.register(SimpleTask)
+
+        self.assertIs(registry.TASK_TYPES[SimpleTask.name], SimpleTask)
+        self.assertIs(registry.get_task_class(SimpleTask.name), SimpleTask)
+
+        registry.unregister(SimpleTask)
+        self.assertNotIn(SimpleTask.name, registry.TASK_TYPES)
+
+    def test_not_registered_imported(self):
+        self.assertIs(registry.get_task_class('moonsheep.tests.tasks.SimpleTask'), SimpleTask)
+
+    def test_create_task_instance(self):
+        task = Task(type='moonsheep.tests.tasks.SimpleTask', params={})
+
+        self.assertIsInstance(AbstractTask.create_task_instance(task), SimpleTask)
+
+    @patch.dict(MOONSHEEP, {'DOCUMENT_INITIAL_TASKS': ['moonsheep.tests.tasks.SimpleTask']})
+    def test_validate(self):
+        registry.validate_tasks()
+
+    @patch.dict(MOONSHEEP, {'DOCUMENT_INITIAL_TASKS': ['moonsheep.tests.tasks.MissingTask']})
+    def test_validate_missing(self):
+        with self.assertRaises(ImproperlyConfigured):
+            registry.validate_tasks()
+
+    @patch.dict(MOONSHEEP, {'DOCUMENT_INITIAL_TASKS': ['moonsheep.models.Task']})
+    def test_validate_not_a_task(self):
+        with self.assertRaises(ImproperlyConfigured):
+            registry.validate_tasks()
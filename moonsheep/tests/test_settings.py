@@ -8,6 +8,7 @@ INSTALLED_APPS = [
     "moonsheep",
     'django.contrib.auth',
     'django.contrib.contenttypes',
+    'moonsheep.tests',
 ]
 
 
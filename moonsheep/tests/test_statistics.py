@@ -0,0 +1,320 @@
+import io
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.core import management
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase as DjangoTestCase, TransactionTestCase
+
+from moonsheep import statistics
+from moonsheep.models import Task, DataVersion, PendingProgressUpdate, User, Entry, UserStats
+from moonsheep.settings import MOONSHEEP
+from moonsheep.signals import verified_data_saved
+from moonsheep.tasks import AbstractTask
+from moonsheep.tests.models import Document
+from moonsheep.tests.tasks import SimpleTask, ParentTask
+
+
+@patch.dict(MOONSHEEP, {'DOCUMENT_MODEL': Document})
+class TotalProgressTest(DjangoTestCase):
+    def setUp(self):
+        self.doc = Document.objects.create(url='http://a')
+        self.root = self.create_task('root', 100)
+        self.a = self.create_task('a', 100, parent=self.root)
+        self.a1 = self.create_task('a1', 50, parent=self.a)
+        self.a2 = self.create_task('a2', 100, parent=self.a)
+        self.b = self.create_task('b', 0, parent=self.root)
+
+    def create_task(self, name, own_progress, parent=None):
+        task = Task.objects.create(type=SimpleTask.name, params={'name': name}, doc_id=self.doc.id, parent=parent,
+                                   own_progress=own_progress)
+        statistics.subtask_created(task)
+        return task
+
+    def assertProgress(self, task, progress):
+        task.refresh_from_db()
+        self.assertAlmostEqual(task.total_progress, Decimal(progress), places=2)
+
+    def assertTreeProgress(self):
+        self.assertProgress(self.a1, 50)
+        self.assertProgress(self.a2, 100)
+        self.assertProgress(self.a, 83.333)
+        self.assertProgress(self.b, 0)
+        self.assertProgress(self.root, 61.111)
+
+        self.doc.refresh_from_db()
+        self.assertAlmostEqual(self.doc.progress, Decimal(61.111), places=2)
+
+    def test_walking_up(self):
+        statistics.update_total_progress(self.a2)
+        statistics.update_total_progress(self.a1)
+
+        self.assertTreeProgress()
+
+    def test_subtasks_counters(self):
+        statistics.update_total_progress(self.a2)
+        statistics.update_total_progress(self.a1)
+
+        self.root.refresh_from_db()
+        self.assertEqual(self.root.children_count, 2)
+        self.assertAlmostEqual(self.root.children_progress_sum, Decimal(83.333), places=2)
+
+    def test_walking_up_stops_if_not_changed(self):
+        statistics.update_total_progress(self.a1)
+
+        # savepoint, update of a1, savepoint release, document progress select & update
+        with self.assertNumQueries(5):
+            statistics.update_total_progress(self.a1)
+
+    def test_bulk_rebuilds_counters(self):
+        Task.objects.update(children_count=0, children_progress_sum=0)
+
+        statistics.update_total_progress_bulk()
+
+        self.assertTreeProgress()
+        self.a.refresh_from_db()
+        self.assertEqual(self.a.children_count, 2)
+        self.assertAlmostEqual(self.a.children_progress_sum, Decimal(150), places=2)
+
+    def test_bulk_all(self):
+        statistics.update_total_progress_bulk()
+
+        self.assertTreeProgress()
+
+    def test_bulk_documents(self):
+        other = Document.objects.create(url='http://b')
+
+        statistics.update_total_progress_bulk(doc_ids=[self.doc.id])
+
+        self.assertTreeProgress()
+        other.refresh_from_db()
+        self.assertEqual(other.progress, 0)
+
+    def test_bulk_tasks(self):
+        statistics.update_total_progress_bulk(task_ids=[self.a1.id, self.a2.id, self.b.id])
+
+        self.assertTreeProgress()
+
+    @patch.dict(MOONSHEEP, {'PROGRESS_UPDATE': 'deferred'})
+    def test_deferred(self):
+        statistics.progress_changed(self.a1)
+        statistics.progress_changed(self.a1)
+        statistics.progress_changed(self.a2)
+        self.assertEqual(PendingProgressUpdate.objects.count(), 2)
+        self.assertProgress(self.root, 0)
+
+        self.assertEqual(statistics.process_pending_progress_updates(), 2)
+
+        self.assertFalse(PendingProgressUpdate.objects.exists())
+        self.assertProgress(self.a, 83.333)
+
+    def test_command(self):
+        management.call_command('moonsheep_update_progress', '--all', stdout=io.StringIO())
+
+        self.assertTreeProgress()
+
+
+@patch.dict(MOONSHEEP, {'MIN_ENTRIES_TO_CROSSCHECK': 1, 'DOCUMENT_MODEL': Document})
+class SubtasksProgressTest(DjangoTestCase):
+    def setUp(self):
+        SimpleTask.saved = []
+        self.user = User.objects.create_pseudonymous(nickname='volunteer')
+        self.doc = Document.objects.create(url='http://a')
+
+    def verify(self, task):
+        Entry.objects.create(task=task, user=self.user, data={'fld': 'val'})
+        AbstractTask.create_task_instance(task).verify_and_save(task.id)
+
+    def test_subtasks_created_in_after_save(self):
+        parent = Task.objects.create(type=ParentTask.name, params={}, doc_id=self.doc.id)
+        self.verify(parent)
+
+        parent.refresh_from_db()
+        self.assertEqual(parent.children_count, 3)
+        self.assertEqual(parent.total_progress, 25)
+        self.assertEqual(Document.objects.get().progress, 25)
+
+        for subtask in Task.objects.filter(parent=parent):
+            self.verify(subtask)
+
+        parent.refresh_from_db()
+        self.assertEqual(parent.children_count, 3)
+        self.assertEqual(parent.total_progress, 100)
+        self.assertEqual(Document.objects.get().progress, 100)
+
+    def test_verified_manually(self):
+        parent = Task.objects.create(type=ParentTask.name, params={}, doc_id=self.doc.id)
+        entry = Entry.objects.create(task=parent, user=self.user, data={'fld': 'val'}, closed_manually=True)
+        ParentTask(parent).verified_manually(parent.id, entry)
+
+        parent.refresh_from_db()
+        self.assertEqual(parent.children_count, 3)
+        self.assertEqual(parent.total_progress, 25)
+
+
+class DataVersionTest(TransactionTestCase):
+    def test_bumped_on_verified_data_saved(self):
+        DataVersion.current('tests')
+
+        with transaction.atomic():
+            verified_data_saved.send(sender=None, task=None, data={})
+            self.assertEqual(DataVersion.current('tests').version, 0)
+
+        self.assertEqual(DataVersion.current('tests').version, 1)
+
+
+@patch.dict(MOONSHEEP, {'DOCUMENT_MODEL': Document})
+class DocumentVerifiedVersionTest(TransactionTestCase):
+    def setUp(self):
+        self.doc = Document.objects.create(url='http://a')
+        self.task = Task.objects.create(type=SimpleTask.name, params={}, doc_id=self.doc.id, own_progress=50)
+        DataVersion.current('tests')
+
+    def version(self):
+        return DataVersion.current('tests').version
+
+    def test_sync(self):
+        statistics.update_total_progress(self.task)
+        self.assertEqual(self.version(), 0)
+
+        Task.objects.filter(id=self.task.id).update(own_progress=100)
+        self.task.refresh_from_db()
+        statistics.update_total_progress(self.task)
+
+        self.assertEqual(Document.objects.get().progress, 100)
+        self.assertEqual(self.version(), 1)
+
+    @patch.dict(MOONSHEEP, {'PROGRESS_UPDATE': 'deferred'})
+    def test_deferred(self):
+        Task.objects.filter(id=self.task.id).update(own_progress=100)
+        statistics.progress_changed(self.task)
+        self.assertEqual(self.version(), 0)
+
+        statistics.process_pending_progress_updates()
+
+        self.assertEqual(Document.objects.get().progress, 100)
+        self.assertEqual(self.version(), 1)
+
+        # not verified anymore
+        Task.objects.filter(id=self.task.id).update(own_progress=50)
+        statistics.update_total_progress_bulk(doc_ids=[self.doc.id])
+        self.assertEqual(self.version(), 2)
+
+
+@patch.dict(MOONSHEEP, {'DOCUMENT_MODEL': Document})
+class StatisticsCacheTest(DjangoTestCase):
+    def setUp(self):
+        cache.clear()
+        doc = Document.objects.create(url='http://a', progress=100)
+        Document.objects.create(url='http://b')
+        task = Task.objects.create(type=SimpleTask.name, params={}, doc_id=doc.id)
+        user = User.objects.create_user('a@example.com', nickname='a')
+        User.objects.create_user('b@example.com', nickname='b')
+        Entry.objects.create(task=task, user=user, data={})
+
+    def test_cached(self):
+        users = statistics.cached_stats('users')
+        self.assertEqual(users['registered'], 2)
+        self.assertEqual(users['participated'], 1)
+        self.assertEqual(users['entries_total'], 1)
+
+        User.objects.create_user('c@example.com', nickname='c')
+        with self.assertNumQueries(0):
+            self.assertEqual(statistics.cached_stats('users'), users)
+
+    def test_refresh(self):
+        self.assertEqual(statistics.cached_stats('documents_verified')['verified'], 1)
+
+        Document.objects.update(progress=100)
+        management.call_command('moonsheep_refresh_stats', stdout=io.StringIO())
+
+        with self.assertNumQueries(0):
+            docs = statistics.cached_stats('documents_verified')
+        self.assertEqual(docs['verified'], 2)
+        self.assertEqual(docs['remaining'], 0)
+
+    def test_no_documents(self):
+        Document.objects.all().delete()
+        statistics.refresh_stats()
+
+        self.assertEqual(statistics.cached_stats('documents_verified')['verified_percents'], 0)
+
+
+@patch.dict(MOONSHEEP, {'MIN_ENTRIES_TO_CROSSCHECK': 2, 'DOCUMENT_MODEL': Document})
+class UserStatsTest(DjangoTestCase):
+    def setUp(self):
+        self.users = [User.objects.create_pseudonymous(nickname=f'volunteer{i}') for i in range(3)]
+        self.doc = Document.objects.create(url='http://a')
+
+    def create_task(self, name, users, value='val'):
+        task = Task.objects.create(type=SimpleTask.name, params={'name': name}, doc_id=self.doc.id)
+        for user in users:
+            Entry.objects.create(task=task, user=user, data={'fld': value})
+        return task
+
+    def test_counters(self):
+        a, b, c = self.users
+        verified = self.create_task('verified', [a, b])
+        self.create_task('open', [a])
+
+        SimpleTask(verified).verify_and_save(verified.id)
+
+        stats = {s.user: s for s in UserStats.objects.all()}
+        self.assertEqual(stats[a].entries_count, 2)
+        self.assertEqual(stats[a].verified_entries_count, 1)
+        self.assertEqual(stats[b].entries_count, 1)
+        self.assertEqual(stats[b].verified_entries_count, 1)
+        self.assertIsNotNone(stats[a].last_activity)
+        self.assertNotIn(c, stats)
+
+        self.assertEqual(statistics.stats_users(), {
+            'registered': 3, 'participated': 2, 'entries_total': 3, 'active': 2
+        })
+
+    def test_verified_counted_once(self):
+        a, b, c = self.users
+        task = self.create_task('verified', [a, b])
+        SimpleTask(task).verify_and_save(task.id)
+
+        # a late entry verifies the task again
+        Entry.objects.create(task=task, user=c, data={'fld': 'val'})
+        task.refresh_from_db()
+        SimpleTask(task).verify_and_save(task.id)
+
+        counts = {s.user: (s.entries_count, s.verified_entries_count) for s in UserStats.objects.all()}
+        self.assertEqual(counts, {a: (1, 1), b: (1, 1), c: (1, 0)})
+
+    def test_counted_on_any_creation(self):
+        a, b, c = self.users
+        task = Task.objects.create(type=SimpleTask.name, params={}, doc_id=self.doc.id)
+        Entry(task=task, user=a, data={}).save()
+        Entry.objects.create(task=task, user=b, data={})
+
+        self.assertEqual(UserStats.objects.get(user=a).entries_count, 1)
+        self.assertEqual(UserStats.objects.get(user=b).entries_count, 1)
+
+    def test_leaderboard(self):
+        a, b, c = self.users
+        self.create_task('1', [b, c])
+        self.create_task('2', [b])
+        verified = self.create_task('3', [a, c])
+        SimpleTask(verified).verify_and_save(verified.id)
+
+        self.assertEqual([s.user for s in statistics.leaderboard()], [b, c, a])
+        self.assertEqual([s.user for s in statistics.leaderboard('verified_entries')], [a, c])
+        self.assertEqual([s.user for s in statistics.leaderboard(limit=1)], [b])
+
+    def test_rebuild(self):
+        a, b, c = self.users
+        verified = self.create_task('verified', [a, b])
+        SimpleTask(verified).verify_and_save(verified.id)
+        Entry.objects.create(task=verified, user=c, data={'fld': 'val'})
+        UserStats.objects.filter(user=a).update(entries_count=10, verified_entries_count=0)
+        UserStats.objects.filter(user=c).delete()
+
+        management.call_command('moonsheep_rebuild_user_stats', stdout=io.StringIO())
+
+        counts = {s.user: (s.entries_count, s.verified_entries_count) for s in UserStats.objects.all()}
+        self.assertEqual(counts, {a: (1, 1), b: (1, 1), c: (1, 1)})
+        self.assertIsNotNone(UserStats.objects.get(user=a).last_activity)
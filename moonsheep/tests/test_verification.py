@@ -0,0 +1,234 @@
+import io
+import threading
+from unittest.mock import patch
+
+from django.core import management
+from django.db import connection, transaction
+from django.test import TestCase as DjangoTestCase, TransactionTestCase
+
+from moonsheep.models import Task, Entry, User, VerificationJob
+from moonsheep.settings import MOONSHEEP
+from moonsheep.tests.models import Document
+from moonsheep.tests.tasks import SimpleTask
+from moonsheep.verification import enqueue, process_jobs, retry_failed_jobs, verify_tasks, reverify
+
+
+@patch.dict(MOONSHEEP, {'MIN_ENTRIES_TO_CROSSCHECK': 2, 'VERIFICATION': 'queued', 'DOCUMENT_MODEL': Document})
+class QueuedVerificationTest(DjangoTestCase):
+    def setUp(self):
+        SimpleTask.saved = []
+        self.users = [User.objects.create_pseudonymous(nickname=f'volunteer{i}') for i in range(2)]
+        self.doc = Document.objects.create(url='http://a')
+        self.task = Task.objects.create(type=SimpleTask.name, params={'url': 'http://a'}, doc_id=self.doc.id)
+
+    def add_entry(self, user, data):
+        entry = Entry.objects.create(task=self.task, user=user, data=data)
+        enqueue(entry)
+        return entry
+
+    def test_nothing_queued(self):
+        self.assertEqual(process_jobs(), 0)
+
+    def test_verified(self):
+        self.add_entry(self.users[0], {'fld': 'val'})
+        self.add_entry(self.users[1], {'fld': 'val'})
+
+        self.assertEqual(process_jobs(), 2)
+
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.state, Task.CROSSCHECKED)
+        self.assertEqual(SimpleTask.saved, [(self.task.id, {'fld': 'val'})])
+        self.assertFalse(VerificationJob.objects.exists())
+
+    def test_batch_size(self):
+        self.add_entry(self.users[0], {'fld': 'val'})
+        self.add_entry(self.users[1], {'fld': 'val'})
+        other = Task.objects.create(type=SimpleTask.name, params={'url': 'http://b'}, doc_id=self.doc.id)
+        enqueue(Entry.objects.create(task=other, user=self.users[0], data={'fld': 'val'}))
+
+        # all entries of a task are processed together
+        self.assertEqual(process_jobs(batch_size=1), 2)
+        self.assertEqual(list(VerificationJob.objects.values_list('task_id', flat=True)), [other.id])
+
+    def test_failure_does_not_block_queue(self):
+        self.add_entry(self.users[0], {'fld': 'val'})
+
+        with patch.object(SimpleTask, 'verify_and_save', side_effect=ValueError):
+            self.assertEqual(process_jobs(), 1)
+
+        job = VerificationJob.objects.get()
+        self.assertIsNotNone(job.failed_at)
+        self.assertIn('ValueError', job.error)
+        self.assertEqual(Entry.objects.count(), 1)
+
+        # failed jobs are not taken again until retried
+        self.assertEqual(process_jobs(), 0)
+
+        self.assertEqual(retry_failed_jobs(), 1)
+        self.assertEqual(process_jobs(), 1)
+        self.assertFalse(VerificationJob.objects.exists())
+
+    def test_command(self):
+        self.add_entry(self.users[0], {'fld': 'val'})
+        out = io.StringIO()
+
+        management.call_command('moonsheep_verify', stdout=out)
+
+        self.assertIn("Processed 1 entries", out.getvalue())
+        self.task.refresh_from_db()
+        self.assertGreater(self.task.own_progress, 0)
+
+
+@patch.dict(MOONSHEEP, {'MIN_ENTRIES_TO_CROSSCHECK': 2, 'VERIFICATION': 'queued', 'DOCUMENT_MODEL': Document})
+class ConcurrentWorkersTest(TransactionTestCase):
+    def test_task_locked_by_other_worker(self):
+        user = User.objects.create_pseudonymous(nickname='volunteer')
+        task = Task.objects.create(type=SimpleTask.name, params={'url': 'http://a'}, doc_id=1)
+        enqueue(Entry.objects.create(task=task, user=user, data={'fld': 'val'}))
+
+        locked, release = threading.Event(), threading.Event()
+
+        def other_worker():
+            try:
+                with transaction.atomic():
+                    Task.objects.select_for_update().get(id=task.id)
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=other_worker)
+        thread.start()
+        locked.wait(10)
+        try:
+            self.assertEqual(process_jobs(), 0)
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual(VerificationJob.objects.count(), 1)
+        self.assertEqual(process_jobs(), 1)
+
+
+@patch.dict(MOONSHEEP, {'MIN_ENTRIES_TO_CROSSCHECK': 2, 'MIN_ENTRIES_TO_MARK_DIRTY': 2, 'DOCUMENT_MODEL': Document})
+class ReverifyWorkersTest(TransactionTestCase):
+    def test_workers(self):
+        SimpleTask.saved = []
+        users = [User.objects.create_pseudonymous(nickname=f'volunteer{i}') for i in range(2)]
+        for i in range(10):
+            task = Task.objects.create(type=SimpleTask.name, params={'url': f'http://{i}'}, doc_id=1)
+            for user, value in zip(users, ['val', 'val' if i % 2 else 'other']):
+                Entry.objects.create(task=task, user=user, data={'fld': value})
+
+        counts = reverify(Task.objects.all(), chunk_size=3, workers=2)
+
+        self.assertEqual(counts, {Task.CROSSCHECKED: 5, Task.DIRTY: 5})
+        # connection of this process is still usable
+        self.assertEqual(Task.objects.filter(state=Task.CROSSCHECKED).count(), 5)
+
+
+@patch.dict(MOONSHEEP, {'MIN_ENTRIES_TO_CROSSCHECK': 2, 'DOCUMENT_MODEL': Document})
+class VerifyTasksTest(DjangoTestCase):
+    def setUp(self):
+        SimpleTask.saved = []
+        self.users = [User.objects.create_pseudonymous(nickname=f'volunteer{i}') for i in range(2)]
+        self.doc = Document.objects.create(url='http://a')
+
+    def create_task(self, url, values):
+        task = Task.objects.create(type=SimpleTask.name, params={'url': url}, doc_id=self.doc.id)
+        for user, value in zip(self.users, values):
+            Entry.objects.create(task=task, user=user, data={'fld': value})
+        return task
+
+    def test_verified(self):
+        matching = self.create_task('http://a', ['val', 'val'])
+        conflicting = self.create_task('http://b', ['val', 'other'])
+        single = self.create_task('http://c', ['val'])
+
+        results = verify_tasks(Task.objects.all())
+
+        self.assertEqual(results, {matching.id: True, conflicting.id: False, single.id: False})
+        self.assertEqual(SimpleTask.saved, [(matching.id, {'fld': 'val'})])
+
+    def test_entries_loaded_at_once(self):
+        tasks = [self.create_task(f'http://{i}', ['val']) for i in range(5)]
+
+        # tasks, entries and per task: savepoint, update and savepoint release
+        with self.assertNumQueries(2 + 3 * len(tasks)):
+            verify_tasks(Task.objects.all())
+
+
+@patch.dict(MOONSHEEP, {'MIN_ENTRIES_TO_CROSSCHECK': 2, 'MIN_ENTRIES_TO_MARK_DIRTY': 2, 'DOCUMENT_MODEL': Document})
+class ReverifyTest(DjangoTestCase):
+    def setUp(self):
+        SimpleTask.saved = []
+        self.users = [User.objects.create_pseudonymous(nickname=f'volunteer{i}') for i in range(2)]
+        self.doc = Document.objects.create(url='http://a')
+
+    def create_task(self, url, values, **kwargs):
+        task = Task.objects.create(type=SimpleTask.name, params={'url': url}, doc_id=self.doc.id, **kwargs)
+        for user, value in zip(self.users, values):
+            Entry.objects.create(task=task, user=user, data={'fld': value})
+        return task
+
+    def test_reverify(self):
+        # left open when more entries were needed
+        matching = self.create_task('http://a', ['val', 'val'])
+        conflicting = self.create_task('http://b', ['val', 'other'])
+        single = self.create_task('http://c', ['val'])
+
+        counts = reverify(Task.objects.all(), workers=0)
+
+        self.assertEqual(counts, {Task.CROSSCHECKED: 1, Task.DIRTY: 1, Task.OPEN: 1})
+        self.assertEqual(SimpleTask.saved, [(matching.id, {'fld': 'val'})])
+        states = dict(Task.objects.values_list('id', 'state'))
+        self.assertEqual(states, {matching.id: Task.CROSSCHECKED, conflicting.id: Task.DIRTY, single.id: Task.OPEN})
+
+        matching.refresh_from_db()
+        self.assertEqual(matching.total_progress, 100)
+
+    def test_unchanged(self):
+        self.create_task('http://a', ['val', 'val'])
+        reverify(Task.objects.all(), workers=0)
+        SimpleTask.saved = []
+
+        counts = reverify(Task.objects.all(), workers=0)
+
+        self.assertEqual(counts, {'unchanged': 1})
+        self.assertEqual(SimpleTask.saved, [])
+
+    def test_dry_run(self):
+        task = self.create_task('http://a', ['val', 'val'])
+
+        counts = reverify(Task.objects.all(), workers=0, dry_run=True)
+
+        self.assertEqual(counts, {Task.CROSSCHECKED: 1})
+        self.assertEqual(SimpleTask.saved, [])
+        task.refresh_from_db()
+        self.assertEqual(task.state, Task.OPEN)
+
+    def test_small_chunks(self):
+        for i in range(5):
+            self.create_task(f'http://{i}', ['val', 'val'])
+
+        counts = reverify(Task.objects.all(), chunk_size=2, workers=0)
+
+        self.assertEqual(counts, {Task.CROSSCHECKED: 5})
+
+    def test_command(self):
+        self.create_task('http://a', ['val', 'val'])
+        self.create_task('http://b', ['val', 'val'], state=Task.CROSSCHECKED)
+        out = io.StringIO()
+
+        management.call_command('moonsheep_reverify', '--workers', '2', stdout=out)
+
+        self.assertIn("Changed: 1 crosschecked, 0 dirty, 0 open", out.getvalue())
+        self.assertEqual(Task.objects.filter(state=Task.CROSSCHECKED).count(), 2)
+
+    def test_command_type(self):
+        self.create_task('http://a', ['val', 'val'])
+        out = io.StringIO()
+
+        management.call_command('moonsheep_reverify', '--type', 'app.tasks.OtherTask', '--workers', '0', stdout=out)
+
+        self.assertIn("Changed: 0 crosschecked", out.getvalue())
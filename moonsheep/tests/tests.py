@@ -14,7 +14,7 @@ from moonsheep.exceptions import PresenterNotDefined, TaskMustSetTemplate, NoTas
 from moonsheep.forms import MultipleRangeField
 from moonsheep.mapper import ModelMapper
 from moonsheep.tasks import AbstractTask
-from moonsheep.verifiers import equals, OrderedListVerifier
+from moonsheep.verifiers import equals, OrderedListVerifier, AlignedListVerifier, DictVerifier, plan_for
 from moonsheep.views import unpack_post, TaskView
 
 
@@ -665,6 +665,23 @@ class UnpackPostTest(UnitTestCase):
             }]
         })
 
+    def test_nested_rows_missing_index(self):
+        post = QueryDict('row[2][entry_options][1]=val2&row[2][entry_options][0]=val1&row[5][entry_id]=val3')
+        self.assertDictEqual(unpack_post(post), {
+            'row': [
+                {'entry_options': ['val1', 'val2']},
+                {'entry_id': 'val3'}
+            ]
+        })
+
+    def test_invalid_name(self):
+        with self.assertRaises(Exception):
+            unpack_post(QueryDict('row[0]]=val1'))
+
+    def test_value_and_object(self):
+        with self.assertRaises(Exception):
+            unpack_post(QueryDict('obj=val1&obj[field]=val2'))
+
 
 @override_settings(ROOT_URLCONF='moonsheep.urls')
 class TaskProcessingTests(DjangoTestCase):
@@ -919,6 +936,97 @@ class VerifierListTest(UnitTestCase):
         # self.assertEquals(result, None)
 
 
+class VerifierAlignedListTest(UnitTestCase):
+    def setUp(self):
+        self.verifier = AlignedListVerifier(AbstractTask(DummyAbstracTask(info={'url': 'https://bla.pl'})), '')
+
+    def test_all_same(self):
+        entry = ['val1', 'val2', 'val3', 'val4']
+        (result, confidence) = self.verifier([entry, entry, entry])
+
+        self.assertEquals(result, entry)
+        self.assertEquals(confidence, 1)
+
+    def test_inserted_row(self):
+        rows = [{'name': f'row{i}', 'value': i} for i in range(10)]
+        inserted = rows[:2] + [{'name': 'extra', 'value': 100}] + rows[2:]
+        (result, confidence) = self.verifier([rows, inserted, rows])
+
+        self.assertEquals(result, rows)
+        self.assertGreaterEqual(confidence, 0.9)
+        self.assertLess(confidence, 1)
+
+    def test_missing_row(self):
+        rows = [{'name': f'row{i}', 'value': i} for i in range(10)]
+        missing = rows[:5] + rows[6:]
+        (result, confidence) = self.verifier([missing, rows, rows])
+
+        self.assertEquals(result, rows)
+        self.assertLess(confidence, 1)
+
+    def test_typo_aligned(self):
+        rows = [{'name': f'row{i}', 'value': i} for i in range(5)]
+        typo = rows[:2] + [{'name': 'row2', 'value': 20}] + rows[3:]
+        (result, confidence) = self.verifier([rows, typo, rows])
+
+        self.assertEquals(result, rows)
+        self.assertAlmostEqual(confidence, 2 / 3)
+
+    def test_empty(self):
+        (result, confidence) = self.verifier([[], [], []])
+
+        self.assertEquals(result, [])
+        self.assertEquals(confidence, 1)
+
+    def test_no_standing_out(self):
+        (result, confidence) = self.verifier([[1, 2, 3, 4], [5, 6, 7, 8], [9, 10, 11, 12]])
+
+        self.assertLess(confidence, 1)
+        self.assertGreaterEqual(confidence, 0)
+
+    def test_as_default(self):
+        data = {'items': [1, 2, 3]}
+        task = AbstractTask(DummyAbstracTask(info={'url': 'https://bla.pl'}))
+
+        with patch('moonsheep.verifiers.DEFAULT_LIST_VERIFIER', AlignedListVerifier):
+            (result, confidence) = task.cross_check([data, {'items': [1, 5, 2, 3]}, data])
+
+        self.assertEquals(result, data)
+
+
+class VerificationPlanTest(UnitTestCase):
+    def test_plan_reused(self):
+        task1 = AbstractTask(DummyAbstracTask(info={'url': 'https://bla.pl'}))
+        task2 = AbstractTask(DummyAbstracTask(info={'url': 'https://bla2.pl'}))
+
+        verifier = plan_for(task1)
+        self.assertIs(plan_for(task2), verifier)
+        self.assertIs(verifier.task, task2)
+
+    def test_nested_verifiers_resolved_once(self):
+        task = AbstractTask(DummyAbstracTask(info={'url': 'https://bla.pl'}))
+        data = {'cars': [{'model': 'A', 'year': 2011}, {'model': 'B', 'year': 2012}]}
+        task.cross_check([data, data])
+
+        with patch('moonsheep.verifiers.TaskVerifier.verifier_for') as verifier_for_mock:
+            (result, confidence) = task.cross_check([data, data])
+
+        verifier_for_mock.assert_not_called()
+        self.assertEquals(result, data)
+        self.assertEquals(confidence, 1)
+
+    def test_custom_verifier(self):
+        class CustomVerifier(DictVerifier):
+            def verify___fld(self, values):
+                return 'custom', 1
+
+        task = AbstractTask(DummyAbstracTask(info={'url': 'https://bla.pl'}))
+        (result, confidence) = CustomVerifier(task, '')([{'fld': 'a', 'other': 'b'}, {'fld': 'c', 'other': 'b'}])
+
+        self.assertEquals(result, {'fld': 'custom', 'other': 'b'})
+        self.assertEquals(confidence, 1)
+
+
 class MultipleRangeFieldTestCase(UnitTestCase):
     def setUp(self):
         self.field = MultipleRangeField()
@@ -16,15 +16,17 @@ Including another URLconf
 from django.conf.urls import url
 from django.urls import path
 
-from moonsheep.importers.importers import ImporterView
-from .views import ManualVerificationView, DocumentListView, CampaignView, ExporterView
+from moonsheep.importers.importers import ImporterView, ImportJobView
+from .views import ManualVerificationView, DocumentListView, DocumentTasksView, CampaignView, ExporterView
 
 # TODO app_name = 'moonsheep'
 urlpatterns = [
     path('', CampaignView.as_view(), name='ms-admin'),
     # TODO cleaner namespace here instead of ms-admin url name? Or? Django docs somewhere said that's the way to prefix apps, check it!
     path('documents', DocumentListView.as_view(), name='documents'),
+    path('documents/<int:doc_id>/tasks', DocumentTasksView.as_view(), name='document-tasks'),
     path('documents/import/<slug:importer_id>', ImporterView.as_view(), name='importer'),
+    path('documents/import/jobs/<int:job_id>', ImportJobView.as_view(), name='import-job'),
 
     path('export/<slug:slug>', ExporterView.as_view(), name='ms-export'),
 
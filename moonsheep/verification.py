@@ -0,0 +1,262 @@
+import collections
+import logging
+import math
+import multiprocessing
+import os
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable
+
+from django.db import connections, transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from moonsheep import signals, statistics
+from moonsheep.models import Entry, Task, VerificationJob
+from moonsheep.settings import MOONSHEEP
+from moonsheep.verifiers import MIN_CONFIDENCE
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(entry: Entry):
+    """
+    Leave entry to be cross-checked later by `process_jobs`
+    """
+    VerificationJob.objects.create(entry=entry, task_id=entry.task_id)
+
+
+def process_jobs(batch_size: int = 100) -> int:
+    """
+    Cross-check tasks having queued entries, a batch of tasks at once
+
+    Tasks are locked skipping those taken by other workers, so several workers can run at once
+    and each task is verified by one worker only. All entries queued for a task are processed together.
+
+    If verification of a task fails, its jobs are kept marked as failed with the traceback.
+
+    :param batch_size: maximal number of tasks verified at once
+    :return: number of processed jobs
+    """
+    with transaction.atomic():
+        task_ids = list(Task.objects.select_for_update(skip_locked=True)
+                        .filter(id__in=VerificationJob.objects.filter(failed_at__isnull=True).values('task_id'))
+                        .order_by('id').values_list('id', flat=True)[:batch_size])
+        if not task_ids:
+            return 0
+
+        # jobs added after this point will wait for the next batch
+        jobs = list(VerificationJob.objects.filter(task_id__in=task_ids, failed_at__isnull=True)
+                    .values_list('id', 'task_id'))
+
+        errors = {}
+        verify_tasks(Task.objects.filter(id__in=task_ids), errors=errors)
+
+        VerificationJob.objects.filter(id__in=[job_id for job_id, task_id in jobs if task_id not in errors]).delete()
+        for task_id, error in errors.items():
+            VerificationJob.objects.filter(id__in=[job_id for job_id, t in jobs if t == task_id]) \
+                .update(failed_at=timezone.now(), error=error)
+
+        # Update progress of the whole batch at once
+        if MOONSHEEP['PROGRESS_UPDATE'] == 'deferred':
+            statistics.schedule_progress_update(task_ids)
+        else:
+            statistics.update_total_progress_bulk(task_ids=task_ids)
+
+    return len(jobs)
+
+
+def retry_failed_jobs() -> int:
+    """
+    Queue failed jobs again, ie. after fixing the problem
+
+    :return: number of jobs queued again
+    """
+    return VerificationJob.objects.filter(failed_at__isnull=False).update(failed_at=None, error='')
+
+
+def verify_tasks(tasks: Iterable[Task], errors: Dict[int, str] = None) -> Dict[int, bool]:
+    """
+    Cross-check many tasks at once
+
+    Entries of all the tasks are loaded in one query and tasks are verified grouped by type,
+    so verifiers resolved for the first task of a type are reused for the rest (see `verifiers.plan_for`).
+    Total progress is not updated, it's left to the caller to do it in bulk.
+
+    Each task is verified in its own savepoint, failures are logged and don't stop the others.
+
+    :param tasks: tasks to be verified
+    :param errors: if given, filled with task id -> traceback of failed tasks
+    :return: task id -> True if cross-verified otherwise False, failed tasks are left out
+    """
+    from moonsheep.tasks import AbstractTask
+
+    tasks = sorted(tasks, key=lambda t: (t.type, t.id))
+
+    entries = collections.defaultdict(list)
+    for entry in Entry.objects.filter(task_id__in=[task.id for task in tasks]).order_by('id'):
+        entries[entry.task_id].append(entry)
+
+    results = {}
+    for task in tasks:
+        try:
+            with transaction.atomic():
+                results[task.id] = AbstractTask.create_task_instance(task).verify_and_save(
+                    task.id, update_progress=False, entries=entries[task.id])
+        except Exception:
+            # Entries are kept, so the task can be verified again after fixing the problem
+            logger.exception(f"Verification of {task} failed")
+            if errors is not None:
+                errors[task.id] = traceback.format_exc()
+
+    return results
+
+
+_inherited_connections = []
+
+
+def _init_worker():
+    """
+    Detaches database connections inherited by a forked worker of `reverify`
+
+    Their sockets are shared with the parent process, so they must be neither used nor closed here.
+    References are kept, so they are not closed when garbage collected. If cross-checking needs
+    the database, a new connection is opened.
+    """
+    for conn in connections.all():
+        if conn.connection is not None:
+            _inherited_connections.append(conn.connection)
+            conn.connection = None
+
+
+def _cross_check(item):
+    """
+    Cross-check entries of a task, run in the worker processes of `reverify`
+    """
+    from moonsheep.registry import get_task_class
+
+    task_type, task_id, params, doc_id, entries_data = item
+    try:
+        task = get_task_class(task_type)(Task(id=task_id, type=task_type, params=params, doc_id=doc_id))
+        crosschecked, confidence = task.cross_check(entries_data)
+        return crosschecked, confidence, None
+    except Exception:
+        return None, None, traceback.format_exc()
+
+
+def reverify(tasks: QuerySet, chunk_size: int = 1000, workers: int = None, dry_run: bool = False) -> collections.Counter:
+    """
+    Cross-check again all given tasks, ie. after verifiers or MIN_ENTRIES_TO_* settings were changed
+
+    Tasks are streamed in chunks using a server-side cursor and entries of each chunk are loaded in one query.
+    Cross-checking runs in a pool of processes, while verified data is saved (`save_verified_data`, `after_save`)
+    in this process. States and own progress of the chunk are written with one `bulk_update`,
+    then total progress of the changed tasks is recomputed.
+
+    Tasks that were already crosschecked don't get their verified data saved again. If they don't pass
+    cross-checking anymore they are marked as dirty or open, but the data saved before is left as it is.
+
+    :param tasks: tasks to be verified again
+    :param chunk_size: number of tasks processed at once
+    :param workers: number of worker processes, by default one per CPU; 0 cross-checks in this process
+    :param dry_run: only count what would change without writing anything
+    :return: counts of tasks by the new state, plus 'unchanged' and 'failed'
+    """
+    from moonsheep.tasks import AbstractTask
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    counts = collections.Counter()
+    executor = None
+    if workers > 0:
+        # workers must not share connections with this process, which streams tasks with a server-side cursor
+        if not any(conn.in_atomic_block for conn in connections.all()):
+            connections.close_all()
+
+        options = {}
+        if sys.version_info >= (3, 7):
+            # forked workers inherit configured Django, so they can import task classes straight away;
+            # Python 3.6 forks on POSIX anyway, but doesn't accept these arguments
+            fork = 'fork' in multiprocessing.get_all_start_methods()
+            options = dict(mp_context=multiprocessing.get_context('fork') if fork else None, initializer=_init_worker)
+        executor = ProcessPoolExecutor(max_workers=workers, **options)
+
+        # start workers before the cursor is opened
+        executor.submit(int).result()
+
+    def process_chunk(chunk):
+        entries = collections.defaultdict(list)
+        for task_id, data in Entry.objects.filter(task_id__in=[task.id for task in chunk]) \
+                .order_by('id').values_list('task_id', 'data'):
+            entries[task_id].append(data)
+
+        to_check = [task for task in chunk if len(entries[task.id]) >= MOONSHEEP['MIN_ENTRIES_TO_CROSSCHECK']]
+        items = [(task.type, task.id, task.params, task.doc_id, entries[task.id]) for task in to_check]
+        if executor is None:
+            results = map(_cross_check, items)
+        else:
+            results = executor.map(_cross_check, items, chunksize=max(1, len(items) // (4 * workers)))
+        results = dict(zip([task.id for task in to_check], results))
+
+        changed = []
+        for task in chunk:
+            entries_count = len(entries[task.id])
+            crosschecked, confidence, error = results.get(task.id, (None, None, None))
+            if error is not None:
+                logger.error(f"Verification of {task} failed\n{error}")
+                counts['failed'] += 1
+                continue
+
+            if confidence is not None and confidence >= MIN_CONFIDENCE:
+                state, own_progress = Task.CROSSCHECKED, 100
+            else:
+                state = Task.DIRTY if entries_count >= MOONSHEEP['MIN_ENTRIES_TO_MARK_DIRTY'] else Task.OPEN
+                own_progress = 95 * (1 - math.exp(-2 / MOONSHEEP['MIN_ENTRIES_TO_CROSSCHECK'] * entries_count))
+
+            if state == task.state and math.isclose(own_progress, task.own_progress, abs_tol=0.001):
+                counts['unchanged'] += 1
+                continue
+
+            if state == Task.CROSSCHECKED and task.state != Task.CROSSCHECKED and not dry_run:
+                try:
+                    with transaction.atomic():
+                        task_type = AbstractTask.create_task_instance(task)
+                        task_type.save_verified_data(crosschecked)
+                        task_type.after_save(crosschecked)
+                        signals.verified_data_saved.send(sender=task_type.__class__, task=task_type,
+                                                         data=crosschecked)
+                        statistics.entries_verified(task.id)
+                except Exception:
+                    logger.exception(f"Saving verified data of {task} failed")
+                    counts['failed'] += 1
+                    continue
+
+            elif task.state == Task.CROSSCHECKED and state != Task.CROSSCHECKED:
+                logger.warning(f"{task} is not crosschecked anymore, but its verified data was already saved")
+
+            task.state, task.own_progress = state, own_progress
+            changed.append(task)
+            counts[state] += 1
+
+        if changed and not dry_run:
+            Task.objects.bulk_update(changed, ['state', 'own_progress'])
+            statistics.update_total_progress_bulk(task_ids=[task.id for task in changed])
+
+    try:
+        chunk = []
+        for task in tasks.filter(state__in=[Task.OPEN, Task.DIRTY, Task.CROSSCHECKED]).order_by('id') \
+                .only('id', 'type', 'params', 'doc_id', 'state', 'own_progress').iterator(chunk_size=chunk_size):
+            chunk.append(task)
+            if len(chunk) >= chunk_size:
+                process_chunk(chunk)
+                chunk = []
+
+        if chunk:
+            process_chunk(chunk)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return counts
@@ -1,7 +1,10 @@
 import collections
+import difflib
 import inspect
+import json
 import operator
 import statistics
+import threading
 from typing import List
 
 MIN_CONFIDENCE = 1
@@ -35,11 +38,15 @@ class TaskVerifier:
     """
     Operates in a context of a Task defining nested fields which verification can be overriden
     by defining verify_{field} methods.
+
+    Verifiers of nested fields are resolved and instantiated on first use and kept in the instance,
+    so a verifier built once by `plan_for` can be called for many tasks of the same type.
     """
 
     def __init__(self, task, model_prefix):
         self.task = task
         self.model_prefix = model_prefix + '__'
+        self._verifiers = {}  # (field, value type) -> resolved verifier
 
     def verifier_for(self, value_type):
         if value_type is dict:
@@ -54,6 +61,38 @@ class TaskVerifier:
 
         return verifier
 
+    def nested_verifier(self, fld, value_type, model_prefix):
+        """
+        Returns verifier for values of a nested field, resolving it only once
+
+        :param fld: name of the field or None for list items (custom verify_ methods are not looked up then)
+        :param value_type: type of the values
+        :param model_prefix: prefix passed to the nested verifier
+        """
+        key = (fld, value_type)
+        verifier = self._verifiers.get(key, None)
+        if verifier is None:
+            verifier = self.verifier_for(value_type)
+            if fld is not None:
+                verifier = getattr(self, "verify_" + self.model_prefix + fld, verifier)  # TODO document it
+
+            # Create instance of verifier class if needed
+            if inspect.isclass(verifier):
+                verifier = verifier(self.task, model_prefix=model_prefix)
+
+            self._verifiers[key] = verifier
+
+        return verifier
+
+    def bind(self, task):
+        """
+        Point this verifier and all resolved nested verifiers to the given task
+        """
+        self.task = task
+        for verifier in self._verifiers.values():
+            if isinstance(verifier, TaskVerifier):
+                verifier.bind(task)
+
 
 class DictVerifier(TaskVerifier):
     def __call__(self, entries: List[dict]):
@@ -78,12 +117,7 @@ class DictVerifier(TaskVerifier):
                 continue
 
             # Handle custom verification methods
-            default_verifier = self.verifier_for(type(values[0]))
-            verifier = getattr(self, "verify_" + self.model_prefix + fld, default_verifier) # TODO document it
-
-            # Create instance of verifier class if needed
-            if inspect.isclass(verifier):
-                verifier = verifier(self.task, model_prefix=self.model_prefix + fld)
+            verifier = self.nested_verifier(fld, type(values[0]), self.model_prefix + fld)
 
             value, confidence = verifier(values)
             results_dict[fld] = value
@@ -99,24 +133,16 @@ class OrderedListVerifier(TaskVerifier):
 
     def __call__(self, entries: List[List]):
         entries.sort(key=lambda s: len(s))
-        verifier = self.verifier_for(type(entries[0][0]))
-
-        # Create instance of verifier class if needed
-        if inspect.isclass(verifier):
-            verifier = verifier(self.task, model_prefix=self.model_prefix)
+        verifier = self.nested_verifier(None, type(entries[0][0]), self.model_prefix)
 
         results_list = []
         confidences_list = []
         item_counts = [len(entry) for entry in entries]
 
         # TODO a quite dumb way to cross-check
-        for i in range(item_counts[0]):
-            values_at_i = []
-            for entry in entries:
-                if i < len(entry):
-                    values_at_i.append(entry[i])
-
-            value, confidence = verifier(values_at_i)
+        # entries are sorted by length, so columns up to the shortest one contain values from all entries
+        for values_at_i in zip(*entries):
+            value, confidence = verifier(list(values_at_i))
             results_list.append(value)
             confidences_list.append(confidence)
 
@@ -131,6 +157,90 @@ class OrderedListVerifier(TaskVerifier):
         return results_list, overall_confidence
 
 
+def fingerprint(item) -> str:
+    """
+    Representation of a list item used to find the same items in different entries
+    """
+    return json.dumps(item, sort_keys=True, default=str)
+
+
+class AlignedListVerifier(TaskVerifier):
+    """
+    Cross-checks lists aligning their items first, so a row added or missing in one entry
+    doesn't shift all the following rows as in OrderedListVerifier.
+
+    Items are compared by their fingerprints. Each entry is aligned to a reference entry (the one closest
+    to the median length) by `difflib.SequenceMatcher`, which is close to linear for mostly matching lists.
+    Differing items in the same place of both lists (ie. a typo in a row) are paired in order,
+    so they are still cross-checked by the nested verifier.
+
+    Confidence of an item is lowered by the share of entries missing it and the overall confidence
+    by the share of items in an entry that couldn't be aligned with the reference.
+
+    To use it for all tasks set it in your app (ie. in `AppConfig.ready`):
+    `moonsheep.verifiers.DEFAULT_LIST_VERIFIER = AlignedListVerifier`
+    """
+
+    def __call__(self, entries: List[List]):
+        fingerprints = [[fingerprint(item) for item in entry] for entry in entries]
+
+        lengths = sorted(len(entry) for entry in entries)
+        median = lengths[len(lengths) // 2]
+        ref = min(range(len(entries)), key=lambda e: abs(len(entries[e]) - median))
+
+        columns = [[item] for item in entries[ref]]
+        confidences_list = []
+
+        for e, entry in enumerate(entries):
+            if e == ref:
+                continue
+
+            aligned = 0
+            matcher = difflib.SequenceMatcher(None, fingerprints[ref], fingerprints[e], autojunk=False)
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+                if tag in ('equal', 'replace'):
+                    for i, j in zip(range(i1, i2), range(j1, j2)):
+                        columns[i].append(entry[j])
+                        aligned += 1
+
+            if entry:
+                confidences_list.append(aligned / len(entry))
+
+        results_list = []
+        for values in columns:
+            verifier = self.nested_verifier(None, type(values[0]), self.model_prefix)
+            value, confidence = verifier(values)
+            results_list.append(value)
+            confidences_list.append(confidence * len(values) / len(entries))
+
+        overall_confidence = min(confidences_list, default=1)
+
+        return results_list, overall_confidence
+
+
 DEFAULT_DICT_VERIFIER = DictVerifier
 DEFAULT_LIST_VERIFIER = OrderedListVerifier
 DEFAULT_BASIC_VERIFIER_METHOD = equals
+
+_plans = threading.local()
+
+
+def plan_for(task) -> TaskVerifier:
+    """
+    Returns root verifier for the task, built once per task type (and thread) and bound to the given task
+
+    Plans are keyed also by the default verifiers, so replacing them at runtime builds new plans.
+    """
+    defaults = (DEFAULT_DICT_VERIFIER, DEFAULT_LIST_VERIFIER, DEFAULT_BASIC_VERIFIER_METHOD)
+    plans = getattr(_plans, 'plans', None)
+    if plans is None:
+        plans = _plans.plans = {}
+
+    key = (type(task), defaults)
+    verifier = plans.get(key, None)
+    if verifier is None:
+        verifier = plans[key] = DEFAULT_DICT_VERIFIER(task, '')
+    else:
+        verifier.bind(task)
+
+    return verifier
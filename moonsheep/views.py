@@ -1,27 +1,31 @@
+import functools
 import os
-import random
 import re
+import shutil
 import tempfile
-from typing import Sequence
+from decimal import Decimal
+from typing import List, Sequence, Tuple
 
-import dpath.util
 from django.contrib import messages
 from django.contrib.auth import login
-from django.db import IntegrityError
-from django.http import HttpResponseRedirect, Http404, FileResponse
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import HttpResponseRedirect, Http404, FileResponse, StreamingHttpResponse, JsonResponse
 from django.http.request import QueryDict
 from django.shortcuts import redirect
 from django.urls import reverse
+from django.utils.http import urlencode
 from django.utils.translation import ugettext_lazy as _
 from django.views import View
 from django.views.generic import FormView, TemplateView
 
+from moonsheep.choosers import get_task_chooser
 from moonsheep.exporters import Exporter
 from moonsheep.exporters.exporters import FileExporter
+from moonsheep.exporters.archive import ARCHIVES
 from moonsheep.importers.importers import IDocumentImporter
-from moonsheep.mapper import klass_from_name
 from moonsheep.users import UserRequiredMixin, generate_nickname
-from . import registry
+from . import registry, verification
 from .exceptions import (
     PresenterNotDefined, NoTasksLeft, TaskMustSetTemplate)
 from .models import Task, Entry, User
@@ -191,7 +195,7 @@ class TaskView(UserRequiredMixin, FormView):
             task_type = self.request.GET.get('task_type', None)
 
         if task_type is None:
-            defined_tasks = registry.TASK_TYPES
+            defined_tasks = list(registry.TASK_TYPES.keys())
 
             if not defined_tasks:
                 raise NotImplementedError(
@@ -204,7 +208,7 @@ class TaskView(UserRequiredMixin, FormView):
                 TaskView.__mocked_task_counter = 0
             task_type = defined_tasks[TaskView.__mocked_task_counter]
 
-        task_class = klass_from_name(task_type)
+        task_class = registry.get_task_class(task_type)
 
         # Developers should provide mocked params for the task
         has_mocked_params = False
@@ -226,21 +230,11 @@ class TaskView(UserRequiredMixin, FormView):
         """
         Choose a task to be served to user
 
-        By default it select 20 open tasks that user didn't contribute to and chooses one randomly
+        It is delegated to the chooser configured in MOONSHEEP['TASK_CHOOSER'], by default it selects 20 open tasks
+        that user didn't contribute to and chooses one randomly
         """
-        # TODO make it pluggable / create interface for it
         # TODO implement priority setting (how to set priority for the imported task?)
-
-        # TODO test exclude works properly
-        tasks = Task.objects.filter(state=Task.OPEN).exclude(entry__user=self.request.user).order_by('-priority')[:20]
-
-        if not tasks:
-            raise NoTasksLeft()
-
-        # choose task at random from the top 20, so everyone won't get the same task
-        # TODO otherwise an "open_count" could help to limit it,
-        #  especially where there are a lot of volunteers and long tasks
-        return random.choice(tasks)
+        return get_task_chooser().choose(self.request.user)
 
     def _save_entry(self, task_id, data) -> None:
         """
@@ -259,10 +253,20 @@ class TaskView(UserRequiredMixin, FormView):
             return
 
         # Create new entry
-        Entry(task_id=task_id, user=self.request.user, data=data).save()
+        entry = Entry(task_id=task_id, user=self.request.user, data=data)
+        if MOONSHEEP['VERIFICATION'] == 'queued':
+            # Verification, saving, progress updates are left to moonsheep_verify worker
+            with transaction.atomic():
+                entry.save()
+                verification.enqueue(entry)
+            get_task_chooser().entry_added(entry)
 
-        # Run verification, saving, progress updates
-        self.task_type.verify_and_save(task_id)
+        else:
+            entry.save()
+            get_task_chooser().entry_added(entry)
+
+            # Run verification, saving, progress updates
+            self.task_type.verify_and_save(task_id)
 
         messages.add_message(self.request, messages.SUCCESS, _(
             'Thank you! Are you ready for a next task? Or {linkopen}take a pause?{linkclose}').format(
@@ -355,45 +359,143 @@ class ManualVerificationView(TaskView):
 
 # TODO separate views/admin
 class DocumentListView(TemplateView):
+    """
+    Lists documents by progress, paginated with a cursor (progress and id of the last shown document)
+
+    Pages are fetched straight from the (progress, id) index, so it takes the same time to show any of them.
+    """
+
     template_name = 'moonsheep/documents.html'
+    paginate_by = 50
 
     def get_context_data(self, **kwargs):
-        documents = registry.get_document_model().objects.all().order_by('-progress')
+        documents, previous_cursor, next_cursor = self.get_page()
         importers = IDocumentImporter.implementations()
 
         context = super().get_context_data(**kwargs)
         context.update({
-            # TODO paging, etc.
             'documents': documents,
+            'previous_cursor': previous_cursor,
+            'next_cursor': next_cursor,
+            # current page, kept while expanding documents
+            'page_query': urlencode({k: self.request.GET[k] for k in ('before', 'after') if self.request.GET.get(k)}),
             'importers': importers
         })
 
         get_doc_details = self.request.GET.get('details_of', None)
         if get_doc_details:
-            # Get progress of all tasks and their subtasks
-
+            # Only top-level tasks are shown, their subtasks are loaded on demand from DocumentTasksView
             get_doc_details = int(get_doc_details)
 
-            tasks = Task.objects.filter(doc_id=get_doc_details).order_by('id')
-
-            nodes = {None: {'children': []}}
-            for t in tasks:
-                node = {
-                    "task": t,
-                    "children": []
-                }
-                # Register node
-                nodes[t.id] = node
-                # Add it to parent node
-                nodes[t.parent_id]['children'].append(node)
+            tasks, next_task = task_level(get_doc_details, None)
 
             context.update({
-                'progress_tree': nodes[None],
+                'tasks': tasks,
+                'next_task': next_task,
                 'details_doc_id': get_doc_details
             })
 
         return context
 
+    def get_page(self) -> Tuple[list, str, str]:
+        """
+        :return: (documents, cursor of the previous page, cursor of the next page), cursors are None on the first/last page
+        """
+        model = registry.get_document_model()
+
+        documents = model.objects.all()
+        before = self.request.GET.get('before', None)
+        after = self.request.GET.get('after', None)
+
+        # (progress, id) compared as a pair; the redundant bound on progress lets the index range scan start there
+        if before:
+            # walk back from the first document of the page
+            progress, pk = self.parse_cursor(before)
+            documents = list(documents.filter(progress__gte=progress)
+                             .filter(Q(progress__gt=progress) | Q(progress=progress, id__gt=pk))
+                             .order_by('progress', 'id')[:self.paginate_by + 1])
+            has_previous = len(documents) > self.paginate_by
+            documents = documents[:self.paginate_by][::-1]
+            has_next = True
+
+        else:
+            if after:
+                progress, pk = self.parse_cursor(after)
+                documents = documents.filter(progress__lte=progress) \
+                    .filter(Q(progress__lt=progress) | Q(progress=progress, id__lt=pk))
+            documents = list(documents.order_by('-progress', '-id')[:self.paginate_by + 1])
+            has_next = len(documents) > self.paginate_by
+            documents = documents[:self.paginate_by]
+            has_previous = bool(after)
+
+        previous_cursor = self.cursor(documents[0]) if has_previous and documents else None
+        next_cursor = self.cursor(documents[-1]) if has_next and documents else None
+
+        return documents, previous_cursor, next_cursor
+
+    @staticmethod
+    def cursor(document) -> str:
+        return f"{document.progress}_{document.id}"
+
+    @staticmethod
+    def parse_cursor(cursor: str) -> Tuple[Decimal, int]:
+        try:
+            progress, pk = cursor.rsplit('_', 1)
+            return Decimal(progress), int(pk)
+        except (ValueError, ArithmeticError):
+            raise Http404("Page not found")
+
+
+def task_level(doc_id: int, parent_id: int = None, after: int = None, limit: int = 100) -> Tuple[List[Task], int]:
+    """
+    Returns one level of document's tasks tree, served by (doc_id, parent, id) index
+
+    :param parent_id: parent of the level, None for top-level tasks
+    :param after: id of the last task of the previous page
+    :return: (tasks, id to pass as `after` to get the next page or None if it is the last one)
+    """
+    tasks = Task.objects.filter(doc_id=doc_id, parent_id=parent_id).order_by('id')
+    if after is not None:
+        tasks = tasks.filter(id__gt=after)
+
+    tasks = list(tasks[:limit + 1])
+    if len(tasks) > limit:
+        return tasks[:limit], tasks[limit - 1].id
+    return tasks, None
+
+
+class DocumentTasksView(View):
+    """
+    Serves one level of document's tasks tree as JSON, ie. subtasks of a task expanded on the documents list
+
+    GET params:
+    - parent: id of the parent task, top-level tasks are served if it's not given
+    - after: id of the last task of the previous page
+    """
+
+    paginate_by = 100
+
+    def get(self, request, *args, **kwargs):
+        try:
+            parent_id = int(request.GET['parent']) if request.GET.get('parent') else None
+            after = int(request.GET['after']) if request.GET.get('after') else None
+        except ValueError:
+            raise Http404("Task not found")
+
+        tasks, next_task = task_level(kwargs['doc_id'], parent_id, after, self.paginate_by)
+
+        return JsonResponse({
+            'tasks': [{
+                'id': t.id,
+                'type': t.type,
+                'state': t.state,
+                'own_progress': t.own_progress,
+                'total_progress': t.total_progress,
+                'children_count': t.children_count,
+            } for t in tasks],
+            'next': next_task,
+        })
+
 
 class CampaignView(TemplateView):
     template_name = 'moonsheep/campaign.html'
@@ -423,6 +525,13 @@ class CampaignView(TemplateView):
 
 
 class ExporterView(View):
+    """
+    Downloads export of the app's data
+
+    Exporters producing files one by one (see `StreamingFileExporter.files`) are packed into an archive on the fly,
+    so download starts right away. Choose archive with `?archive=zip` (default) or `?archive=tar.gz`.
+    """
+
     def get(self, request, *args, **kwargs):
         exporter_cls = FileExporter.implementations().get(kwargs['slug'], None)
         if exporter_cls is None:
@@ -430,16 +539,33 @@ class ExporterView(View):
 
         app_label = MOONSHEEP["APP"]
         exp: FileExporter = exporter_cls(app_label)
+
+        if callable(getattr(exp, 'files', None)):
+            archive = request.GET.get('archive', 'zip')
+            if archive not in ARCHIVES:
+                raise Http404(f"Archive {archive} is not supported")
+            stream_archive, content_type = ARCHIVES[archive]
+
+            response = StreamingHttpResponse(stream_archive(exp.files()), content_type=content_type)
+            response['Content-Disposition'] = f'attachment; filename="{app_label}-{kwargs["slug"]}.{archive}"'
+            return response
+
         # TODO frictionless supporting writing to existing writer/opened file
         temp_dir = tempfile.mkdtemp()
-        # TODO exporters should have the option to generate a default file name
-        temp_file = os.path.join(temp_dir, app_label + ('.xlsx' if kwargs['slug'] == 'xlsx' else '.tar.gz'))
-        # TODO frictionless checks file extension. it should operate by default as "save to one file packed"
-        # or we should create an option for that
-        # Decide how exporters should behave
-        exp.export(temp_file)
+        try:
+            # TODO exporters should have the option to generate a default file name
+            temp_file = os.path.join(temp_dir, app_label + ('.xlsx' if kwargs['slug'] == 'xlsx' else '.tar.gz'))
+            # TODO frictionless checks file extension. it should operate by default as "save to one file packed"
+            # or we should create an option for that
+            # Decide how exporters should behave
+            exp.export(temp_file)
+
+            # opened file is still readable after its directory is removed
+            response = FileResponse(open(temp_file, 'rb'), as_attachment=True)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
 
-        return FileResponse(open(temp_file, 'rb'), as_attachment=True)
+        return response
 
 
 class ChooseNicknameView(TemplateView):
@@ -472,6 +598,31 @@ class ChooseNicknameView(TemplateView):
         return self.render_to_response(context)
 
 
+_FIELD_NAME_RE = re.compile(r"^(?P<object>[\w\-]+)(?P<selectors>(?:\[[\w\-]+\])*)(?P<trailing_brackets>\[\])?$")
+_SELECTOR_RE = re.compile(r'\[([\w\-]+)\]')
+_NUMERIC_RE = re.compile(r'\d')
+
+
+@functools.lru_cache(maxsize=10000)
+def _parse_field_name(name: str) -> Tuple[Tuple[str, ...], Tuple[bool, ...], bool]:
+    """
+    Splits field name, ie. row[0][entry_options][]
+
+    :return: (path, whether each part of path is a numeric selector, whether name ends with [])
+    """
+    m = _FIELD_NAME_RE.match(name)
+    if not m:
+        raise Exception("Field name not valid: {}".format(name))
+
+    path = [m.group('object')]
+    numeric = [False]
+    for selector in _SELECTOR_RE.findall(m.group('selectors')):
+        path.append(selector)
+        numeric.append(_NUMERIC_RE.match(selector) is not None)
+
+    return tuple(path), tuple(numeric), m.group('trailing_brackets') is not None
+
+
 def unpack_post(post: QueryDict) -> dict:
     """
     Unpack items in POST fields that have multiple occurences.
@@ -495,48 +646,42 @@ def unpack_post(post: QueryDict) -> dict:
     :return: dictionary representing the object passed in POST
     """
 
-    dpath_separator = '/'
     result = {}
-    convert_to_array_paths = set()
-
-    for k in post.keys():
-        # analyze field name
-        m = re.search(r"^" +
-                      "(?P<object>[\w\-_]+)" +
-                      "(?P<selectors>(\[[\d\w\-_]+\])*)" +
-                      "(?P<trailing_brackets>\[\])?" +
-                      "$", k)
-        if not m:
-            raise Exception("Field name not valid: {}".format(k))
-
-        path = m.group('object')
-        if m.group('selectors'):
-            for ms in re.finditer(r'\[([\d\w\-_]+)\]', m.group('selectors')):
-                # if it is integer then make sure list is created
-                idx = ms.group(1)
-                if re.match(r'\d+', idx):
-                    convert_to_array_paths.add(path)
-
-                path += dpath_separator + idx
-
-        def get_list_or_value(post, key):
-            val = post.getlist(key)
-            # single element leave single unless developer put brackets
-            if len(val) == 1 and not m.group('trailing_brackets'):
-                val = val[0]
-            return val
-
-        dpath.util.new(result, path, get_list_or_value(post, k), separator=dpath_separator)
-
-    # dpath only works on dicts, but sometimes we want arrays
+    arrays = {}  # id -> dict keyed by numbers, to be converted to list
+
+    for k, values in post.lists():
+        path, numeric, trailing_brackets = _parse_field_name(k)
+
+        # single element leave single unless developer put brackets
+        value = values[0] if len(values) == 1 and not trailing_brackets else list(values)
+
+        node = result
+        last = len(path) - 1
+        for i, part in enumerate(path):
+            # if it is integer then make sure list is created
+            if numeric[i]:
+                arrays[id(node)] = node
+
+            if i == last:
+                node[part] = value
+                break
+
+            child = node.get(part, None)
+            if child is None:
+                child = node[part] = {}
+            elif not isinstance(child, dict):
+                raise Exception("Field name not valid: {}, it's already given a value".format(k))
+            node = child
+
     # ie. row[0][fld]=0&row[1][fld]=1 results in row { "0": {}, "1": {} } instead of row [ {}, {} ]
-    for path_to_d in convert_to_array_paths:
-        arr = []
-        d = dpath.util.get(result, path_to_d)
-        numeric_keys = [int(k_int) for k_int in d.keys()]
-        for k_int in sorted(numeric_keys):
-            arr.append(d[str(k_int)])
+    def convert_to_arrays(node: dict):
+        for key, value in node.items():
+            if isinstance(value, dict):
+                node[key] = convert_to_arrays(value)
 
-        dpath.util.set(result, path_to_d, arr)
+        if id(node) in arrays:
+            # missing indices are skipped, non-numeric ones raise ValueError
+            return [node[key] for key in sorted(node.keys(), key=int)]
+        return node
 
-    return result
+    return convert_to_arrays(result)